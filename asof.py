@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+from fx import SAR_PER_USD
+from maturity_engine import maturity_month
+
+# Point-in-time (as-of) view of the Investasi book.
+#
+# Every instrument is held over the interval [Settlement Date, Tanggal Jual),
+# open ended when it was never sold. The book as of a date d is the set of
+# intervals containing d, so a report for a past month end sees instruments
+# that were sold after it. Maturity profiles for many cutoffs come from one
+# sweep over the interval endpoints: +nominal at settlement and -nominal at
+# sale, bucketed by the first cutoff they apply to and accumulated over the
+# cutoff axis.
+
+PROFILE_COLUMNS = ['Maturity Profile IDR', 'Maturity Profile USD', 'Maturity Profile Khusus', 'Maturity Profile DAU']
+
+# (Sumber Dana, Ccy) -> (profile column, weight)
+PROFILE_SOURCES = {
+    ("PIH Reguler", "IDR"): (0, 1.0),
+    ("PIH Reguler", "USD"): (1, 1.0),
+    ("PIH Khusus", "USD"): (2, 1.0),
+    ("PIH Khusus", "SAR"): (2, 1 / SAR_PER_USD),
+    ("DAU", "IDR"): (3, 1.0),
+}
+
+
+def holding_intervals(df_inv):
+    # (IntervalIndex [Settlement Date, Tanggal Jual), row labels) for the rows
+    # with a settlement date; a sale before settlement gives an empty interval
+    df = df_inv[df_inv['Settlement Date'].notna()]
+    left = pd.DatetimeIndex(df['Settlement Date'])
+    right = pd.DatetimeIndex(df['Tanggal Jual']).fillna(pd.Timestamp.max)
+    right = right.where(right >= left, left)
+    return pd.IntervalIndex.from_arrays(left, right, closed='left'), df.index
+
+
+def holdings_asof(df_inv, date):
+    # Rows of the book held on `date`
+    intervals, index = holding_intervals(df_inv)
+    return df_inv.loc[index[intervals.contains(pd.Timestamp(date))]]
+
+
+def maturity_profiles_asof(df_inv, cutoffs, sar_per_usd=SAR_PER_USD):
+    # Maturity profile (see maturity_engine.maturity_profile) as of every
+    # cutoff, in one pass. Returns a long frame: 'cutoff', 'Date' + profile
+    # columns, one row per (cutoff, maturity month in the book).
+    cutoffs = pd.DatetimeIndex(cutoffs)
+    order = np.argsort(cutoffs.values, kind='stable')
+    sorted_cutoffs = cutoffs.values[order]
+
+    df = df_inv.dropna(subset=['Maturity Date'])
+    months = maturity_month(df['Maturity Date'])
+    valid_dates = pd.DatetimeIndex(np.sort(months.unique()))
+
+    # Profile column and weight per row; rows outside the profile drop out
+    weights = dict(PROFILE_SOURCES)
+    if sar_per_usd != SAR_PER_USD:
+        weights[("PIH Khusus", "SAR")] = (2, 1 / sar_per_usd)
+    sources = pd.MultiIndex.from_tuples(list(weights))
+    pos = sources.get_indexer(pd.MultiIndex.from_arrays([df['Sumber Dana'], df['Ccy']]))
+    col = np.where(pos >= 0, np.array([c for c, _ in weights.values()])[pos], -1)
+    weight = np.where(pos >= 0, np.array([w for _, w in weights.values()])[pos], 0.0)
+    amount = pd.to_numeric(df['Nominal'], errors='coerce').fillna(0).to_numpy(dtype=float) * weight
+
+    intervals, index = holding_intervals(df)
+    rows = df.index.get_indexer(index)
+    keep = col[rows] >= 0
+    rows = rows[keep]
+    slot = valid_dates.get_indexer(months.iloc[rows]) * len(PROFILE_COLUMNS) + col[rows]
+
+    # Difference array over the cutoff axis (last row collects events after
+    # every cutoff), then a cumulative sum gives the holdings at each cutoff
+    n_slots = len(valid_dates) * len(PROFILE_COLUMNS)
+    diff = np.zeros((len(cutoffs) + 1, n_slots))
+    start = np.searchsorted(sorted_cutoffs, intervals.left.values[keep], side='left')
+    stop = np.searchsorted(sorted_cutoffs, intervals.right.values[keep], side='left')
+    np.add.at(diff, (start, slot), amount[rows])
+    np.add.at(diff, (stop, slot), -amount[rows])
+    held = np.cumsum(diff[:-1], axis=0)
+
+    # Back to the caller's cutoff order
+    held = held[np.argsort(order, kind='stable')].reshape(len(cutoffs), len(valid_dates), len(PROFILE_COLUMNS))
+    out = pd.DataFrame(held.reshape(-1, len(PROFILE_COLUMNS)), columns=PROFILE_COLUMNS)
+    out.insert(0, 'Date', np.tile(valid_dates.values, len(cutoffs)))
+    out.insert(0, 'cutoff', np.repeat(cutoffs.values, len(valid_dates)))
+    return out
+
@@ -0,0 +1,167 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.offsets import MonthEnd
+
+from fx import MissingRateError, load_rates, require_rates
+from ladders import LADDERS
+from metric_store import LAGS, MetricStore
+from workbook_snapshot import load_snapshot
+from stages import (
+    DEFAULT_INPUTS, fx_rates, get_workbook, prepare_investments, short_term_investments, liquidity_months,
+    liquidity_ratio, solvability, maturity_profiles, cancellation_forecast, projection,
+    liquidity_gap
+)
+
+# Headless batch run of the dashboard computations.
+#
+#   python batch_report.py 2025-03-31 2025-06-30 --format xlsx --out reports
+#   python batch_report.py --from 2024-01 --to 2025-06 --workbook "Data Likuiditas (1).xlsx"
+#
+# The workbook is parsed once and every stage that does not depend on the
+# report date (Likuiditas series, Solvabilitas, cancellation forecast and
+# waiting-list projection) runs once. The as-of maturity profiles of all
+# report dates come from one sweep over the book, only the gap buckets are
+# evaluated per date. All report dates go into one table per result, keyed
+# by 'report_date'. Foreign-currency Reguler holdings are converted with the
+# dated rate table (--rates CSV, LIKUIDITAS_RATES_CSV or the Kurs sheet);
+# without one the run stops instead of assuming a rate.
+
+FORMATS = ('parquet', 'csv', 'xlsx')
+LIK_COLUMNS = ['liquidity', 'Ekses/Defisit', 'Short-Term Inv Nominal', 'Penempatan', 'BPIH']
+SOL_COLUMNS = ['Solvabilitas', 'Aset', 'Liabilitas', 'Dana Kelolaan DAU', 'Dana BPIH']
+
+
+def report_dates(dates=(), start=None, end=None):
+    # Explicit dates plus every month end in [start, end], normalized to EOM
+    out = [pd.Timestamp(d) + MonthEnd(0) for d in dates]
+    if start is not None:
+        end = end if end is not None else start
+        out += list(pd.date_range(pd.Timestamp(start) + MonthEnd(0), pd.Timestamp(end) + MonthEnd(0), freq=MonthEnd()))
+    return sorted(set(out))
+
+
+def _kpi_rows(store, dates, cols):
+    # One row per report date: value, previous month, same month last year
+    rows = []
+    for date in dates:
+        row = {'report_date': date}
+        for col in cols:
+            curr = store.get(col, date)
+            row[col] = np.nan if curr is None else curr
+            for lag in LAGS:
+                prev = store.get(col, date, lag)
+                row[f'{col} {lag}'] = np.nan if prev is None else prev
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def _per_date(frames):
+    return pd.concat(
+        [df.assign(report_date=date)[['report_date'] + list(df.columns)] for date, df in frames],
+        ignore_index=True
+    )
+
+
+def run_reports(workbook, dates, inputs=None, ladders=('internal',), rates=None):
+    # Returns {table name: DataFrame} for all report dates; rates defaults
+    # to stages.fx_rates of the workbook
+    inputs = dict(DEFAULT_INPUTS, **(inputs or {}))
+    rates = fx_rates(workbook) if rates is None else rates
+
+    df_inv = prepare_investments(workbook.sheet("Investasi"))
+    require_rates(rates, df_inv.loc[df_inv['Sumber Dana'] == "PIH Reguler", 'Ccy'].dropna(), 'IDR')
+    df_pnp = workbook.sheet("Penempatan")
+    df_bpih = workbook.sheet("BPIH")
+    months = liquidity_months(df_pnp, df_bpih)
+    df_lik = liquidity_ratio(short_term_investments(df_inv, months.min(), months.max()), df_pnp, df_bpih)
+    df_sol = solvability(workbook.sheet("Solvabilitas"))
+
+    forecast = cancellation_forecast(workbook.sheet("Pembatalan"))
+    df_final = projection(
+        forecast['df_pred'], workbook.sheet("Keberangkatan"),
+        wl_reg=inputs['wl_reg'], wl_khs=inputs['wl_khs'],
+        saldo_reg=inputs['saldo_reg'], saldo_khs=inputs['saldo_khs'],
+        sl_reg=inputs['sl_reg'], sl_khs=inputs['sl_khs']
+    )
+
+    # As-of maturity profiles for all report dates in one sweep
+    df_profiles = maturity_profiles(df_inv, tuple(dates))
+    gaps = [
+        (date, liquidity_gap(df_final, df_maturity_profile.drop(columns='report_date').reset_index(drop=True),
+                             inputs['pnp_reg'], inputs['pnp_khs'], rates, ladders=tuple(ladders)))
+        for date, df_maturity_profile in df_profiles.groupby('report_date', sort=False)
+    ]
+
+    return {
+        'likuiditas': _kpi_rows(MetricStore(df_lik, 'Date'), dates, LIK_COLUMNS),
+        'solvabilitas': _kpi_rows(MetricStore(df_sol, 'Bulan'), dates, SOL_COLUMNS),
+        'maturity_profile': df_profiles,
+        'liquidity_gap': _per_date(gaps),
+        'projection': df_final,
+    }
+
+
+def write_tables(tables, out_dir, fmt='parquet'):
+    # parquet / csv: one file per table; xlsx: one workbook, one sheet per table
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown format: {fmt}')
+    os.makedirs(out_dir, exist_ok=True)
+    if fmt == 'xlsx':
+        path = os.path.join(out_dir, 'report.xlsx')
+        with pd.ExcelWriter(path) as writer:
+            for name, df in tables.items():
+                df.to_excel(writer, sheet_name=name, index=False)
+        return [path]
+
+    paths = []
+    for name, df in tables.items():
+        path = os.path.join(out_dir, f'{name}.{fmt}')
+        if fmt == 'parquet':
+            df.to_parquet(path, index=False)
+        else:
+            df.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def _parse_input(text):
+    name, _, value = text.partition('=')
+    if name not in DEFAULT_INPUTS or not value:
+        raise argparse.ArgumentTypeError(f'expected one of {", ".join(DEFAULT_INPUTS)} as name=value')
+    return name, float(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate liquidity reports for a list of report dates.')
+    parser.add_argument('dates', nargs='*', help='report dates (any day of the month, normalized to month end)')
+    parser.add_argument('--from', dest='start', help='first month of a monthly range')
+    parser.add_argument('--to', dest='end', help='last month of a monthly range')
+    parser.add_argument('--workbook', help='local workbook instead of the Drive copy')
+    parser.add_argument('--rates', help='CSV of FX rates (Date, Ccy, Rate: IDR per unit) instead of the Kurs sheet')
+    parser.add_argument('--out', default='reports', help='output directory')
+    parser.add_argument('--format', default='parquet', choices=FORMATS)
+    parser.add_argument('--ladder', dest='ladders', action='append', choices=list(LADDERS),
+                        help='bucket ladder(s) of the gap table, default internal')
+    parser.add_argument('--set', dest='inputs', action='append', type=_parse_input, default=[],
+                        metavar='NAME=VALUE', help='override a gap input, e.g. pnp_reg=2.9e13')
+    args = parser.parse_args(argv)
+
+    dates = report_dates(args.dates, args.start, args.end)
+    if not dates:
+        parser.error('no report dates given')
+
+    workbook = load_snapshot(args.workbook) if args.workbook else get_workbook()
+    rates = load_rates(path=args.rates) if args.rates else None
+    try:
+        tables = run_reports(workbook, dates, dict(args.inputs), args.ladders or ['internal'], rates)
+    except MissingRateError as e:
+        parser.error(str(e))
+    for path in write_tables(tables, args.out, args.format):
+        print(path)
+
+
+if __name__ == '__main__':
+    main()
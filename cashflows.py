@@ -0,0 +1,202 @@
+import numpy as np
+import pandas as pd
+
+# Coupon and principal schedules of the Investasi book.
+#
+# Coupon dates run back from the maturity date in steps of 12 / frequency
+# months (month ends stay month ends) down to the settlement date. All
+# instruments are expanded together: one np.repeat of the instrument rows
+# and month arithmetic on integer arrays, no loop per instrument. Principal
+# is paid at maturity, or in equal parts on every coupon date for
+# amortising instruments, and coupons accrue on the outstanding principal.
+#
+# ScheduleCache keeps the schedule of every instrument keyed by its ID and
+# the content of its defining columns, so only new or edited instruments are
+# expanded again; schedules do not depend on the report date.
+
+ID_COLUMNS = ['Kode', 'Kode Instrumen', 'Seri', 'ID']
+COUPON_COLUMNS = ['Kupon', 'Imbal Hasil', 'Coupon']
+FREQUENCY_COLUMNS = ['Frekuensi Kupon', 'Frekuensi', 'Frequency']
+DAY_COUNT_COLUMNS = ['Day Count', 'Basis']
+AMORTISING_COLUMNS = ['Amortisasi', 'Amortising']
+
+DAY_COUNTS = ('ACT/365', 'ACT/360', '30/360', 'ACT/ACT')
+DEFAULT_DAY_COUNT = {'IDR': 'ACT/365', 'USD': '30/360', 'SAR': '30/360'}
+SCHEDULE_COLUMNS = ['row', 'id', 'Date', 'Sumber Dana', 'Ccy', 'coupon', 'principal']
+
+
+def _first_column(df, candidates):
+    for col in candidates:
+        if col in df.columns:
+            return col
+    return None
+
+
+def _days_in_month(ym):
+    # ym: months since year 0 (year * 12 + month - 1)
+    first = (ym - 1970 * 12).astype('datetime64[M]')
+    return ((first + 1).astype('datetime64[D]') - first.astype('datetime64[D]')).astype(np.int64)
+
+
+def _shift_months(dates, months):
+    # dates - months, end-of-month preserving, on datetime64[D] arrays
+    y, m, d = _ymd(dates)
+    ym = y * 12 + m - 1 - months
+    dim = _days_in_month(ym)
+    eom = d == _days_in_month(y * 12 + m - 1)
+    day = np.where(eom, dim, np.minimum(d, dim))
+    first = (ym - 1970 * 12).astype('datetime64[M]').astype('datetime64[D]')
+    return first + (day - 1)
+
+
+def _ymd(dates):
+    months = dates.astype('datetime64[M]')
+    y = months.astype(np.int64) // 12 + 1970
+    m = months.astype(np.int64) % 12 + 1
+    d = (dates - months.astype('datetime64[D]')).astype(np.int64) + 1
+    return y, m, d
+
+
+def year_fraction(start, end, day_count, frequency):
+    # Vectorized accrual fraction per row; day_count is an array of DAY_COUNTS
+    days = (end - start).astype(np.int64)
+    y1, m1, d1 = _ymd(start)
+    y2, m2, d2 = _ymd(end)
+    thirty = (360 * (y2 - y1) + 30 * (m2 - m1) + np.minimum(d2, 30) - np.minimum(d1, 30)) / 360
+    with np.errstate(divide='ignore', invalid='ignore'):
+        regular = np.where(frequency > 0, 1 / frequency, 0.0)
+    return np.select(
+        [day_count == 'ACT/360', day_count == '30/360', day_count == 'ACT/ACT'],
+        [days / 360, thirty, regular],
+        default=days / 365
+    )
+
+
+def expand_schedules(df_inv):
+    # Long frame, one row per payment: row (index label in df_inv), id, Date,
+    # Sumber Dana, Ccy, coupon, principal (in the instrument currency)
+    df = df_inv.dropna(subset=['Maturity Date'])
+    n = len(df)
+    maturity = pd.DatetimeIndex(df['Maturity Date']).values.astype('datetime64[D]')
+    settle = pd.DatetimeIndex(df['Settlement Date']).values.astype('datetime64[D]')
+    settle = np.where(np.isnat(settle), maturity, settle)
+    nominal = pd.to_numeric(df['Nominal'], errors='coerce').fillna(0).to_numpy(dtype=float)
+
+    def numeric(candidates):
+        col = _first_column(df, candidates)
+        if col is None:
+            return np.zeros(n)
+        return pd.to_numeric(df[col], errors='coerce').fillna(0).to_numpy(dtype=float)
+
+    rate = numeric(COUPON_COLUMNS)
+    frequency = numeric(FREQUENCY_COLUMNS)
+    frequency = np.where((rate != 0) & (frequency > 0) & (12 % np.maximum(frequency, 1) == 0), frequency, 0)
+    col = _first_column(df, AMORTISING_COLUMNS)
+    amortising = (numeric(AMORTISING_COLUMNS) > 0) & (frequency > 0) if col else np.zeros(n, dtype=bool)
+    col = _first_column(df, DAY_COUNT_COLUMNS)
+    day_count = (df[col].astype(str).str.upper().str.replace(' ', '') if col
+                 else df['Ccy'].map(DEFAULT_DAY_COUNT).fillna('ACT/365')).to_numpy()
+    col = _first_column(df, ID_COLUMNS)
+    ids = (df[col] if col else pd.Series(df.index, index=df.index)).to_numpy()
+
+    # Payment dates maturity - k * step for k = 0.. while after settlement;
+    # expand to the upper bound of periods, then drop dates on or before
+    # settlement. Principal-only instruments get one row.
+    step = np.where(frequency > 0, 12 // np.maximum(frequency, 1), 0).astype(np.int64)
+    y1, m1, _ = _ymd(settle)
+    y2, m2, _ = _ymd(maturity)
+    span = np.maximum((y2 - y1) * 12 + (m2 - m1), 0)
+    bound = np.where(step > 0, span // np.maximum(step, 1) + 1, 1)
+
+    idx = np.repeat(np.arange(n), bound)
+    k = np.arange(len(idx)) - np.repeat(np.cumsum(bound) - bound, bound)
+    date = _shift_months(maturity[idx], k * step[idx])
+    keep = (k == 0) | (date > settle[idx])
+    idx, k, date = idx[keep], k[keep], date[keep]
+    prev = _shift_months(maturity[idx], (k + 1) * step[idx])
+    periods = np.bincount(idx, minlength=n)
+
+    # Principal: bullet at maturity, or equal parts per period (k counts back
+    # from maturity, so k more parts are paid after this one)
+    part = nominal[idx] / periods[idx]
+    principal = np.where(amortising[idx], part, np.where(k == 0, nominal[idx], 0.0))
+    outstanding = np.where(amortising[idx], part * (k + 1), nominal[idx])
+    yf = year_fraction(prev, date, day_count[idx], frequency[idx])
+    coupon = np.where(step[idx] > 0, rate[idx] * outstanding * yf, 0.0)
+
+    return pd.DataFrame({
+        'row': df.index.to_numpy()[idx],
+        'id': ids[idx],
+        'Date': pd.DatetimeIndex(date.astype('datetime64[ns]')),
+        'Sumber Dana': df['Sumber Dana'].to_numpy()[idx],
+        'Ccy': df['Ccy'].to_numpy()[idx],
+        'coupon': coupon,
+        'principal': principal,
+    }, columns=SCHEDULE_COLUMNS)
+
+
+def _schedule_keys(df_inv):
+    cols = [c for c in ['Nominal', 'Ccy', 'Sumber Dana', 'Maturity Date', 'Settlement Date'] if c in df_inv]
+    for candidates in (ID_COLUMNS, COUPON_COLUMNS, FREQUENCY_COLUMNS, DAY_COUNT_COLUMNS, AMORTISING_COLUMNS):
+        col = _first_column(df_inv, candidates)
+        if col:
+            cols.append(col)
+    id_col = _first_column(df_inv, ID_COLUMNS)
+    ids = df_inv[id_col].astype(str) if id_col else pd.Series(df_inv.index.astype(str), index=df_inv.index)
+    return ids + ':' + pd.util.hash_pandas_object(df_inv[cols], index=False).astype(str)
+
+
+def _ranges(first, count):
+    # Concatenated arange(first[i], first[i] + count[i])
+    offsets = np.repeat(np.cumsum(count) - count, count)
+    return np.repeat(first, count) + np.arange(offsets.size) - offsets
+
+
+class ScheduleCache:
+    # Schedules live in one table, each instrument key owning a contiguous
+    # block (first row, row count), so assembling the book is one index
+    # lookup and one take
+    def __init__(self):
+        self.table = pd.DataFrame(columns=SCHEDULE_COLUMNS[1:])
+        self.keys = pd.Index([], dtype=object)
+        self.first = np.zeros(0, dtype=np.int64)
+        self.count = np.zeros(0, dtype=np.int64)
+        self.last_expanded = 0
+
+    def _append(self, keys, schedule):
+        # schedule: rows of expand_schedules for `keys` (one instrument each)
+        count = np.bincount(schedule['row'].to_numpy(), minlength=len(keys))
+        self.first = np.concatenate([self.first, len(self.table) + np.cumsum(count) - count])
+        self.count = np.concatenate([self.count, count])
+        self.keys = self.keys.append(pd.Index(keys, dtype=object))
+        schedule = schedule.drop(columns='row')
+        self.table = schedule if self.table.empty else pd.concat([self.table, schedule], ignore_index=True)
+
+    def _take(self, keys):
+        pos = self.keys.get_indexer(keys)
+        return _ranges(self.first[pos], self.count[pos]), self.count[pos]
+
+    def get(self, df_inv):
+        # Schedule of the whole book, expanding only instruments not seen
+        # with the same content before
+        df = df_inv.dropna(subset=['Maturity Date'])
+        keys = _schedule_keys(df)
+        missing = (~keys.isin(self.keys) & ~keys.duplicated()).to_numpy()
+        self.last_expanded = int(missing.sum())
+        if missing.any():
+            self._append(keys[missing].to_numpy(), expand_schedules(df[missing].reset_index(drop=True)))
+
+        take, count = self._take(keys)
+        out = self.table.take(take).reset_index(drop=True)
+        out.insert(0, 'row', np.repeat(df.index.to_numpy(), count))
+
+        # Drop schedules of instruments no longer in the book once they
+        # outnumber the live ones
+        if len(self.table) > 2 * len(out):
+            live = keys[~keys.duplicated()]
+            take, count = self._take(live)
+            self.table = self.table.take(take).reset_index(drop=True)
+            self.keys = pd.Index(live.to_numpy(), dtype=object)
+            self.first = np.cumsum(count) - count
+            self.count = count
+        return out
@@ -0,0 +1,236 @@
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+# Lightweight Plotly figures for the dashboard.
+#
+# Figures are built with graph_objects straight from NumPy arrays (no
+# plotly.express, no per-row colour mapping) and kept in an LRU keyed by a
+# hash of the arrays and options, so a rerun that does not change the data
+# skips building the figure (the LRU keeps its JSON spec and every call gets
+# a new figure from it without validating it again). Daily series are cut to MAX_POINTS per trace by
+# min/max decimation, which keeps every local peak and trough (the lows of a
+# cash position matter more than its average), and are sent as float32 with
+# date-only x values. Templates carry only the 2D
+# layout and the bar / scatter / heatmap defaults of the named Plotly
+# template instead of the defaults of every trace type.
+
+MAX_POINTS = 2000
+FIGURE_CACHE_SIZE = 128
+
+BLUE = 'rgb(31, 78, 121)'
+RED = 'rgb(192, 0, 0)'
+YELLOW = 'rgb(255, 193, 7)'
+LEGEND = dict(orientation='h', yanchor='bottom', y=1.02, xanchor='center', x=0.5)
+
+TEMPLATE_LAYOUT = ['autotypenumbers', 'colorway', 'font', 'hovermode', 'hoverlabel', 'paper_bgcolor',
+                   'plot_bgcolor', 'xaxis', 'yaxis', 'title', 'colorscale', 'coloraxis',
+                   'shapedefaults', 'annotationdefaults']
+TEMPLATE_DATA = ['bar', 'scatter', 'heatmap']
+
+
+@functools.lru_cache(maxsize=None)
+def light_template(name='plotly_white'):
+    spec = pio.templates[name].to_plotly_json()
+    return go.layout.Template(
+        layout={k: v for k, v in spec['layout'].items() if k in TEMPLATE_LAYOUT},
+        data={k: v for k, v in spec['data'].items() if k in TEMPLATE_DATA},
+    )
+
+
+# === Figure cache ===
+_figures = OrderedDict()
+_figures_lock = threading.Lock()
+
+
+def _digest(h, value):
+    if isinstance(value, (pd.Series, pd.Index)):
+        value = value.to_numpy()
+    if isinstance(value, np.ndarray):
+        if value.dtype == object:
+            value = pd.util.hash_array(value.astype(str))
+        h.update(f'{value.dtype}{value.shape}'.encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple)):
+        h.update(f'{type(value).__name__}{len(value)}'.encode())
+        for v in value:
+            _digest(h, v)
+    elif isinstance(value, dict):
+        for k in sorted(value):
+            _digest(h, k)
+            _digest(h, value[k])
+    else:
+        h.update(repr(value).encode())
+
+
+def cached_figure(build):
+    # Memoize a figure builder on a hash of its arguments. The LRU holds the
+    # figure's JSON spec, not the figure: every call gets a fresh go.Figure,
+    # so a caller changing its copy (update_layout, ...) does not change the
+    # chart of any other rerun or session. The spec was validated when it was
+    # built: a hit skips validation, the slow part of go.Figure.
+    @functools.wraps(build)
+    def wrapper(*args, **kwargs):
+        h = hashlib.sha1(build.__name__.encode())
+        _digest(h, (args, kwargs))
+        key = h.hexdigest()
+        with _figures_lock:
+            spec = _figures.get(key)
+            if spec is not None:
+                _figures.move_to_end(key)
+        if spec is None:
+            spec = build(*args, **kwargs).to_plotly_json()
+            with _figures_lock:
+                _figures[key] = spec
+                while len(_figures) > FIGURE_CACHE_SIZE:
+                    _figures.popitem(last=False)
+        return go.Figure(spec, skip_invalid=False, _validate=False)
+    return wrapper
+
+
+# === Downsampling ===
+def decimate(y, max_points=MAX_POINTS):
+    # Positions kept out of len(y): the minimum and maximum of every bin plus
+    # both ends, in order; all of them when there are max_points or fewer
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    bins = max(1, (max_points - 2) // 2)
+    size = -(-n // bins)
+    pad = bins * size - n
+    lo = np.concatenate([np.where(np.isnan(y), np.inf, y), np.full(pad, np.inf)]).reshape(bins, size)
+    hi = np.concatenate([np.where(np.isnan(y), -np.inf, y), np.full(pad, -np.inf)]).reshape(bins, size)
+    offsets = np.arange(bins) * size
+    keep = np.concatenate([[0, n - 1], offsets + lo.argmin(axis=1), offsets + hi.argmax(axis=1)])
+    return np.unique(keep[keep < n])
+
+
+def downsample(x, y, max_points=MAX_POINTS):
+    keep = decimate(y, max_points)
+    return np.asarray(x)[keep], np.asarray(y, dtype=float)[keep]
+
+
+def _dates(x):
+    # Date-only strings: half the size of full ISO timestamps in the payload
+    return pd.DatetimeIndex(x).strftime('%Y-%m-%d').to_numpy() if np.issubdtype(np.asarray(x).dtype, np.datetime64) else x
+
+
+# === Builders ===
+@cached_figure
+def bar_chart(x, y, title, xaxis_title, yaxis_title, template='seaborn', colors=None, hline=None,
+              hline_color='red', hline_text=None):
+    # One bar per x with values on top and an optional horizontal limit
+    fig = go.Figure(go.Bar(x=x, y=y, text=y, texttemplate='%{text:.2f}', textposition='outside',
+                           marker=dict(color=colors) if colors is not None else None))
+    fig.update_layout(title=title, xaxis_title=xaxis_title, yaxis_title=yaxis_title,
+                      template=light_template(template), showlegend=False)
+    if hline is not None:
+        fig.add_shape(type="line", x0=0, x1=1, y0=hline, y1=hline, xref='paper', yref='y',
+                      line=dict(color=hline_color, width=2 if hline_text else 1, dash="dot" if hline_text else None))
+    if hline_text:
+        fig.add_annotation(xref='paper', x=1, y=hline, text=hline_text, showarrow=False,
+                           font=dict(color=hline_color), yshift=10)
+    return fig
+
+
+@cached_figure
+def grouped_bars(x, series, title, xaxis_title, yaxis_title):
+    # series: ((name, y), ...) side by side per x, values on top
+    fig = go.Figure([
+        go.Bar(x=x, y=y, name=name, text=y, texttemplate='%{text:.2f}', textposition='outside')
+        for name, y in series
+    ])
+    fig.update_layout(
+        title={'text': title, 'x': 0.5, 'xanchor': 'center'},
+        xaxis_title=xaxis_title,
+        yaxis_title=yaxis_title,
+        yaxis_tickformat=',.2f',
+        barmode='group',
+        bargap=0.2,
+        template=light_template(),
+        legend_title_text='',
+        legend=LEGEND
+    )
+    return fig
+
+
+@cached_figure
+def gap_chart(x, gap, cumulative, title, pad):
+    # Gap bars (blue surplus / red deficit) over the cumulative gap area,
+    # both on the same scale
+    gap, cumulative = np.asarray(gap, dtype=float), np.asarray(cumulative, dtype=float)
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=x, y=cumulative, name='Cumulative Gap', fill='tozeroy', mode='lines', line=dict(width=0),
+        fillcolor='rgba(255, 193, 7, 0.4)', hoverinfo='y', yaxis='y'
+    ))
+    fig.add_trace(go.Bar(
+        x=x, y=gap, name='Gap', marker=dict(color=np.where(gap >= 0, BLUE, RED)),
+        text=gap.round(1), textposition='outside', yaxis='y2'
+    ))
+    y_range = [min(gap.min(), cumulative.min()) - pad, max(gap.max(), cumulative.max()) + pad]
+    fig.update_layout(
+        title=title,
+        xaxis=dict(title='Maturity Bucket'),
+        yaxis=dict(title='Nominal (T)', showgrid=False, zeroline=True, range=y_range),
+        yaxis2=dict(overlaying='y', side='left', showticklabels=False, showgrid=False, range=y_range),
+        barmode='overlay',
+        bargap=0.3,
+        template=light_template(),
+        legend_title_text='',
+        legend=LEGEND
+    )
+    return fig
+
+
+@cached_figure
+def line_chart(traces, title, xaxis_title, yaxis_title, stack=(), hline=None, hline_text=None, layout=None,
+               max_points=MAX_POINTS):
+    # traces: ((name, x, y, mode, color), ...), each downsampled on its own;
+    # the traces named in `stack` form one stacked area and keep the points
+    # of their total so the layers stay aligned
+    if stack:
+        shared = decimate(sum(np.nan_to_num(np.asarray(t[2], dtype=float)) for t in traces if t[0] in stack),
+                          max_points)
+    fig = go.Figure()
+    for name, x, y, mode, color in traces:
+        keep = shared if name in stack else decimate(y, max_points)
+        x, y = np.asarray(x)[keep], np.asarray(y, dtype=float)[keep]
+        if name in stack:
+            style = dict(stackgroup='stack', line=dict(width=0.5, color=color))
+        elif mode == 'markers':
+            style = dict(marker=dict(color=color, size=5))
+        else:
+            style = dict(line=dict(color=color))
+        fig.add_trace(go.Scatter(x=_dates(x), y=y.astype(np.float32), mode=mode, name=name, **style))
+    fig.update_layout(
+        title=title,
+        xaxis_title=xaxis_title,
+        yaxis_title=yaxis_title,
+        template=light_template(),
+        legend_title_text='',
+        legend=LEGEND,
+        **(layout or {})
+    )
+    if hline is not None:
+        fig.add_shape(type="line", x0=0, x1=1, y0=hline, y1=hline, xref='paper', yref='y',
+                      line=dict(color="red", width=2, dash="dot"))
+        fig.add_annotation(xref='paper', x=1, y=hline, text=hline_text, showarrow=False, font=dict(color="red"),
+                           yshift=10)
+    return fig
+
+
+@cached_figure
+def heatmap_chart(z, x, y, title, x_title, y_title, unit):
+    # Diverging grid centred on zero, first row at the bottom
+    fig = go.Figure(go.Heatmap(z=z, x=x, y=y, colorscale='RdBu', zmid=0, colorbar=dict(title=unit),
+                               hovertemplate=f'{x_title}: %{{x}}<br>{y_title}: %{{y}}<br>{unit}: %{{z}}<extra></extra>'))
+    fig.update_layout(title=title, xaxis_title=x_title, yaxis_title=y_title, template=light_template())
+    return fig
@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+from pandas.tseries.offsets import MonthEnd
+
+from asof import holdings_asof
+from lcr import SEGMENTS, segment_amounts
+from ladders import LADDERS, ladder_sums, projection_ref
+
+# Daily cash-flow ladder of one segment.
+#
+# One float array per flow on the day grid (reference date, end]:
+#
+#   maturity    principal of instruments held at the cutoff, on the maturity
+#               date or, given a cashflows schedule, on its principal dates
+#   coupon      coupons of the same instruments (schedule only)
+#   placement   Penempatan balance, on the due dates of its term placements:
+#               every `tenor` months a share `rollover` is placed again and
+#               the rest comes back; what is still placed at the last due
+#               date of the horizon comes back then
+#   batal       cancellation refunds  } monthly projection amounts, paid on
+#   bipih       BIPIH payments        } `pay_day` or spread over the month
+#
+# Flows are added with one bincount per array, never a days x instruments
+# matrix, and stored as float32 (~9,000 days per flow through 2050); sums
+# and the cumulative position are taken in float64. The month and bucket
+# views are roll-ups of the same arrays, so the month roll-up matches the
+# month-end pipeline while the daily net position shows mismatches within a
+# month.
+
+INFLOWS = ('maturity', 'coupon', 'placement')
+OUTFLOWS = ('batal', 'bipih')
+DTYPE = np.float32
+PLACEMENT_TENOR = 1   # months, the usual deposito term
+OUTFLOW_COLUMNS = {
+    'reg': {'batal': 'batal_reg (IDR juta)', 'bipih': 'bipih_reg'},
+    'khs': {'batal': 'batal_khs (USD ribu)', 'bipih': 'bipih_khs'},
+}
+
+
+class DailyLadder:
+    def __init__(self, ref, end, dtype=DTYPE):
+        self.ref = pd.Timestamp(ref)
+        self.days = pd.date_range(self.ref + pd.Timedelta(days=1), pd.Timestamp(end), freq='D')
+        self.dtype = dtype
+        self.flows = {}
+
+    def _day_index(self, dates):
+        # Position on the grid, -1 outside it
+        pos = (pd.DatetimeIndex(dates).normalize() - self.days[0]).days.to_numpy()
+        return np.where((pos >= 0) & (pos < len(self.days)), pos, -1)
+
+    def add(self, name, dates, amounts):
+        pos = self._day_index(dates)
+        amounts = np.nan_to_num(np.asarray(amounts, dtype=float))
+        keep = pos >= 0
+        flow = np.bincount(pos[keep], weights=amounts[keep], minlength=len(self.days)).astype(self.dtype)
+        self.flows[name] = self.flows[name] + flow if name in self.flows else flow
+        return self
+
+    def add_monthly(self, name, months, amounts, pay_day=None):
+        # Monthly amounts (months as month ends) on day `pay_day` of the month
+        # (clipped to its length), or spread evenly over its days when None
+        months = pd.DatetimeIndex(months) + MonthEnd(0)
+        amounts = np.nan_to_num(np.asarray(amounts, dtype=float))
+        if pay_day is not None:
+            day = np.minimum(pay_day, months.day) - 1
+            return self.add(name, months - pd.to_timedelta(months.day - 1 - day, unit='D'), amounts)
+
+        order = np.argsort(months.values, kind='stable')
+        month_ends = months.values[order]
+        slot = np.searchsorted(month_ends, (self.days + MonthEnd(0)).values)
+        slot = np.minimum(slot, len(month_ends) - 1)
+        matched = month_ends[slot] == (self.days + MonthEnd(0)).values
+        per_day = (amounts[order] / months.day.to_numpy()[order])[slot]
+        flow = np.where(matched, per_day, 0.0).astype(self.dtype)
+        self.flows[name] = self.flows[name] + flow if name in self.flows else flow
+        return self
+
+    def add_placement(self, name, amount, tenor=PLACEMENT_TENOR, rollover=0.0):
+        # Balance placed at the reference date for `tenor` months and rolled
+        # over at every due date with share `rollover`; the part not rolled
+        # over is an inflow on the due date (a month end)
+        due = pd.DatetimeIndex([self.ref + MonthEnd(tenor * k) for k in range(1, len(self.days) // 28 // tenor + 2)])
+        due = due[due <= self.days[-1]]
+        if not len(due):
+            return self
+        still_placed = float(amount) * rollover ** np.arange(len(due))
+        amounts = still_placed * (1 - rollover)
+        amounts[-1] = still_placed[-1]
+        return self.add(name, due, amounts)
+
+    # === Views ===
+    def _series(self, names):
+        total = np.zeros(len(self.days))
+        for name in names:
+            if name in self.flows:
+                total += self.flows[name]
+        return total
+
+    def inflow(self):
+        return self._series(INFLOWS)
+
+    def outflow(self):
+        return self._series(OUTFLOWS)
+
+    def frame(self):
+        # Daily frame: every flow, net and cumulative net position
+        df = pd.DataFrame({'Date': self.days})
+        for name, flow in self.flows.items():
+            df[name] = flow
+        df['net'] = self.inflow() - self.outflow()
+        df['cumulative'] = np.cumsum(df['net'].to_numpy())
+        return df
+
+    def monthly(self):
+        # Month roll-up with the intra-month low of the cumulative position
+        df = self.frame()
+        month = df['Date'] + MonthEnd(0)
+        out = df.drop(columns=['Date', 'cumulative']).astype(float).groupby(month).sum()
+        out['cumulative'] = df.groupby(month)['cumulative'].last()
+        out['min_cumulative'] = df.groupby(month)['cumulative'].min()
+        return out.rename_axis('bulan').reset_index()
+
+    def buckets(self, ladders=('internal',)):
+        df = ladder_sums(self.days, {'asset': self.inflow(), 'liab': self.outflow()}, self.ref,
+                         {name: LADDERS[name] for name in ladders})
+        df['gap'] = df['asset'] - df['liab']
+        df['cumulative'] = df['gap'].groupby(df['ladder'], sort=False).cumsum()
+        return df
+
+
+def build_daily_ladder(df_inv, df_final, cutoff, placement, seg='reg', pay_day=None, schedule=None,
+                       placement_tenor=PLACEMENT_TENOR, rollover=0.0, rates=None, dtype=DTYPE):
+    # Ladder from the projection start (as in liquidity_gap) to the end of
+    # its last month, with the book as held at `cutoff`. schedule: output of
+    # cashflows.expand_schedules / ScheduleCache.get for df_inv. Foreign
+    # flows are converted at the rate of their date (fx.rate_table `rates`).
+    ladder = DailyLadder(projection_ref(df_final['bulan']), df_final['bulan'].max() + MonthEnd(0), dtype)
+
+    sumber_dana, _, ccys = SEGMENTS[seg]
+    book = holdings_asof(df_inv.dropna(subset=['Maturity Date']), cutoff)
+    book = book[(book['Sumber Dana'] == sumber_dana) & book['Ccy'].isin(ccys)]
+    if schedule is None:
+        ladder.add('maturity', book['Maturity Date'], segment_amounts(book, seg, rates))
+    else:
+        flows = schedule[schedule['row'].isin(book.index)]
+        ladder.add('maturity', flows['Date'], segment_amounts(flows, seg, rates, 'Date', 'principal'))
+        ladder.add('coupon', flows['Date'], segment_amounts(flows, seg, rates, 'Date', 'coupon'))
+    ladder.add_placement('placement', placement, placement_tenor, rollover)
+
+    for name, col in OUTFLOW_COLUMNS[seg].items():
+        ladder.add_monthly(name, df_final['bulan'], df_final[col], pay_day)
+    return ladder
@@ -0,0 +1,287 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import gdown
+
+# Local content-addressed cache for the Drive workbook.
+#
+#   .cache/drive/blobs/<sha256><ext>   immutable copies of every version seen
+#   .cache/drive/<key>.json            url -> {sha256, etag, size, fetched_at, ...}
+#
+# Within the TTL the cached copy is served without touching the network.
+# After the TTL the copy is revalidated (ETag / Last-Modified / size, then
+# sha256 of the body), and with stale_while_revalidate the last good copy is
+# served immediately while the revalidation runs in a background thread.
+
+CACHE_DIR = os.environ.get('LIKUIDITAS_CACHE_DIR', os.path.join('.cache', 'drive'))
+DEFAULT_TTL = 15 * 60
+CHUNK_SIZE = 1 << 20
+
+_refresh_lock = threading.Lock()
+_refreshing = set()
+
+
+def _cache_key(url):
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()[:16]
+
+
+def _meta_path(url, cache_dir):
+    return os.path.join(cache_dir, _cache_key(url) + '.json')
+
+
+def _blob_path(sha, ext, cache_dir):
+    return os.path.join(cache_dir, 'blobs', sha + ext)
+
+
+def _load_meta(url, cache_dir):
+    try:
+        with open(_meta_path(url, cache_dir)) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not os.path.exists(meta.get('path', '')):
+        return None
+    return meta
+
+
+def _save_meta(url, meta, cache_dir):
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix='.json')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp, _meta_path(url, cache_dir))
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _store_blob(tmp_path, ext, cache_dir):
+    # Move a freshly downloaded file into the content-addressed store
+    sha = file_sha256(tmp_path)
+    blob = _blob_path(sha, ext, cache_dir)
+    if os.path.exists(blob):
+        os.remove(tmp_path)
+    else:
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        os.replace(tmp_path, blob)
+    return sha, blob
+
+
+def _materialize(blob, output):
+    # Keep `output` pointing at the current version (only rewritten on change)
+    if not output:
+        return
+    if os.path.exists(output) and os.path.getsize(output) == os.path.getsize(blob) \
+            and file_sha256(output) == os.path.basename(blob).split('.')[0]:
+        return
+    tmp = output + '.tmp'
+    shutil.copyfile(blob, tmp)
+    os.replace(tmp, output)
+
+
+def _gdown_fetch(url, dest):
+    # Drive interposes an HTML confirmation page for large files, gdown handles it
+    return gdown.download(url, dest, quiet=True)
+
+
+def _download(url, meta, ext, cache_dir, timeout):
+    # Conditional GET. Returns (sha, blob, headers) or None when not modified.
+    req = urllib.request.Request(url)
+    if meta:
+        if meta.get('etag'):
+            req.add_header('If-None-Match', meta['etag'])
+        if meta.get('last_modified'):
+            req.add_header('If-Modified-Since', meta['last_modified'])
+
+    os.makedirs(cache_dir, exist_ok=True)
+    try:
+        resp = urllib.request.urlopen(req, timeout=timeout)
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return None
+        raise
+
+    with resp:
+        headers = {
+            'etag': resp.headers.get('ETag'),
+            'last_modified': resp.headers.get('Last-Modified'),
+            'size': resp.headers.get('Content-Length'),
+        }
+        size = int(headers['size']) if headers['size'] else None
+
+        # Same validator and same size as the cached copy: skip the body
+        if meta and headers['etag'] and headers['etag'] == meta.get('etag') \
+                and size is not None and size == meta.get('size'):
+            return None
+
+        fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=ext)
+        content_type = resp.headers.get('Content-Type', '')
+        if content_type.startswith('text/html'):
+            os.close(fd)
+            if _gdown_fetch(url, tmp) is None:
+                os.remove(tmp)
+                raise IOError(f'Download failed: {url}')
+        else:
+            with os.fdopen(fd, 'wb') as f:
+                shutil.copyfileobj(resp, f, CHUNK_SIZE)
+
+    sha, blob = _store_blob(tmp, ext, cache_dir)
+    headers['size'] = os.path.getsize(blob)
+    return sha, blob, headers
+
+
+def _revalidate(url, output, meta, cache_dir, timeout):
+    ext = os.path.splitext(output or '')[1] or '.bin'
+    res = _download(url, meta, ext, cache_dir, timeout)
+    now = time.time()
+    if res is None:
+        meta = dict(meta, fetched_at=now)
+    else:
+        sha, blob, headers = res
+        meta = {
+            'url': url,
+            'sha256': sha,
+            'path': blob,
+            'etag': headers['etag'],
+            'last_modified': headers['last_modified'],
+            'size': headers['size'],
+            'fetched_at': now,
+            'changed_at': now if not meta or meta['sha256'] != sha else meta.get('changed_at', now),
+        }
+    _save_meta(url, meta, cache_dir)
+    _materialize(meta['path'], output)
+    return meta
+
+
+def _background_revalidate(url, output, meta, cache_dir, timeout):
+    key = (url, cache_dir)
+    with _refresh_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def run():
+        try:
+            _revalidate(url, output, meta, cache_dir, timeout)
+        except Exception:
+            # Keep serving the last good copy, next rerun after the TTL retries
+            pass
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(key)
+
+    threading.Thread(target=run, name='drive-cache-refresh', daemon=True).start()
+
+
+def fetch_workbook(url, output, ttl=DEFAULT_TTL, stale_while_revalidate=True,
+                   cache_dir=CACHE_DIR, timeout=60):
+    # Returns the local path of the current copy of `url` (a file in the blob store)
+    meta = _load_meta(url, cache_dir)
+
+    if meta is not None:
+        age = time.time() - meta['fetched_at']
+        if age < ttl:
+            return meta['path']
+        if stale_while_revalidate:
+            _background_revalidate(url, output, meta, cache_dir, timeout)
+            return meta['path']
+
+    try:
+        meta = _revalidate(url, output, meta, cache_dir, timeout)
+    except (OSError, urllib.error.URLError):
+        if meta is None:
+            raise
+    return meta['path']
+
+
+def cached_version(url, cache_dir=CACHE_DIR):
+    # sha256 of the copy fetch_workbook would currently serve, or None
+    meta = _load_meta(url, cache_dir)
+    return meta['sha256'] if meta else None
+
+
+# === Local stand-in for Drive ===
+# Serves one file on /uc with ETag/Last-Modified and 304 handling, so the
+# cache can be exercised offline:
+#
+#   python drive_cache.py serve "Data Likuiditas (1).xlsx" 8765
+#   fetch_workbook('http://127.0.0.1:8765/uc?id=x', 'Data Likuiditas (1).xlsx')
+
+class FakeDrive:
+    def __init__(self, path, host='127.0.0.1', port=0):
+        self.path = path
+        self.requests = 0
+        self.downloads = 0
+        self.fail = False   # answer 503 (simulates a Drive outage)
+        drive = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                drive.requests += 1
+                if drive.fail:
+                    self.send_error(503)
+                    return
+                with open(drive.path, 'rb') as f:
+                    body = f.read()
+                etag = '"' + hashlib.sha256(body).hexdigest() + '"'
+                last_modified = formatdate(os.path.getmtime(drive.path), usegmt=True)
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                drive.downloads += 1
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/octet-stream')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', last_modified)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.url = f'http://{host}:{self.server.server_address[1]}/uc?id=local'
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) >= 3 and sys.argv[1] == 'serve':
+        port = int(sys.argv[3]) if len(sys.argv) > 3 else 8765
+        drive = FakeDrive(sys.argv[2], port=port)
+        print(f'Serving {sys.argv[2]} at {drive.url}')
+        drive.server.serve_forever()
+    else:
+        print('usage: python drive_cache.py serve <file> [port]')
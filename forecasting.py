@@ -0,0 +1,248 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.offsets import MonthEnd
+from sklearn.linear_model import LinearRegression
+
+# Forecasting models for monthly cancellations (Pembatalan).
+#
+# Every model has the same interface: fit(dates, y) on month-end dates,
+# predict(dates) for any later month ends, and `residuals` (in-sample errors,
+# used by the Monte Carlo stress test). Fits are cached by model, parameters
+# and a hash of the series, so a rerun or a second segment with the same
+# history does not fit again.
+#
+# backtest scores the models over rolling origins: for every origin the model
+# is fitted on the history before it and compared with the next `horizon`
+# months. It runs in-process: a full backtest of the Pembatalan history takes
+# well under a second, less than starting one worker process.
+
+PERIOD = 12
+
+
+def _month_index(dates):
+    # Months since year 0, for month arithmetic on month-end dates
+    dates = pd.DatetimeIndex(dates)
+    return dates.year.to_numpy() * 12 + dates.month.to_numpy() - 1
+
+
+class MonthOfYear:
+    # Linear regression on the month number (1-12) over the last `window`
+    # months; the original model of the gap tab
+    min_history = 2
+
+    def __init__(self, window=12):
+        self.window = window
+
+    def fit(self, dates, y):
+        dates, y = pd.DatetimeIndex(dates)[-self.window:], np.asarray(y, dtype=float)[-self.window:]
+        x = dates.month.to_numpy().reshape(-1, 1)
+        self.model = LinearRegression().fit(x, y)
+        self.residuals = y - self.model.predict(x)
+        return self
+
+    def predict(self, dates):
+        return self.model.predict(pd.DatetimeIndex(dates).month.to_numpy().reshape(-1, 1))
+
+
+class SeasonalNaive:
+    # Every month repeats the same month of the last observed year
+    min_history = PERIOD
+
+    def fit(self, dates, y):
+        y = np.asarray(y, dtype=float)
+        self.last = y[-PERIOD:]
+        self.last_month = _month_index(dates)[-1]
+        self.residuals = y[PERIOD:] - y[:-PERIOD] if len(y) > PERIOD else y - y.mean()
+        return self
+
+    def predict(self, dates):
+        h = _month_index(dates) - self.last_month
+        return self.last[(h - 1) % PERIOD]
+
+
+class TrendSeasonal:
+    # Least squares on a linear trend plus month-of-year dummies; clipped at
+    # zero so a falling trend cannot project negative cancellations
+    min_history = PERIOD + 2
+
+    def _design(self, months):
+        season = np.eye(PERIOD)[months % PERIOD][:, 1:]
+        return np.column_stack([np.ones(len(months)), months - self.origin, season])
+
+    def fit(self, dates, y):
+        months = _month_index(dates)
+        self.origin = months[0]
+        y = np.asarray(y, dtype=float)
+        x = self._design(months)
+        self.coef = np.linalg.lstsq(x, y, rcond=None)[0]
+        self.residuals = y - x @ self.coef
+        return self
+
+    def predict(self, dates):
+        return np.maximum(self._design(_month_index(dates)) @ self.coef, 0)
+
+
+class ExpSmoothing:
+    # Additive Holt-Winters with a damped trend (the horizon runs for decades).
+    # alpha / beta / gamma are picked from a grid by one-step-ahead squared
+    # error; all grid points run through the recursion together.
+    min_history = PERIOD
+    ALPHA = (0.1, 0.3, 0.5, 0.7, 0.9)
+    BETA = (0.01, 0.05, 0.1, 0.2)
+    GAMMA = (0.05, 0.1, 0.2, 0.4)
+
+    def __init__(self, phi=0.98):
+        self.phi = phi
+
+    def fit(self, dates, y):
+        y = np.asarray(y, dtype=float)
+        months = _month_index(dates)
+        alpha, beta, gamma = (g.ravel() for g in np.meshgrid(self.ALPHA, self.BETA, self.GAMMA, indexing='ij'))
+        phi = self.phi
+
+        # Initial state from the first (two) years, season by calendar month
+        level = np.full(alpha.size, y[:PERIOD].mean())
+        trend = np.full(alpha.size, (y[PERIOD:2 * PERIOD].mean() - level[0]) / PERIOD if len(y) >= 2 * PERIOD else 0.0)
+        season = np.zeros((alpha.size, PERIOD))
+        season[:, months[:PERIOD] % PERIOD] = y[:PERIOD] - level[0]
+
+        errors = np.empty((alpha.size, len(y)))
+        for t, (m, value) in enumerate(zip(months % PERIOD, y)):
+            errors[:, t] = value - (level + phi * trend + season[:, m])
+            new_level = alpha * (value - season[:, m]) + (1 - alpha) * (level + phi * trend)
+            trend = beta * (new_level - level) + (1 - beta) * phi * trend
+            season[:, m] = gamma * (value - new_level) + (1 - gamma) * season[:, m]
+            level = new_level
+
+        best = np.argmin((errors ** 2).sum(axis=1))
+        self.params = {'alpha': float(alpha[best]), 'beta': float(beta[best]), 'gamma': float(gamma[best]), 'phi': phi}
+        self.level, self.trend, self.season = level[best], trend[best], season[best]
+        self.last_month = months[-1]
+        self.residuals = errors[best]
+        return self
+
+    def predict(self, dates):
+        months = _month_index(dates)
+        h = months - self.last_month
+        damped = self.phi * (1 - self.phi ** h) / (1 - self.phi) if self.phi != 1 else h
+        return np.maximum(self.level + damped * self.trend + self.season[months % PERIOD], 0)
+
+
+MODELS = {
+    'month_of_year': MonthOfYear,
+    'seasonal_naive': SeasonalNaive,
+    'trend_seasonal': TrendSeasonal,
+    'exp_smoothing': ExpSmoothing,
+}
+MODEL_LABELS = {
+    'month_of_year': "Regresi bulan (12 bulan terakhir)",
+    'seasonal_naive': "Seasonal naive",
+    'trend_seasonal': "Tren + musiman",
+    'exp_smoothing': "Exponential smoothing (Holt-Winters)",
+}
+DEFAULT_MODEL = 'month_of_year'
+
+
+# === Fit cache ===
+FIT_CACHE_SIZE = 256
+_fits = OrderedDict()
+_fits_lock = threading.Lock()
+
+
+def series_key(dates, y):
+    digest = hashlib.sha1(pd.DatetimeIndex(dates).asi8.tobytes())
+    digest.update(np.asarray(y, dtype=float).tobytes())
+    return digest.hexdigest()
+
+
+def fit_model(name, dates, y, **params):
+    # Fitted model, from the cache when the same series was fitted before
+    key = (name, tuple(sorted(params.items())), series_key(dates, y))
+    with _fits_lock:
+        if key in _fits:
+            _fits.move_to_end(key)
+            return _fits[key]
+    if name not in MODELS:
+        raise ValueError(f'Unknown forecasting model: {name}')
+    model = MODELS[name](**params)
+    if len(y) < model.min_history:
+        raise ValueError(f'{name} needs at least {model.min_history} months of history, got {len(y)}')
+    model.fit(dates, y)
+    with _fits_lock:
+        _fits[key] = model
+        while len(_fits) > FIT_CACHE_SIZE:
+            _fits.popitem(last=False)
+    return model
+
+
+# === Pembatalan series ===
+def cancellation_history(df_btl):
+    # (history, start_date): the months with both Reguler and Khusus filled in,
+    # and the first month to forecast (first zero row after the last filled one)
+    df_filtered = df_btl[
+        (df_btl['Reguler'] != 0) & (df_btl['Khusus'] != 0)
+    ].dropna(subset=['Reguler', 'Khusus']).sort_values('Bulan')
+
+    last_non_zero_idx = df_btl[(df_btl['Reguler'] != 0) & (df_btl['Khusus'] != 0)].last_valid_index()
+    df_after = df_btl.loc[last_non_zero_idx + 1:] if last_non_zero_idx + 1 < len(df_btl) else pd.DataFrame()
+
+    # Find first row where either Reguler or Khusus is zero
+    zero_start_row = df_after[
+        (df_after['Reguler'] == 0) | (df_after['Khusus'] == 0)
+    ].head(1)
+
+    if not zero_start_row.empty:
+        start_date = pd.to_datetime(zero_start_row['Bulan'].values[0]).replace(day=1)
+    else:
+        # fallback if no zero row found after last valid
+        start_date = (df_btl['Bulan'].max() + pd.DateOffset(months=1)).replace(day=1)
+    return df_filtered, start_date
+
+
+# === Backtest ===
+def _backtest_model(name, dates, y, origins, horizon):
+    rows = []
+    for origin in origins:
+        # Not through the fit cache: every origin is a new series
+        model = MODELS[name]().fit(dates[:origin], y[:origin])
+        test = slice(origin, min(origin + horizon, len(y)))
+        forecast = model.predict(dates[test])
+        rows.append(pd.DataFrame({
+            'model': name, 'origin': dates[origin - 1], 'h': np.arange(1, len(forecast) + 1),
+            'actual': y[test], 'forecast': forecast,
+        }))
+    return pd.concat(rows, ignore_index=True)
+
+
+def backtest(dates, y, models=tuple(MODELS), horizon=12, min_train=None, step=1):
+    # Rolling-origin forecasts of every model: model, origin (last training
+    # month), h (months ahead), actual, forecast, error. All models share the
+    # same origins, from the longest minimum history (or min_train) on.
+    dates = pd.DatetimeIndex(dates) + MonthEnd(0)
+    y = np.asarray(y, dtype=float)
+    first = max([MODELS[name].min_history for name in models] + [min_train or 0])
+    origins = np.arange(first, len(y), step)
+    if not len(origins):
+        raise ValueError(f'Backtest needs more than {first} months of history, got {len(y)}')
+
+    out = pd.concat([_backtest_model(name, dates, y, origins, horizon) for name in models], ignore_index=True)
+    out['error'] = out['forecast'] - out['actual']
+    return out
+
+
+def backtest_scores(df_bt):
+    # Per model: MAE, RMSE, sMAPE (%) and bias over all origins and horizons
+    scores = df_bt.assign(
+        abs_error=df_bt['error'].abs(),
+        sq_error=df_bt['error'] ** 2,
+        smape=200 * df_bt['error'].abs() / (df_bt['actual'].abs() + df_bt['forecast'].abs()).replace(0, np.nan),
+    ).groupby('model', sort=False).agg(
+        MAE=('abs_error', 'mean'), RMSE=('sq_error', 'mean'), sMAPE=('smape', 'mean'),
+        bias=('error', 'mean'), n=('error', 'size'),
+    )
+    scores['RMSE'] = np.sqrt(scores['RMSE'])
+    return scores.sort_values('MAE').reset_index()
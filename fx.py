@@ -0,0 +1,166 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# FX conversion against a dated rate table.
+#
+# Rates are IDR per one unit of the currency, long format (Date, Ccy, Rate),
+# from the "Kurs" sheet or a CSV (a wide sheet with one column per currency
+# works too). A conversion looks up, for every (date, ccy) pair, the last
+# rate on or before the date with one merge_asof, so future flows use the
+# latest known rate. Pegged currencies without rows of their own (SAR) are
+# derived from their anchor. to_currency is the conversion the segment
+# reports use: a pair with neither a peg nor a quote is never assumed at
+# 1.0, its amounts come out NaN and missing_rates names the currency so the
+# caller can warn or refuse.
+#
+# FX shocks are relative moves of a currency against IDR (+0.1 = the
+# currency is 10% dearer); a batch of S scenarios converts to an (S, N)
+# array in one pass (scenarios.currency_gap builds the gap ladder on it).
+
+RATE_SHEET = "Kurs"
+RATES_CSV = os.environ.get('LIKUIDITAS_RATES_CSV')
+SAR_PER_USD = 3.75
+# currency -> (anchor currency, units of the currency per anchor unit)
+PEGS = {'SAR': ('USD', SAR_PER_USD)}
+BASE = 'IDR'
+
+
+def rate_table(df):
+    # Long (Date, Ccy, Rate) table, sorted for merge_asof, IDR = 1 implied
+    if 'Ccy' not in df.columns:
+        df = df.melt(id_vars='Date', var_name='Ccy', value_name='Rate')
+    df = pd.DataFrame({
+        'Date': pd.to_datetime(df['Date'], errors='coerce'),
+        'Ccy': df['Ccy'].astype(str).str.strip().str.upper(),
+        'Rate': pd.to_numeric(df['Rate'], errors='coerce'),
+    }).dropna()
+    df = df[df['Ccy'] != BASE]
+
+    # Pegged currencies follow their anchor unless quoted themselves
+    for ccy, (anchor, units) in PEGS.items():
+        if ccy not in set(df['Ccy']):
+            pegged = df[df['Ccy'] == anchor].assign(Ccy=ccy)
+            pegged['Rate'] = pegged['Rate'] / units
+            df = pd.concat([df, pegged], ignore_index=True)
+    return df.sort_values(['Date', 'Ccy'], kind='stable').reset_index(drop=True)
+
+
+class MissingRateError(ValueError):
+    pass
+
+
+def load_rates(workbook=None, path=None):
+    # Rate table from a CSV or the workbook's Kurs sheet; None when neither has one
+    if path is not None:
+        return rate_table(pd.read_csv(path))
+    if workbook is not None and RATE_SHEET in workbook.sheet_names:
+        return rate_table(workbook.sheet(RATE_SHEET))
+    return None
+
+
+def currencies(rates):
+    return [BASE] + sorted(rates['Ccy'].unique())
+
+
+def idr_rates(rates, dates, ccys):
+    # IDR per unit for every (date, ccy) pair; NaN when no rate is known yet
+    # (a flow dated before the first quote takes the first quote)
+    left = pd.DataFrame({
+        'Date': pd.to_datetime(pd.Series(dates)).to_numpy(),
+        'Ccy': pd.Series(ccys).astype(str).str.upper().to_numpy(),
+        'pos': np.arange(len(dates)),
+    })
+    out = np.ones(len(left))
+    foreign = (left['Ccy'] != BASE).to_numpy()
+    if foreign.any():
+        # Undated flows take the latest rate
+        lookup = left[foreign].fillna({'Date': rates['Date'].max()}).sort_values('Date', kind='stable')
+        merged = pd.merge_asof(lookup, rates, on='Date', by='Ccy', direction='backward')
+        first = rates.groupby('Ccy')['Rate'].first()
+        merged['Rate'] = merged['Rate'].fillna(merged['Ccy'].map(first))
+        out[merged['pos'].to_numpy()] = merged['Rate'].to_numpy()
+    return out
+
+
+def _peg_factor(ccy, to):
+    # Units of `to` per unit of `ccy` when one is pegged to the other
+    for pegged, (anchor, units) in PEGS.items():
+        if (ccy, to) == (pegged, anchor):
+            return 1 / units
+        if (ccy, to) == (anchor, pegged):
+            return units
+    return None
+
+
+def missing_rates(rates, ccys, to=BASE):
+    # Currencies of `ccys` that cannot be converted to `to`: no peg between
+    # them and no quote for one of the two in `rates` (None: no table)
+    quoted = {BASE} | (set(rates['Ccy']) if rates is not None else set())
+    missing = []
+    for ccy in pd.unique(pd.Series(ccys, dtype=object).astype(str).str.upper()):
+        if ccy != to and _peg_factor(ccy, to) is None and not {ccy, to} <= quoted:
+            missing.append(ccy)
+    return sorted(missing)
+
+
+def require_rates(rates, ccys, to=BASE):
+    missing = missing_rates(rates, ccys, to)
+    if missing:
+        raise MissingRateError(
+            f'No {"/".join(missing)} to {to} rate: add a "{RATE_SHEET}" sheet (Date, Ccy, Rate) '
+            f'to the workbook or give a rates CSV'
+        )
+
+
+def to_currency(rates, dates, ccys, amounts, to=BASE):
+    # amounts in `ccys` to `to`: same currency and pegged pairs need no
+    # table, any other pair the rate of each date; NaN where none is known
+    amounts = np.asarray(amounts, dtype=float)
+    ccys = pd.Series(ccys, dtype=object).astype(str).str.upper().to_numpy()
+    factor = np.full(len(amounts), np.nan)
+    todo = np.zeros(len(amounts), dtype=bool)
+    missing = missing_rates(rates, ccys, to)
+    for ccy in pd.unique(ccys):
+        rows = ccys == ccy
+        peg = 1.0 if ccy == to else _peg_factor(ccy, to)
+        if peg is not None:
+            factor[rows] = peg
+        elif ccy not in missing:
+            todo |= rows
+    if todo.any():
+        dates = pd.to_datetime(pd.Series(dates)).to_numpy()[todo]
+        factor[todo] = idr_rates(rates, dates, ccys[todo]) / idr_rates(rates, dates, [to] * int(todo.sum()))
+    return amounts * factor
+
+
+def shock_factors(shocks, ccys, to=BASE):
+    # (S, N) multipliers on the base conversion: shocks is a DataFrame with a
+    # relative move per currency column (missing currencies do not move)
+    shocks = pd.DataFrame(shocks)
+    ccys = pd.Series(ccys).astype(str).str.upper()
+
+    def move(ccy):
+        if ccy in shocks.columns:
+            return 1 + shocks[ccy].to_numpy(dtype=float)
+        return np.ones(len(shocks))
+
+    codes, uniques = pd.factorize(ccys)
+    per_ccy = np.column_stack([move(c) for c in uniques]) if len(uniques) else np.ones((len(shocks), 0))
+    return per_ccy[:, codes] / move(to)[:, None]
+
+
+def convert_batch(rates, dates, ccys, amounts, to=BASE, shocks=None):
+    # (S, N) converted amounts, one row per shock scenario (S = 1 without
+    # shocks); NaN where to_currency knows no rate
+    base = to_currency(rates, dates, ccys, amounts, to)
+    if shocks is None:
+        return base[None, :]
+    return base[None, :] * shock_factors(shocks, ccys, to)
+
+
+def shock_grid(moves, ccys=('USD',)):
+    # One scenario per relative move, applied to all of `ccys` together
+    moves = np.atleast_1d(np.asarray(moves, dtype=float))
+    return pd.DataFrame({ccy: moves for ccy in ccys})
@@ -0,0 +1,140 @@
+from collections import Counter, defaultdict
+
+import numpy as np
+import pandas as pd
+
+from fx import SAR_PER_USD
+from maturity_engine import window_sum, maturity_month
+
+# Incremental upkeep of the investment-book aggregates the tabs depend on:
+#
+#   - short-term nominal: PIH Reguler nominal maturing within one year of
+#     every evaluation month (the Likuiditas Wajib numerator)
+#   - maturity profile: nominal per (maturity month, Sumber Dana, Ccy) for
+#     instruments held at the cutoff (settled by it, not sold by it)
+#
+# sync() diffs the edited frame against the previous one by row index and
+# content hash, and applies only deleted/added/changed rows (a changed row is
+# its old version removed and its new version added). A full rebuild happens
+# when the evaluation months or cutoff change, or when most rows changed.
+
+COLUMNS = ['Sumber Dana', 'Ccy', 'Nominal', 'Maturity Date', 'Settlement Date', 'Tanggal Jual']
+HORIZON = pd.DateOffset(years=1)
+REBUILD_FRACTION = 0.5
+
+
+def _row_hashes(df):
+    return pd.util.hash_pandas_object(df[COLUMNS], index=False)
+
+
+class IncrementalBook:
+    def __init__(self, sar_per_usd=SAR_PER_USD):
+        self.sar_per_usd = sar_per_usd
+        self.eval_dates = None
+        self.cutoff = None
+        self.rows = None
+        self.hashes = None
+        self.short_term = None
+        self.profile = defaultdict(float)
+        self.month_counts = Counter()
+        self.last_delta = 0
+
+    # === Sync ===
+    def sync(self, df_inv, eval_dates, cutoff):
+        eval_dates = pd.DatetimeIndex(eval_dates)
+        cutoff = pd.Timestamp(cutoff)
+        df = df_inv[COLUMNS]
+        if (self.rows is None or not df.index.is_unique
+                or self.cutoff != cutoff or not self.eval_dates.equals(eval_dates)):
+            return self.rebuild(df, eval_dates, cutoff)
+
+        hashes = _row_hashes(df)
+        old, new = self.hashes, hashes
+        common = old.index.intersection(new.index)
+        changed = common[old[common].to_numpy() != new[common].to_numpy()]
+        removed = old.index.difference(new.index).append(changed)
+        added = new.index.difference(old.index).append(changed)
+
+        self.last_delta = len(removed) + len(added)
+        if self.last_delta == 0:
+            return self
+        if self.last_delta > REBUILD_FRACTION * max(len(df), 1):
+            return self.rebuild(df, eval_dates, cutoff)
+
+        self._apply(self.rows.loc[removed], -1)
+        self._apply(df.loc[added], 1)
+        self.rows = df.copy()
+        self.hashes = hashes
+        return self
+
+    def rebuild(self, df, eval_dates, cutoff):
+        self.eval_dates = eval_dates
+        self.cutoff = cutoff
+        self.rows = df.copy()
+        self.hashes = _row_hashes(df)
+        self.last_delta = len(df)
+
+        reg = df[df['Sumber Dana'] == 'PIH Reguler']
+        self.short_term = window_sum(reg['Maturity Date'], reg['Nominal'], eval_dates, eval_dates + HORIZON)
+
+        self.profile = defaultdict(float)
+        self.month_counts = Counter()
+        self._apply_profile(df, 1)
+        return self
+
+    # === Deltas ===
+    def _apply(self, rows, sign):
+        if rows.empty:
+            return
+        self._apply_short_term(rows, sign)
+        self._apply_profile(rows, sign)
+
+    def _apply_short_term(self, rows, sign):
+        reg = rows[(rows['Sumber Dana'] == 'PIH Reguler') & rows['Maturity Date'].notna()]
+        amounts = np.nan_to_num(pd.to_numeric(reg['Nominal'], errors='coerce').to_numpy(dtype=float))
+        for mat, amount in zip(reg['Maturity Date'], amounts):
+            # Evaluation dates d with d <= mat <= d + 1 year: search a slightly
+            # wider range, then apply the exact test the full build uses
+            lo = self.eval_dates.searchsorted(mat - HORIZON - pd.Timedelta(days=1), side='left')
+            hi = self.eval_dates.searchsorted(mat, side='right')
+            window = self.eval_dates[lo:hi]
+            hit = lo + np.flatnonzero((window <= mat) & (mat <= window + HORIZON))
+            self.short_term[hit] += sign * amount
+
+    def _apply_profile(self, rows, sign):
+        rows = rows[rows['Maturity Date'].notna()]
+        months = maturity_month(rows['Maturity Date'])
+        for month, n in months.value_counts().items():
+            self.month_counts[month] += sign * n
+            if self.month_counts[month] <= 0:
+                del self.month_counts[month]
+
+        held = (rows['Settlement Date'] <= self.cutoff) & ~(rows['Tanggal Jual'] <= self.cutoff)
+        sums = (
+            pd.to_numeric(rows['Nominal'], errors='coerce')[held]
+            .groupby([months[held], rows['Sumber Dana'][held], rows['Ccy'][held]])
+            .sum()
+        )
+        for key, value in sums.items():
+            self.profile[key] += sign * value
+
+    # === Results ===
+    def short_term_nominal(self):
+        return pd.DataFrame({
+            'Date': self.eval_dates,
+            'Short-Term Inv Nominal': self.short_term.copy()
+        })
+
+    def maturity_profile(self):
+        valid_dates = pd.DatetimeIndex(sorted(self.month_counts))
+
+        def col(sumber_dana, ccy):
+            return np.array([self.profile.get((dt, sumber_dana, ccy), 0.0) for dt in valid_dates])
+
+        return pd.DataFrame({
+            'Date': valid_dates,
+            'Maturity Profile IDR': col("PIH Reguler", "IDR"),
+            'Maturity Profile USD': col("PIH Reguler", "USD"),
+            'Maturity Profile Khusus': col("PIH Khusus", "USD") + col("PIH Khusus", "SAR") / self.sar_per_usd,
+            'Maturity Profile DAU': col("DAU", "IDR")
+        })
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+from pandas.tseries.offsets import MonthEnd
+
+# Bucket engine for maturity / gap ladders.
+#
+# A ladder is a list of (label, n, unit) upper bounds measured from a
+# reference date, unit 'D' (days), 'W' (weeks) or 'M' (months; month ends
+# stay month ends). Bucket k holds the flows dated in (bound k-1, bound k],
+# flows up to the reference date fall in the first bucket and flows after
+# the last bound in the '>' bucket. Assignment is one searchsorted on the
+# flow dates per ladder and the sums are one bincount over all ladders, so
+# any number of ladders comes out of a single pass and the flows need not
+# be one row per contiguous month.
+
+BUCKETS = [1, 3, 6, 12, 24, 36, 48, 60, 72, 84, 96, 108, 120]
+
+
+def month_ladder(months):
+    return [(f'{m} mo', m, 'M') for m in months]
+
+
+LADDERS = {
+    'internal': month_ladder(BUCKETS),
+    # Time bands of the regulatory maturity profile reports
+    'ojk': [('7 hari', 7, 'D'), ('1 bln', 1, 'M'), ('3 bln', 3, 'M'), ('6 bln', 6, 'M'), ('12 bln', 12, 'M')],
+    'bi': [('1 bln', 1, 'M'), ('3 bln', 3, 'M'), ('6 bln', 6, 'M'), ('12 bln', 12, 'M'), ('36 bln', 36, 'M'),
+           ('60 bln', 60, 'M')],
+}
+
+
+def ladder_labels(ladder):
+    return [label for label, _, _ in ladder] + ['>' + ladder[-1][0]]
+
+
+def bucket_edges(ref, ladder):
+    ref = pd.Timestamp(ref)
+    edges = []
+    for _, n, unit in ladder:
+        if unit == 'D':
+            edges.append(ref + pd.Timedelta(days=n))
+        elif unit == 'W':
+            edges.append(ref + pd.Timedelta(weeks=n))
+        elif unit == 'M':
+            edge = ref + pd.DateOffset(months=n)
+            edges.append(edge + MonthEnd(0) if ref.is_month_end else edge)
+        else:
+            raise ValueError(f'Unknown bucket unit: {unit}')
+    edges = pd.DatetimeIndex(edges)
+    if not edges.is_monotonic_increasing:
+        raise ValueError('Bucket bounds must be increasing')
+    return edges
+
+
+def assign_buckets(dates, ref, ladder):
+    # Bucket index per flow: 0 .. len(ladder), the last one being '>'
+    return np.searchsorted(bucket_edges(ref, ladder).values, pd.DatetimeIndex(dates).values, side='left')
+
+
+def ladder_sums(dates, values, ref, ladders):
+    # values: {column: array aligned with dates}; ladders: {name: ladder}.
+    # Returns a long frame: ladder, waktu and the summed columns, one row per
+    # bucket of every ladder in order.
+    codes, names, labels = [], [], []
+    offset = 0
+    for name, ladder in ladders.items():
+        codes.append(assign_buckets(dates, ref, ladder) + offset)
+        names += [name] * (len(ladder) + 1)
+        labels += ladder_labels(ladder)
+        offset += len(ladder) + 1
+    codes = np.concatenate(codes) if codes else np.zeros(0, dtype=np.int64)
+
+    out = pd.DataFrame({'ladder': names, 'waktu': labels})
+    for col, v in values.items():
+        v = np.nan_to_num(np.asarray(v, dtype=float))
+        out[col] = np.bincount(codes, weights=np.tile(v, len(ladders)), minlength=offset)
+    return out
+
+
+def projection_ref(months):
+    # Reference date of a projection: the month end before its first month
+    return pd.DatetimeIndex(months).min() + MonthEnd(0) - MonthEnd(1)
+
+
+def bucket_onehot(dates, ref, ladder):
+    # (len(dates), len(ladder) + 1) indicator matrix, for matrix-product sums
+    return np.eye(len(ladder) + 1)[assign_buckets(dates, ref, ladder)]
@@ -0,0 +1,163 @@
+import functools
+import re
+
+import numpy as np
+import pandas as pd
+
+from fx import to_currency
+from maturity_engine import window_sum
+
+# Daily Liquidity Coverage Ratio projection.
+#
+#   LCR(d) = HQLA(d) / (outflow(d, d+30] - min(inflow(d, d+30], 75% outflow))
+#
+# HQLA(d): instruments held on d (settled, not sold, not matured) after the
+# haircut of their HQLA level, plus cash: Penempatan and principal that has
+# matured up to d, net of the batal + BIPIH outflows paid up to d.
+# Inflows are maturities of non-HQLA holdings only, HQLA maturities are
+# already in the stock. Every series is built on the day grid with
+# difference arrays / cumulative sums, no per-day filtering.
+
+# (pattern on the instrument type, level, haircut); first match wins
+HQLA_RULES = [
+    (r'SBSN|SBN|SUN|SPN|SDHI|Sukuk Negara|Sukuk Global|Surat Berharga Negara', 'Level 1', 0.0),
+    (r'Sukuk Korporasi|Obligasi Korporasi|MTN', 'Level 2A', 0.15),
+    (r'Reksa Dana|Saham', 'Level 2B', 0.50),
+]
+NON_HQLA = ('Non-HQLA', 1.0)
+INSTRUMENT_COLUMNS = ['Jenis Instrumen', 'Jenis', 'Instrumen', 'Nama Instrumen']
+INFLOW_CAP = 0.75
+WINDOW_DAYS = 30
+
+# segment -> (Sumber Dana, reporting currency, currencies of its book)
+SEGMENTS = {
+    'reg': ("PIH Reguler", 'IDR', ('IDR', 'USD')),
+    'khs': ("PIH Khusus", 'USD', ('USD', 'SAR')),
+}
+
+
+def segment_amounts(book, seg, rates, date_col='Maturity Date', value_col='Nominal'):
+    # Nominal of a segment's rows in its reporting currency, at the rate of
+    # their date; rows without a rate (see fx.missing_rates) count as 0
+    amounts = pd.to_numeric(book[value_col], errors='coerce').fillna(0)
+    return np.nan_to_num(to_currency(rates, book[date_col], book['Ccy'], amounts, SEGMENTS[seg][1]))
+
+
+def instrument_column(df_inv):
+    for col in INSTRUMENT_COLUMNS:
+        if col in df_inv.columns:
+            return col
+    return None
+
+
+@functools.lru_cache(maxsize=32)
+def haircut_table(instrument_types):
+    # Classification of each distinct instrument type, cached on the set of
+    # types so reruns with the same book skip the regex matching
+    rows = []
+    for name in instrument_types:
+        level, haircut = NON_HQLA
+        for pattern, lvl, cut in HQLA_RULES:
+            if re.search(pattern, str(name), flags=re.IGNORECASE):
+                level, haircut = lvl, cut
+                break
+        rows.append({'instrument': name, 'level': level, 'haircut': haircut})
+    return pd.DataFrame(rows, columns=['instrument', 'level', 'haircut'])
+
+
+def classify_hqla(df_inv):
+    # Per-row haircut; without an instrument type column the book is treated
+    # as Level 1 (government sukuk)
+    col = instrument_column(df_inv)
+    if col is None:
+        return pd.Series('Level 1', index=df_inv.index), pd.Series(0.0, index=df_inv.index)
+    types = df_inv[col].fillna('').astype(str)
+    table = haircut_table(tuple(sorted(types.unique()))).set_index('instrument')
+    return types.map(table['level']), types.map(table['haircut'])
+
+
+def _held_on_grid(days_ns, starts, ends, values):
+    # Sum of values over instruments with start <= d < end, for every day d
+    diff = np.zeros(len(days_ns) + 1)
+    lo = np.searchsorted(days_ns, starts, side='left')
+    hi = np.searchsorted(days_ns, ends, side='left')
+    keep = hi > lo
+    np.add.at(diff, lo[keep], values[keep])
+    np.add.at(diff, hi[keep], -values[keep])
+    return np.cumsum(diff[:-1])
+
+
+def _flow_since(days_ns, dates_ns, values):
+    # Sum of values dated in [days[0], d] for every day d
+    order = np.argsort(dates_ns, kind='stable')
+    dates_ns = dates_ns[order]
+    csum = np.concatenate(([0.0], np.cumsum(values[order])))
+    before = csum[np.searchsorted(dates_ns, days_ns[0], side='left')]
+    return csum[np.searchsorted(dates_ns, days_ns, side='right')] - before
+
+
+def _ns(values):
+    return pd.DatetimeIndex(values).values.astype('datetime64[ns]').view('int64')
+
+
+def segment_book(df_inv, seg, rates=None):
+    # Holdings of one segment in its reporting currency, with HQLA haircut
+    sumber_dana, _, ccys = SEGMENTS[seg]
+    df = df_inv[df_inv['Sumber Dana'] == sumber_dana]
+    df = df[df['Ccy'].isin(ccys)].dropna(subset=['Maturity Date', 'Settlement Date'])
+    level, haircut = classify_hqla(df)
+    return pd.DataFrame({
+        'settle': df['Settlement Date'],
+        'end': df[['Maturity Date', 'Tanggal Jual']].min(axis=1),
+        'maturity': df['Maturity Date'],
+        'sold': df['Tanggal Jual'].notna() & (df['Tanggal Jual'] < df['Maturity Date']),
+        'amount': segment_amounts(df, seg, rates),
+        'level': level,
+        'haircut': haircut,
+    })
+
+
+def lcr_timeseries(df_inv, outflows, placement, start, end, seg='reg', rates=None):
+    # outflows: DataFrame with 'bulan' and 'outflow' (batal + BIPIH) in the
+    # segment currency; rates: fx.rate_table for the foreign holdings.
+    # Returns one row per day in [start, end].
+    days = pd.date_range(start=start, end=end, freq='D')
+    days_ns = _ns(days)
+    book = segment_book(df_inv, seg, rates)
+
+    amount = book['amount'].to_numpy(dtype=float)
+    haircut = book['haircut'].to_numpy(dtype=float)
+    settle = _ns(book['settle'])
+    stop = _ns(book['end'])
+    hqla_mask = haircut < 1
+
+    securities = _held_on_grid(days_ns, settle, stop, amount * (1 - haircut))
+
+    # Principal repaid at maturity becomes cash (sold positions are left out)
+    matured = ~book['sold'].to_numpy()
+    cash_in = _flow_since(days_ns, _ns(book['maturity'])[matured], amount[matured])
+    out_values = outflows['outflow'].to_numpy(dtype=float)
+    paid = _flow_since(days_ns, _ns(outflows['bulan']), out_values)
+    cash = np.maximum(0, placement + cash_in - paid)
+
+    window_end = days + pd.Timedelta(days=WINDOW_DAYS)
+    window_start = days + pd.Timedelta(days=1)
+    outflow_30d = window_sum(outflows['bulan'], out_values, window_start, window_end)
+    non_hqla = ~hqla_mask & matured
+    inflow_30d = window_sum(book['maturity'][non_hqla], amount[non_hqla], window_start, window_end)
+
+    net_outflow = outflow_30d - np.minimum(inflow_30d, INFLOW_CAP * outflow_30d)
+    hqla = securities + cash
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lcr = np.where(net_outflow > 0, hqla / net_outflow, np.nan)
+
+    return pd.DataFrame({
+        'Date': days,
+        'hqla_securities': securities,
+        'hqla_cash': cash,
+        'hqla': hqla,
+        'outflow_30d': outflow_30d,
+        'inflow_30d': inflow_30d,
+        'net_outflow_30d': net_outflow,
+        'lcr': lcr,
+    })
@@ -1,20 +1,47 @@
+import uuid
+
+import numpy as np
 import pandas as pd
 import streamlit as st
-import plotly.express as px
 import plotly.graph_objects as go
 from pandas.tseries.offsets import MonthEnd
-import gdown
-import numpy as np
-from sklearn.linear_model import LinearRegression
+from scenarios import SEGMENT_PARAMS, bucket_labels
+from fx import currencies, missing_rates, shock_grid
+from paging import OPERATORS, PAGE_SIZES
+from charts import BLUE, RED, YELLOW, bar_chart, grouped_bars, gap_chart, heatmap_chart, light_template, line_chart
+from forecasting import DEFAULT_MODEL, MODELS, MODEL_LABELS
+from incremental import IncrementalBook
+from cashflows import ScheduleCache
+from writeback import EDITABLE_SHEETS, WriteBuffer
+from metric_store import MetricStore
+from stages import DEFAULT_INPUTS, DEFAULT_REPORT_DATE, liquidity_months
+from pipeline import (
+    current_workbook, edit_backend, prepare_investments, liquidity_history, solvability_history, shared_forecast,
+    shared_projection, liquidity_gap, scenario_inputs, asset_liability, table_view, daily_cashflow, fx_rates,
+    fx_gap, tornado, heatmap, stress_test, lcr_projection, start_backtest
+)
 
 st.set_page_config(layout="wide")
 
+
+def stored_month_options(dates):
+    # Month selector over the months with stored results: labels and the
+    # index of this month, or of the latest month before it
+    months = pd.DatetimeIndex(dates).sort_values().unique()
+    if months.empty:
+        months = pd.DatetimeIndex([pd.Timestamp('today').normalize() + MonthEnd(0)])
+    this_month = pd.Timestamp('today').normalize() + MonthEnd(0)
+    default_index = max(int(months.searchsorted(this_month, side='right')) - 1, 0)
+    return [m.strftime('%b %Y') for m in months], default_index
+
+
 tab0, tab1, tab2, tab3, tab4 = st.tabs(["Likuiditas Wajib", "Solvabilitas", "Maturity Profile & Liquidity Gap", "Proyeksi LCR", "Data"])
 
-# Download the file
-url = 'https://drive.google.com/uc?id=16O_hbQ167m9Pnhj84T1IMXvW0hJaeoGf'
-output = 'Data Likuiditas (1).xlsx'
-gdown.download(url, output, quiet=False)
+# Current workbook version, downloaded, parsed and validated in the background
+# (refresher.py); this run keeps using it even if a newer one is published
+# meanwhile. Sheets load lazily from the snapshot.
+data_version = current_workbook()
+workbook = data_version.snapshot
 
 tab0.markdown(
     "<h1 style='font-size:25px;'>📊 Likuiditas Wajib BPKH</h1>",
@@ -22,15 +49,30 @@ tab0.markdown(
 )
 
 with tab0:
-    df_inv = pd.read_excel(output, sheet_name="Investasi")
-    df_pnp = pd.read_excel(output, sheet_name="Penempatan")
-    df_bpih = pd.read_excel(output, sheet_name="BPIH")
+    # Editable sheets with the edits stored so far, as first loaded in this
+    # session; the Data tab writes changed rows back in the background
+    if 'writeback' not in st.session_state:
+        st.session_state['writeback'] = WriteBuffer(edit_backend())
+        st.session_state['writeback_session'] = uuid.uuid4().hex[:8]
+    writeback = st.session_state['writeback']
+    editors = {
+        name: writeback.editor(name, *edit_backend().overlay(name, workbook.sheet(name), data_version.sha256),
+                               st.session_state['writeback_session'])
+        for name in EDITABLE_SHEETS
+    }
+    df_inv = editors["Investasi"].frame
+    df_pnp = editors["Penempatan"].frame
+    df_bpih = editors["BPIH"].frame
 
 tab4.markdown(
     "<h1 style='font-size:25px;'>📊 Data Likuiditas Wajib BPKH</h1>",
     unsafe_allow_html=True
 )
 with tab4:
+    st.caption(
+        f"Versi data {data_version.number} ({data_version.sha256[:12]}), "
+        f"dimuat {pd.Timestamp(data_version.published_at, unit='s', tz='Asia/Jakarta'):%d %b %Y %H:%M} WIB"
+    )
     st.write("Data Investasi:")
     edited_data_inv = st.data_editor(
         df_inv,
@@ -44,6 +86,7 @@ with tab4:
             )
         }
     )
+    writeback.stage("Investasi", editors["Investasi"].deltas(edited_data_inv))
 
     col1, col2 = st.columns(2)
     with col1:
@@ -53,6 +96,7 @@ with tab4:
             use_container_width=True,
             num_rows="dynamic",
         )
+        writeback.stage("Penempatan", editors["Penempatan"].deltas(edited_data_pnp))
     with col2:
         st.write("Data BPIH:")
         edited_data_bpih = st.data_editor(
@@ -60,53 +104,49 @@ with tab4:
             use_container_width=True,
             num_rows="dynamic",
         )
-    
+        writeback.stage("BPIH", editors["BPIH"].deltas(edited_data_bpih))
+
+    # Write-back status (flushes run after the edits pause)
+    if writeback.n_pending():
+        st.caption(f"{writeback.n_pending()} baris menunggu disimpan")
+    if writeback.conflicts:
+        st.warning(
+            "Perubahan berikut tidak disimpan karena barisnya sudah diubah pengguna lain; "
+            "muat ulang halaman untuk melihat data terbaru: "
+            + ", ".join(f"{name} baris {key}" for name, key in writeback.conflicts)
+        )
+
 with tab0:
     # === Prepare Data ===
-    df_inv = edited_data_inv
-    df_bpih = edited_data_bpih
-    df_inv['Maturity Date'] = pd.to_datetime(df_inv['Maturity Date'], errors='coerce')
-    df_inv['Nominal'] = pd.to_numeric(df_inv['Nominal'], errors='coerce')
-
-    df_filtered = df_inv[df_inv['Sumber Dana'] == 'PIH Reguler']
-
-    months = pd.date_range(start='2024-01-01', end='2025-12-31', freq='M')
-    results = []
-    for month in months:
-        one_year_later = month + pd.DateOffset(years=1)
-        total_nominal = df_filtered[
-            (df_filtered['Maturity Date'] >= month) &
-            (df_filtered['Maturity Date'] <= one_year_later)
-        ]['Nominal'].sum()
-        results.append({
-            'Date': month.strftime('%Y-%m-%d'),
-            'Short-Term Inv Nominal': total_nominal
-        })
-
-    df_short_term_nominal = pd.DataFrame(results)
-    df_short_term_nominal['Date'] = pd.to_datetime(df_short_term_nominal['Date'])
-
+    df_inv = prepare_investments(edited_data_inv)
     df_pnp = edited_data_pnp
-    df_lik = pd.merge(pd.merge(df_short_term_nominal, df_pnp, on='Date', how='outer'), df_bpih, on='Date', how='outer')
+    df_bpih = edited_data_bpih
 
-    df_lik['Date'] = pd.to_datetime(df_lik['Date'])
-    df_lik['Month'] = df_lik['Date'].dt.strftime('%b %Y')
-    df_lik['liquidity'] = (df_lik['Short-Term Inv Nominal'] + df_lik['Penempatan']) / df_lik['BPIH']
-    df_lik = df_lik.sort_values('Date')
-    df_lik['Ekses/Defisit'] = (df_lik['liquidity']-2.1)*df_lik['BPIH']
+    # Report date, chosen in the Maturity Profile tab (widget state is
+    # available here before the widget itself is drawn)
+    lik_months = liquidity_months(df_pnp, df_bpih)
+    default_report = DEFAULT_REPORT_DATE if DEFAULT_REPORT_DATE in lik_months else lik_months[-1]
+    report_date = st.session_state.get('report_date', default_report)
+
+    # Investment aggregates kept per session; edits in the Data tab only
+    # re-apply the rows that changed
+    if 'inv_book' not in st.session_state:
+        st.session_state['inv_book'] = IncrementalBook()
+    inv_book = st.session_state['inv_book'].sync(
+        df_inv, lik_months, report_date - MonthEnd(1)
+    )
+    # Monthly results come from the result store; only months whose inputs
+    # changed are computed again
+    df_lik = liquidity_history(inv_book.short_term_nominal(), df_pnp, df_bpih, workbook.sha256)
 
     # === Select Month ===
     col_select, col_empty = st.columns([1, 3])
-    today = pd.to_datetime("today").replace(day=1)
-    default_month = (today + MonthEnd(0)).strftime('%b %Y')
-
-    months = pd.date_range(start='2025-01-01', end='2025-12-31', freq='M')
-    month_options = [m.strftime('%b %Y') for m in months]
+    month_options, default_index = stored_month_options(df_lik.loc[df_lik['liquidity'].notna(), 'Date'])
 
     with col_select:
         selected_month_str = st.selectbox("Pilih bulan",
             month_options,
-            index=month_options.index(default_month) if default_month in month_options else 0, 
+            index=default_index,
             help="Angka LW di atas bulan sekarang masih bersifat proyeksi", label_visibility="visible"
         )
     with col_empty:
@@ -114,40 +154,15 @@ with tab0:
 
     # === Extract Metrics for Selected Month ===
     selected_date = pd.to_datetime(selected_month_str) + MonthEnd(0)
-    row = df_lik[df_lik['Date'] == selected_date]
 
-    # Find previous dates
-    prev_month = selected_date - MonthEnd(1)
-    prev_year = selected_date - pd.DateOffset(years=1)
-    prev_year = prev_year + MonthEnd(0)  # Normalize to EOM
+    # Current, MoM and YoY values for all tiles in one lookup
+    lik_store = MetricStore(df_lik, 'Date')
+    kpi = lik_store.kpis(selected_date, ['liquidity', 'Short-Term Inv Nominal', 'Penempatan', 'BPIH'])
+    curr_liq = kpi['liquidity']['curr']
+    curr_inv = kpi['Short-Term Inv Nominal']['curr']
+    curr_pnp = kpi['Penempatan']['curr']
+    curr_bpih = kpi['BPIH']['curr']
 
-    # Get current & previous values
-    def get_val(col, date):
-        val = df_lik[df_lik['Date'] == date][col]
-        return val.values[0] if not val.empty and pd.notnull(val.values[0]) else None
-    
-    # Current values
-    curr_liq = get_val('liquidity', selected_date)
-    curr_inv = get_val('Short-Term Inv Nominal', selected_date)
-    curr_pnp = get_val('Penempatan', selected_date)
-    curr_bpih = get_val('BPIH', selected_date)
-    
-    # Previous values
-    prev_liq_m = get_val('liquidity', prev_month)
-    prev_liq_y = get_val('liquidity', prev_year)
-    prev_inv_m = get_val('Short-Term Inv Nominal', prev_month)
-    prev_inv_y = get_val('Short-Term Inv Nominal', prev_year)
-    prev_pnp_m = get_val('Penempatan', prev_month)
-    prev_pnp_y = get_val('Penempatan', prev_year)
-    prev_bpih_m = get_val('BPIH', prev_month)
-    prev_bpih_y = get_val('BPIH', prev_year)
-    
-    # Format delta
-    def calc_delta(curr, prev):
-        if curr is None or prev is None or prev == 0:
-            return "-"
-        return f"{(curr - prev) / prev * 100:.2f}%"
-    
     # Format trillions
     def format_tril(val):
         return f"{val / 1e12:.2f} triliun" if val is not None else "-"
@@ -158,28 +173,28 @@ with tab0:
         st.metric(
             "🔥 Likuiditas Wajib",
             f"{curr_liq:.2f}x BPIH" if curr_liq is not None else "-",
-            f"{calc_delta(curr_liq, prev_liq_y)} YoY || {calc_delta(curr_liq, prev_liq_m)} MoM",
+            f"{kpi['liquidity']['delta_YoY']} YoY || {kpi['liquidity']['delta_MoM']} MoM",
             border=True, help = "Dihitung dari (Penempatan PIH Reguler + Investasi Jangka Pendek + Emas)/BPIH", label_visibility="visible"
         )
     with col2:
         st.metric(
             "📊 Investasi Jangka Pendek",
             format_tril(curr_inv),
-            f"{calc_delta(curr_inv, prev_inv_y)} YoY || {calc_delta(curr_inv, prev_inv_m)} MoM",
+            f"{kpi['Short-Term Inv Nominal']['delta_YoY']} YoY || {kpi['Short-Term Inv Nominal']['delta_MoM']} MoM",
             border=True
         )
     with col3:
         st.metric(
             "🟣 Penempatan PIH Reguler",
             format_tril(curr_pnp),
-            f"{calc_delta(curr_pnp, prev_pnp_y)} YoY || {calc_delta(curr_pnp, prev_pnp_m)} MoM",
+            f"{kpi['Penempatan']['delta_YoY']} YoY || {kpi['Penempatan']['delta_MoM']} MoM",
             border=True
         )
     with col4:
         st.metric(
             "📍 BPIH",
             format_tril(curr_bpih),
-            f"{calc_delta(curr_bpih, prev_bpih_y)} YoY",
+            f"{kpi['BPIH']['delta_YoY']} YoY",
             border=True
         )
 
@@ -195,63 +210,17 @@ with tab0:
         df_filtered['liquidity'] = (df_filtered['Short-Term Inv Nominal'] + df_filtered['Penempatan']) / df_filtered['BPIH']
         df_filtered = df_filtered.sort_values('Date')
 
-        fig = px.bar(df_filtered, x='Month', y='liquidity', text='liquidity')
-        fig.update_traces(texttemplate='%{text:.2f}', textposition='outside')
-        fig.update_layout(
-            title="Likuiditas Wajib (x BPIH)",
-            xaxis_title="Bulan",
-            yaxis_title="Likuiditas Wajib",
-            template="seaborn"
-        )
-        fig.add_shape(type="line", x0=0, x1=1, y0=2, y1=2, xref='paper', yref='y', line=dict(color="red", width=2, dash="dot"))
-        fig.add_annotation(xref='paper', x=1, y=2, text="2x BPIH", showarrow=False, font=dict(color="red"), yshift=10)
-    
-        st.plotly_chart(fig, use_container_width=True)
-    
-        # 4. Prepare columns
-        df_filtered['Ekses/Defisit'] = (df_filtered['liquidity']-2.1)*df_filtered['BPIH']
-        df_filtered['Ekses/Defisit (Miliar)'] = df_filtered['Ekses/Defisit'] / 1e9
-        df_filtered['color'] = df_filtered['Ekses/Defisit (Miliar)'].apply(lambda x: 'red' if x < 0 else 'blue')
-        df_filtered = df_filtered.sort_values('Date')
-    
-        # 5. Create bar chart
-        fig2 = px.bar(
-            df_filtered,
-            x='Month',
-            y='Ekses/Defisit (Miliar)',
-            text='Ekses/Defisit (Miliar)',
-            color='color',
-            color_discrete_map={'red': 'red', 'blue': 'blue'},
-            category_orders={'Month': df_filtered.sort_values('Date')['Month'].tolist()}
-        )
-
-    
-        fig2.update_traces(
-            texttemplate='%{text:.2f}',
-            textposition='outside'
-        )
-    
-        fig2.update_layout(
-            title=dict(
-                text="Ekses/Defisit Likuiditas", x=0.5, xanchor='center', font=dict(size=18)
-            ),
-            xaxis=dict(
-                title="Bulan",
-                tickangle=0
-            ),
-            yaxis_title="Ekses/Defisit (miliar)",
-            template="seaborn", showlegend=False
-        )
-    
-        # 6. Add dotted line
-        fig2.add_shape(
-            type="line",
-            x0=0, x1=1,
-            y0=2, y1=2,
-            xref='paper',
-            yref='y',
-            line=dict(color="black", width=1)
-        )
+        months = df_filtered['Month'].to_numpy()
+        liquidity = df_filtered['liquidity'].to_numpy(dtype=float)
+        st.plotly_chart(bar_chart(months, liquidity, "Likuiditas Wajib (x BPIH)", "Bulan", "Likuiditas Wajib",
+                                  hline=2, hline_text="2x BPIH"), use_container_width=True)
+    
+        # Ekses/Defisit against 2.1x BPIH, in miliar
+        ekses = (liquidity - 2.1) * df_filtered['BPIH'].to_numpy(dtype=float) / 1e9
+        fig2 = bar_chart(months, ekses,
+                         dict(text="Ekses/Defisit Likuiditas", x=0.5, xanchor='center', font=dict(size=18)),
+                         "Bulan", "Ekses/Defisit (miliar)", colors=np.where(ekses < 0, 'red', 'blue'),
+                         hline=2, hline_color="black")
         st.plotly_chart(fig2, use_container_width=True)
         
     # Layout: 1/4 for selectbox, 3/4 for plot
@@ -284,17 +253,15 @@ tab1.markdown(
     )
 with tab1:
     # === Select Month ===
-    col_select1, col_empty1 = st.columns([1, 3])
-    today = pd.to_datetime("today").replace(day=1)
-    default_month = (today + MonthEnd(0)).strftime('%b %Y')
+    df_sol = solvability_history(workbook.sheet("Solvabilitas"), workbook.sha256)
 
-    months = pd.date_range(start='2025-01-01', end='2025-12-31', freq='M')
-    month_options = [m.strftime('%b %Y') for m in months]
+    col_select1, col_empty1 = st.columns([1, 3])
+    month_options, default_index = stored_month_options(df_sol.loc[df_sol['Solvabilitas'].notna(), 'Bulan'])
 
     with col_select1:
         selected_month_str1 = st.selectbox("Pilih bulan",
             month_options,
-            index=month_options.index(default_month) if default_month in month_options else 0, 
+            index=default_index,
             key="month_selector_tab1"
         )
     with col_empty1:
@@ -303,46 +270,16 @@ with tab1:
     # === Extract Metrics for Selected Month ===
     selected_date1 = pd.to_datetime(selected_month_str1) + MonthEnd(0)
     #row = df_lik[df_lik['Date'] == selected_date1]
-    
-    df_sol = pd.read_excel(output, sheet_name="Solvabilitas")
-    df_sol['Solvabilitas'] = (df_sol['Aset'] - df_sol['Dana Kelolaan DAU']) / (df_sol['Liabilitas']+df_sol['Dana BPIH'])*100
-    df_sol['Bulan'] = pd.to_datetime(df_sol['Bulan']) + MonthEnd(0)
-
-    # Find previous dates
-    prev_month = selected_date1 - MonthEnd(1)
-    prev_year = selected_date1 - pd.DateOffset(years=1)
-    prev_year = prev_year + MonthEnd(0)  # Normalize to EOM
-
-    # Get current & previous values
-    def get_val(col, date):
-        val = df_sol[df_sol['Bulan'] == date][col]
-        return val.values[0] if not val.empty and pd.notnull(val.values[0]) else None
-    
-    # Current values
-    curr_ass = get_val('Aset', selected_date1)
-    curr_sol = get_val('Solvabilitas', selected_date1)
-    curr_liab = get_val('Liabilitas', selected_date1)
-    curr_dau = get_val('Dana Kelolaan DAU', selected_date1)
-    curr_bpih = get_val('Dana BPIH', selected_date1)
-    
-    # Previous values
-    prev_ass_m = get_val('Aset', prev_month)
-    prev_ass_y = get_val('Aset', prev_year)
-    prev_sol_m = get_val('Solvabilitas', prev_month)
-    prev_sol_y = get_val('Solvabilitas', prev_year)
-    prev_liab_m = get_val('Liabilitas', prev_month)
-    prev_liab_y = get_val('Liabilitas', prev_year)
-    prev_dau_m = get_val('Dana Kelolaan DAU', prev_month)
-    prev_dau_y = get_val('Dana Kelolaan DAU', prev_year)
-    prev_bpih_m = get_val('Dana BPIH', prev_month)
-    prev_bpih_y = get_val('Dana BPIH', prev_year)
-    
-    # Format delta
-    def calc_delta(curr, prev):
-        if curr is None or prev is None or prev == 0:
-            return "-"
-        return f"{(curr - prev) / prev * 100:.2f}%"
-    
+
+    # Current, MoM and YoY values for all tiles in one lookup
+    sol_store = MetricStore(df_sol, 'Bulan')
+    kpi = sol_store.kpis(selected_date1, ['Aset', 'Solvabilitas', 'Liabilitas', 'Dana Kelolaan DAU', 'Dana BPIH'])
+    curr_ass = kpi['Aset']['curr']
+    curr_sol = kpi['Solvabilitas']['curr']
+    curr_liab = kpi['Liabilitas']['curr']
+    curr_dau = kpi['Dana Kelolaan DAU']['curr']
+    curr_bpih = kpi['Dana BPIH']['curr']
+
     # Format trillions
     def format_tril(val):
         return f"{val / 1e12:.2f} triliun" if val is not None else "-"
@@ -353,7 +290,7 @@ with tab1:
         st.metric(
             "📊 Solvabilitas",
             f"{curr_sol:.2f}%" if curr_sol is not None else "-",
-            f"{calc_delta(curr_sol, prev_sol_y)} YoY || {calc_delta(curr_sol, prev_sol_m)} MoM",
+            f"{kpi['Solvabilitas']['delta_YoY']} YoY || {kpi['Solvabilitas']['delta_MoM']} MoM",
             border=True,
             help="Dihitung dari (Aset - Dana Kelolaan DAU)/(Liabilitas + Dana BPIH)",
             label_visibility="visible"
@@ -362,28 +299,28 @@ with tab1:
         st.metric(
             "🔥 Aset",
             format_tril(curr_ass),
-            f"{calc_delta(curr_ass, prev_ass_y)} YoY || {calc_delta(curr_ass, prev_ass_m)} MoM",
+            f"{kpi['Aset']['delta_YoY']} YoY || {kpi['Aset']['delta_MoM']} MoM",
             border=True
         )
     with col3:
         st.metric(
             "🟣 Liabilitas",
             format_tril(curr_liab),
-            f"{calc_delta(curr_liab, prev_liab_y)} YoY || {calc_delta(curr_liab, prev_liab_m)} MoM",
+            f"{kpi['Liabilitas']['delta_YoY']} YoY || {kpi['Liabilitas']['delta_MoM']} MoM",
             border=True
         )
     with col4:
         st.metric(
             "📍 Dana Kelolaan DAU",
             format_tril(curr_dau),
-            f"{calc_delta(curr_dau, prev_dau_y)} YoY || {calc_delta(curr_dau, prev_dau_m)} MoM",
+            f"{kpi['Dana Kelolaan DAU']['delta_YoY']} YoY || {kpi['Dana Kelolaan DAU']['delta_MoM']} MoM",
             border=True
         )
     with col5:
         st.metric(
             "📍 Dana BPIH",
             format_tril(curr_bpih),
-            f"{calc_delta(curr_bpih, prev_bpih_y)} YoY || {calc_delta(curr_bpih, prev_bpih_m)} MoM",
+            f"{kpi['Dana BPIH']['delta_YoY']} YoY || {kpi['Dana BPIH']['delta_MoM']} MoM",
             border=True
         )
         
@@ -397,17 +334,8 @@ with tab1:
         df_filtered['solvability'] = (df_filtered['Aset'] - df_filtered['Dana Kelolaan DAU']) / (df_filtered['Liabilitas']+df_filtered['Dana BPIH'])*100
         df_filtered = df_filtered.sort_values('Bulan')
 
-        fig = px.bar(df_filtered, x='Month', y='solvability', text='solvability')
-        fig.update_traces(texttemplate='%{text:.2f}', textposition='outside')
-        fig.update_layout(
-            title="Solvabilitas BPKH",
-            xaxis_title="Bulan",
-            yaxis_title="Solvabilitas (%)",
-            template="seaborn"
-        )
-        fig.add_shape(type="line", x0=0, x1=1, y0=100, y1=100, xref='paper', yref='y', line=dict(color="red", width=2, dash="dot"))
-        fig.add_annotation(xref='paper', x=1, y=100, text="100%", showarrow=False, font=dict(color="red"), yshift=10)
-    
+        fig = bar_chart(df_filtered['Month'].to_numpy(), df_filtered['solvability'].to_numpy(dtype=float),
+                        "Solvabilitas BPKH", "Bulan", "Solvabilitas (%)", hline=100, hline_text="100%")
         st.plotly_chart(fig, use_container_width=True)
     selected_month1 = pd.to_datetime(selected_month_str1).strftime('%Y-%m')
     plot_solvability_by_month(selected_month1)
@@ -417,280 +345,75 @@ tab2.markdown(
     unsafe_allow_html=True
 )  
 with tab2:
-    df_btl = pd.read_excel(output, sheet_name="Pembatalan")
-    df_berangkat = pd.read_excel(output, sheet_name="Keberangkatan")
-    
-    # Ensure proper datetime conversion
-    df_inv['Maturity Date'] = pd.to_datetime(df_inv['Maturity Date'], errors='coerce')
-    df_inv['Settlement Date'] = pd.to_datetime(df_inv['Settlement Date'], errors='coerce')
-    df_inv['Tanggal Jual'] = pd.to_datetime(df_inv['Tanggal Jual'], errors='coerce')
-    
-    # Drop rows with no Maturity Date and explicitly copy to avoid SettingWithCopyWarning
-    df_inv = df_inv.dropna(subset=['Maturity Date']).copy()
-    
-    # Extract Maturity Month safely
-    df_inv.loc[:, 'Maturity Month'] = df_inv['Maturity Date'].dt.to_period('M').dt.to_timestamp('M')
-    valid_dates = sorted(df_inv['Maturity Month'].unique())
-    
-    # Report reference
-    report_date = pd.Timestamp('2025-06-30')
-    perolehan_cutoff = report_date - MonthEnd(1)
-    
-    # Result holder
-    result = []
-    
-    for dt in valid_dates:
-        start_of_month = dt - MonthEnd(1)
-        end_of_month = dt
-    
-        # Common filter: maturity month & settlement cutoff & no sale
-        date_filter = (
-            (df_inv['Maturity Date'] > start_of_month) &
-            (df_inv['Maturity Date'] <= end_of_month) &
-            (df_inv['Settlement Date'] <= perolehan_cutoff) &
-            (df_inv['Tanggal Jual'].isna())
+    df_btl = workbook.sheet("Pembatalan")
+    df_berangkat = workbook.sheet("Keberangkatan")
+    
+    # Portfolio as held at the end of the month before the report date
+    report_options = list(lik_months)
+    col_report, col_model, col_rates = st.columns([1, 1, 2])
+    with col_report:
+        st.selectbox(
+            "Tanggal laporan",
+            report_options,
+            index=report_options.index(default_report),
+            format_func=lambda d: d.strftime('%d %b %Y'),
+            key="report_date"
         )
-    
-        # Filter for PIH Reguler
-        reguler = df_inv[(df_inv['Sumber Dana'] == "PIH Reguler") & date_filter]
-        idr_total = reguler[reguler['Ccy'] == "IDR"]['Nominal'].sum()
-        usd_total = reguler[reguler['Ccy'] == "USD"]['Nominal'].sum()
-    
-        # Filter for PIH Khusus
-        khusus = df_inv[(df_inv['Sumber Dana'] == "PIH Khusus") & date_filter]
-        usd_khusus_total = khusus[khusus['Ccy'] == "USD"]['Nominal'].sum()
-        sar_khusus_total = khusus[khusus['Ccy'] == "SAR"]['Nominal'].sum() / 3.75
-        total_khusus = usd_khusus_total + sar_khusus_total
-    
-        # Filter for DAU
-        khusus = df_inv[(df_inv['Sumber Dana'] == "DAU") & date_filter]
-        dau_total = khusus[khusus['Ccy'] == "IDR"]['Nominal'].sum()
-    
-        # Append result
-        result.append({
-            'Date': dt,
-            'Maturity Profile IDR': idr_total,
-            'Maturity Profile USD': usd_total,
-            'Maturity Profile Khusus': total_khusus,
-            'Maturity Profile DAU': dau_total
-        })
-    # Final DataFrame
-    df_maturity_profile = pd.DataFrame(result)
-    
-    # --- Sample Assumption ---
-    # df_btl must contain 'Bulan' (datetime), 'Reguler', 'Khusus'
-    
-    # Step 1: Filter rows with valid Reguler and Khusus
-    df_filtered = df_btl[
-        (df_btl['Reguler'] != 0) & (df_btl['Khusus'] != 0)
-    ].dropna(subset=['Reguler', 'Khusus'])
-    
-    # Step 2: Get last 12 valid entries
-    df_last12 = df_filtered.tail(12).copy().sort_values('Bulan')
-    
-    # Step 3: Prepare X and Y for both models
-    known_x = df_last12['Bulan'].dt.month.values.reshape(-1, 1)
-    known_y_reg = df_last12['Reguler'].values
-    known_y_khs = df_last12['Khusus'].values
-    
-    # Step 4: Train separate models
-    model_reg = LinearRegression()
-    model_khs = LinearRegression()
-    
-    model_reg.fit(known_x, known_y_reg)
-    model_khs.fit(known_x, known_y_khs)
-    
-    # Step 5: Determine the first zero-row after last non-zero data
-    last_non_zero_idx = df_btl[(df_btl['Reguler'] != 0) & (df_btl['Khusus'] != 0)].last_valid_index()
-    df_after = df_btl.loc[last_non_zero_idx + 1:] if last_non_zero_idx + 1 < len(df_btl) else pd.DataFrame()
-    
-    # Find first row where either Reguler or Khusus is zero
-    zero_start_row = df_after[
-        (df_after['Reguler'] == 0) | (df_after['Khusus'] == 0)
-    ].head(1)
-    
-    if not zero_start_row.empty:
-        start_date = pd.to_datetime(zero_start_row['Bulan'].values[0]).replace(day=1)
-    else:
-        # fallback if no zero row found after last valid
-        start_date = (df_btl['Bulan'].max() + pd.DateOffset(months=1)).replace(day=1)
-    
-    # Step 6: Create future dates
-    end_date = pd.Timestamp("2050-12-01")
-    future_dates = pd.date_range(start=start_date, end=end_date, freq="MS") + pd.offsets.MonthEnd(0)
-    
-    # Step 7: Predict
-    future_month_nums = future_dates.month.values.reshape(-1, 1)
-    
-    pred_reg = np.ceil(model_reg.predict(future_month_nums))
-    pred_khs = np.ceil(model_khs.predict(future_month_nums))
-    
-    # Step 8: Combine into DataFrame
-    df_pred = pd.DataFrame({
-        'bulan': future_dates,
-        'batal_reg': pred_reg,
-        'batal_khs': pred_khs
-    })
-
-    def compute_projection(df_pred, df_berangkat, wl_reg, wl_khs, saldo_reg, saldo_khs, sl_reg, sl_khs):
-        df_merged = pd.merge(
-            df_pred.copy(),
-            df_berangkat[['Bulan', 'brk_reg', 'brk_khs']].copy(),
-            left_on='bulan',
-            right_on='Bulan',
-            how='left'
-        ).drop(columns=['Bulan'])
-    
-        df_merged[['brk_reg', 'brk_khs']] = df_merged[['brk_reg', 'brk_khs']].fillna(0).astype(int)
-        df_merged['waiting_list_reg'] = 0
-        df_merged['waiting_list_khs'] = 0
-    
-        # ==== REGULER ====
-        proj_reg = df_merged.loc[0, 'batal_reg']
-        ber_reg = df_merged.loc[0, 'brk_reg']
-        wait_reg = max(0, wl_reg - proj_reg - ber_reg)
-        df_merged.loc[0, 'waiting_list_reg'] = wait_reg
-    
-        for i in range(1, len(df_merged)):
-            prev = df_merged.loc[i - 1, 'waiting_list_reg']
-            if prev == 0:
-                df_merged.loc[i:, ['waiting_list_reg', 'batal_reg', 'brk_reg']] = 0
-                break
-            proj = df_merged.loc[i, 'batal_reg']
-            ber = df_merged.loc[i, 'brk_reg']
-            rem = prev - proj
-            if ber > rem:
-                df_merged.loc[i, 'brk_reg'] = max(0, rem)
-            df_merged.loc[i, 'waiting_list_reg'] = max(0, prev - proj - df_merged.loc[i, 'brk_reg'])
-    
-        # ==== KHUSUS ====
-        proj_khs = df_merged.loc[0, 'batal_khs']
-        ber_khs = df_merged.loc[0, 'brk_khs']
-        wait_khs = max(0, wl_khs - proj_khs - ber_khs)
-        df_merged.loc[0, 'waiting_list_khs'] = wait_khs
-    
-        for i in range(1, len(df_merged)):
-            prev = df_merged.loc[i - 1, 'waiting_list_khs']
-            if prev == 0:
-                df_merged.loc[i:, ['waiting_list_khs', 'batal_khs', 'brk_khs']] = 0
-                break
-            proj = df_merged.loc[i, 'batal_khs']
-            ber = df_merged.loc[i, 'brk_khs']
-            rem = prev - proj
-            if ber > rem:
-                df_merged.loc[i, 'brk_khs'] = max(0, rem)
-            df_merged.loc[i, 'waiting_list_khs'] = max(0, prev - proj - df_merged.loc[i, 'brk_khs'])
-    
-            
-        # === Batal Value in Rupiah/Thousand USD ===
-        df_merged['batal_reg (IDR juta)'] = df_merged['batal_reg'] * saldo_reg
-        df_merged['batal_khs (USD ribu)'] = df_merged['batal_khs'] * saldo_khs
-        
-        # ==== Calculate BIPIH ====
-        cutoff_date = df_merged['bulan'].min() + pd.DateOffset(months=13)
-    
-        def calc_bipih_reg(row):
-            if row['bulan'] <= cutoff_date:
-                return (row['brk_reg'] * saldo_reg) + (sl_reg if row['brk_reg'] > 0 else 0)
-            else:
-                return row['brk_reg'] * saldo_reg
-    
-        def calc_bipih_khs(row):
-            if row['bulan'] <= cutoff_date:
-                return (row['brk_khs'] * saldo_khs) + (sl_khs if row['brk_khs'] > 0 else 0)
-            else:
-                return row['brk_khs'] * saldo_khs
-    
-        df_merged['bipih_reg'] = df_merged.apply(calc_bipih_reg, axis=1)
-        df_merged['bipih_khs'] = df_merged.apply(calc_bipih_khs, axis=1)
-    
-        return df_merged
-        
+    with col_model:
+        forecast_model = st.selectbox("Model proyeksi pembatalan", list(MODELS),
+                                      index=list(MODELS).index(DEFAULT_MODEL), format_func=MODEL_LABELS.get,
+                                      key="forecast_model")
+    with col_rates:
+        rates_csv = st.file_uploader("Kurs (CSV: Date, Ccy, Rate)", type="csv", key="rates_csv",
+                                     help="Menggantikan sheet 'Kurs' di workbook")
+
+    # Dated FX rates (uploaded CSV, else sheet 'Kurs'): USD holdings of PIH
+    # Reguler are converted to IDR at the rate of their month
+    rates = fx_rates(workbook, rates_csv)
+    missing_ccy = missing_rates(rates, df_inv.loc[df_inv['Sumber Dana'] == "PIH Reguler", 'Ccy'].dropna(), 'IDR')
+    if missing_ccy:
+        st.warning(
+            f"Kurs {', '.join(missing_ccy)}/IDR tidak tersedia (sheet 'Kurs' atau CSV kurs): jatuh tempo "
+            f"PIH Reguler dalam {', '.join(missing_ccy)} tidak dihitung pada aset, gap, LCR dan cash-flow harian."
+        )
+
+    # Maturity profile per month: Reguler IDR/USD, Khusus (USD + SAR in USD), DAU
+    df_maturity_profile = inv_book.maturity_profile()
+
+    # Cancellation forecast to 2050 from the Pembatalan history, shared by
+    # every session on the same workbook
+    forecast = shared_forecast(workbook, forecast_model)
+    df_pred = forecast['df_pred']
+
     # Sidebar input
     # Create two columns
     col1, col2, col3, col4 = st.columns(4)
     
     # === Row 1 ===
     with col1:
-        wl_reg = st.number_input("Initial Waiting List Reguler", value=5_299_092)
+        wl_reg = st.number_input("Initial Waiting List Reguler", value=DEFAULT_INPUTS['wl_reg'])
     with col2:
-        wl_khs = st.number_input("Initial Waiting List Khusus", value=126_577)
+        wl_khs = st.number_input("Initial Waiting List Khusus", value=DEFAULT_INPUTS['wl_khs'])
     with col3:
-        saldo_reg = st.number_input("Saldo Jemaah Reguler", value=26_837_630.65)
+        saldo_reg = st.number_input("Saldo Jemaah Reguler", value=DEFAULT_INPUTS['saldo_reg'])
     with col4:
-        saldo_khs = st.number_input("Saldo Jemaah Khusus", value=4_447.77)
+        saldo_khs = st.number_input("Saldo Jemaah Khusus", value=DEFAULT_INPUTS['saldo_khs'])
     
     # === Row 3 ===
     with col1:
-        sl_reg = st.number_input("Setoran Lunas Reguler", value=348_246_879_200.0)
+        sl_reg = st.number_input("Setoran Lunas Reguler", value=DEFAULT_INPUTS['sl_reg'])
     with col2:
-        sl_khs = st.number_input("Setoran Lunas Khusus", value=19_980_365.77)
+        sl_khs = st.number_input("Setoran Lunas Khusus", value=DEFAULT_INPUTS['sl_khs'])
     with col3:
-        pnp_reg = st.number_input("Penempatan Reguler", value=28_942_792_290_449.1)
+        pnp_reg = st.number_input("Penempatan Reguler", value=DEFAULT_INPUTS['pnp_reg'])
     with col4:
-        pnp_khs = st.number_input("Penempatan Khusus", value=378_282_969.67)
-
-    df_final = compute_projection(df_pred, df_berangkat, wl_reg=wl_reg, wl_khs=wl_khs, 
-                              saldo_reg=saldo_reg, saldo_khs=saldo_khs, sl_reg=sl_reg, sl_khs=sl_khs)
-
-    df_final['liab_bb_reg']=df_final['batal_reg (IDR juta)']+df_final['bipih_reg']
-    df_final['liab_bb_khs']=df_final['batal_khs (USD ribu)']+df_final['bipih_khs']
-    df_al_bb = pd.merge(df_final, df_maturity_profile, left_on='bulan', right_on='Date', how='left').drop(columns=['Date', 'Maturity Profile DAU'])
-    df_al_bb['Maturity Profile IDR'] = df_al_bb['Maturity Profile IDR'].fillna(0).astype('Int64')
-    df_al_bb['Maturity Profile USD'] = df_al_bb['Maturity Profile USD'].fillna(0).astype('Int64')
-    df_al_bb['Maturity Profile Khusus'] = df_al_bb['Maturity Profile Khusus'].fillna(0)
-    df_al_bb['jatuh_tempo_reg'] = df_al_bb['Maturity Profile IDR']+df_al_bb['Maturity Profile USD'] 
+        pnp_khs = st.number_input("Penempatan Khusus", value=DEFAULT_INPUTS['pnp_khs'])
 
-    buckets = [1, 3, 6, 12, 24, 36, 48, 60, 72, 84, 96, 108, 120]
+    df_final = shared_projection(workbook, forecast_model, wl_reg=wl_reg, wl_khs=wl_khs,
+                                 saldo_reg=saldo_reg, saldo_khs=saldo_khs, sl_reg=sl_reg, sl_khs=sl_khs)
+    df_matprof = liquidity_gap(df_final, df_maturity_profile, pnp_reg, pnp_khs, rates)
 
-    maturity_profile = []
-    
-    # Regular buckets
-    for i, bucket in enumerate(buckets):
-        lower = 0 if i == 0 else buckets[i - 1]
-        upper = bucket
-    
-        df_slice = df_al_bb.iloc[lower:upper]
-    
-        asset_reg = df_slice['jatuh_tempo_reg'].sum()
-        liability_reg = df_slice['liab_bb_reg'].sum()
-        asset_khs = df_slice['Maturity Profile Khusus'].sum()
-        liability_khs = df_slice['liab_bb_khs'].sum()
-    
-        # ➕ Add fund_placement only to first bucket
-        if i == 0:
-            asset_reg += pnp_reg
-            asset_khs += pnp_khs
-    
-        maturity_profile.append({
-            'waktu': f'{bucket} mo',
-            'asset_reg': asset_reg,
-            'liab_reg': liability_reg,
-            'asset_khs': asset_khs,
-            'liab_khs': liability_khs
-        })
-    
-    # ➕ Final "greater than" bucket
-    last_upper = buckets[-1]
-    df_tail = df_al_bb.iloc[last_upper:]
-    
-    asset_reg_tail_sum = df_tail['jatuh_tempo_reg'].sum()
-    liab_reg_tail_sum = df_tail['liab_bb_reg'].sum()
-    asset_khs_tail_sum = df_tail['Maturity Profile Khusus'].sum()
-    liab_khs_tail_sum = df_tail['liab_bb_khs'].sum()
-    
-    maturity_profile.append({
-        'waktu': f'>{last_upper} mo',
-        'asset_reg': asset_reg_tail_sum,
-        'liab_reg': liab_reg_tail_sum,
-        'asset_khs': asset_khs_tail_sum,
-        'liab_khs': liab_khs_tail_sum
-    })
-    
-    # Convert to DataFrame
-    df_matprof = pd.DataFrame(maturity_profile)
-
-    def format_bucket(bucket_str):
+    def format_profile_bucket(bucket_str):
         # Convert string like "12 mo" or ">36 mo"
         if ">" in bucket_str:
             num = int(bucket_str.replace('>','').replace(' mo',''))
@@ -702,300 +425,387 @@ with tab2:
             else:
                 return f'{num // 12} year'
 
+    def format_bucket(bucket):
+        if '>' in bucket:
+            num = int(bucket.replace('>','').replace(' mo',''))
+            return f'> Year {num // 12}'
+        elif 'year' in bucket.lower():
+            return bucket
+        elif 'mo' in bucket.lower():
+            num = int(bucket.replace(' mo',''))
+            return f'{num} Mo' if num < 12 else f'Year {num // 12}'
+        return bucket
+
+    # Bucket arrays once, in ladder order; the charts below only slice them
+    waktu = df_matprof['waktu'].to_numpy()
+    profile_labels = np.array([format_profile_bucket(w) for w in waktu])
+    gap_labels = np.array([format_bucket(w) for w in waktu])
+    gap_arrays = {col: df_matprof[col].to_numpy(dtype=float) for col in
+                  ['asset_reg', 'liab_reg', 'gap_reg', 'cumulative_reg',
+                   'asset_khs', 'liab_khs', 'gap_khs', 'cumulative_khs']}
+
     col1, col2 = st.columns(2)
     with col1:
-        # Apply the formatter
-        df_plot = df_matprof.copy()
-        df_plot['waktu'] = df_plot['waktu'].apply(format_bucket)
-        
-        # ---- Step 2: Scale values to Trillions ----
-        df_plot['asset_reg'] = df_plot['asset_reg'] / 1_000_000_000_000
-        df_plot['liab_reg'] = df_plot['liab_reg'] / 1_000_000_000_000
-        
-        # ---- Step 3: Melt data for Plotly ----
-        df_melted = df_plot.melt(id_vars='waktu', value_vars=['asset_reg', 'liab_reg'],
-                                 var_name='Type', value_name='Value')
-    
-        # ---- Step 3.5: Rename Type for legend ----
-        df_melted['Type'] = df_melted['Type'].replace({'asset_reg': 'Asset', 'liab_reg': 'Liability'})
-        # ---- Step 4: Create Bar Chart ----
-        fig = px.bar(df_melted,
-                     x='waktu',
-                     y='Value',
-                     color='Type',
-                     barmode='group',
-                     text='Value',
-                     labels={'Value': 'Nominal (T)', 'Bucket': 'Time Bucket'},
-                     title= 'Asset vs Liability by Maturity Profile (in Trillions)')
-        
-        # ---- Step 5: Final styling ----
-        fig.update_traces(texttemplate='%{text:.2f}', textposition='outside')
-        
-        fig.update_layout(
-            title={
-                'text': 'Maturity Profile Dana PIH Reguler',
-                'x': 0.5,
-                'xanchor': 'center'
-            },
-            xaxis_title='Maturity Profile',
-            yaxis_title='Nominal (triliun)',
-            yaxis_tickformat=',.2f',
-            bargap=0.2,
-            template='plotly_white',
-        
-            # ✅ Legend styling (no "Type" title, centered on top)
-            legend_title_text='',
-            legend=dict(orientation='h', yanchor='bottom', y=1.02, xanchor='center', x=0.5)
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        scale = 1_000_000_000_000
+        st.plotly_chart(grouped_bars(
+            profile_labels,
+            (('Asset', gap_arrays['asset_reg'] / scale), ('Liability', gap_arrays['liab_reg'] / scale)),
+            'Maturity Profile Dana PIH Reguler', 'Maturity Profile', 'Nominal (triliun)'
+        ), use_container_width=True)
+        st.plotly_chart(gap_chart(gap_labels, gap_arrays['gap_reg'] / scale, gap_arrays['cumulative_reg'] / scale,
+                                  'Liquidity Gap Dana PIH Reguler', 5), use_container_width=True)
 
-        # --- Format + Order Fixes ---
-        df_matprof['gap_reg']=df_matprof['asset_reg']-df_matprof['liab_reg']
-        df_matprof['cumulative_reg'] = df_matprof['gap_reg'].cumsum()
-        df_matprof['gap_khs']=df_matprof['asset_khs']-df_matprof['liab_khs']
-        df_matprof['cumulative_khs'] = df_matprof['gap_khs'].cumsum()
-        df_plot = df_matprof.copy()
-        df_plot['gap_reg'] = df_plot['gap_reg'] / 1_000_000_000_000
-        df_plot['cumulative_reg'] = df_plot['cumulative_reg'] / 1_000_000_000_000
-        
-        # Format bucket
-        def format_bucket(bucket):
-            if '>' in bucket:
-                num = int(bucket.replace('>','').replace(' mo',''))
-                return f'> Year {num // 12}'
-            elif 'year' in bucket.lower():
-                return bucket
-            elif 'mo' in bucket.lower():
-                num = int(bucket.replace(' mo',''))
-                return f'{num} Mo' if num < 12 else f'Year {num // 12}'
-            return bucket
-        
-        df_plot['waktu'] = df_plot['waktu'].apply(format_bucket)
-        
-        # Set correct order
-        bucket_order = ['1 Mo', '3 Mo', '6 Mo', 'Year 1', 'Year 2', 'Year 3', 'Year 4',
-                        'Year 5', 'Year 6', 'Year 7', 'Year 8', 'Year 9', 'Year 10', '> Year 10']
-        df_plot['waktu'] = pd.Categorical(df_plot['waktu'], categories=bucket_order, ordered=True)
-        df_plot = df_plot.sort_values('waktu')
-        
-        # Color logic
-        bar_colors = df_plot['gap_reg'].apply(
-            lambda x: 'rgb(31, 78, 121)' if x >= 0 else 'rgb(192, 0, 0)'
-        )
-        
-        # === Plot ===
-        fig1 = go.Figure()
+    with col2:
+        # Buckets where both asset and liability are zero are left out (this
+        # column labels the profile buckets like the gap chart)
+        scale = 1_000_000
+        shown = ~((gap_arrays['asset_khs'] == 0) & (gap_arrays['liab_khs'] == 0))
+        st.plotly_chart(grouped_bars(
+            gap_labels[shown],
+            (('Asset', gap_arrays['asset_khs'][shown] / scale), ('Liability', gap_arrays['liab_khs'][shown] / scale)),
+            'Maturity Profile Dana PIH Khusus', 'Maturity Profile', 'Nominal (triliun)'
+        ), use_container_width=True)
+        st.plotly_chart(gap_chart(gap_labels[shown], gap_arrays['gap_khs'][shown] / scale,
+                                  gap_arrays['cumulative_khs'][shown] / scale, 'Liquidity Gap Dana PIH Khusus', 25),
+                        use_container_width=True)
         
-        # ✅ 1. Cumulative Gap: filled area on y-axis
-        fig1.add_trace(go.Scatter(
-            x=df_plot['waktu'],
-            y=df_plot['cumulative_reg'],
-            name='Cumulative Gap',
-            fill='tozeroy',
-            mode='lines',
-            line=dict(width=0),
-            fillcolor='rgba(255, 193, 7, 0.4)',  # yellow
-            hoverinfo='y',
-            yaxis='y'
+        #st.write("Update Matprof:")
+        #edited_data_pnp = st.data_editor(
+            #df_matprof,
+            #use_container_width=True,
+            #num_rows="dynamic",
+        #)
+
+    # === Daily Cash-flow Ladder ===
+    st.markdown("<h2 style='font-size:20px;'>📆 Cash-flow Ladder Harian</h2>", unsafe_allow_html=True)
+    pay_options = {"Tersebar dalam bulan": None, "Tanggal 1": 1, "Tanggal 15": 15, "Akhir bulan": 31}
+    col_d1, col_d2, col_d3, col_d4 = st.columns(4)
+    with col_d1:
+        daily_segment = st.radio("Dana", ["PIH Reguler", "PIH Khusus"], horizontal=True, key="daily_segment")
+    with col_d2:
+        daily_pay = st.selectbox("Pembayaran batal & BIPIH", list(pay_options), key="daily_pay")
+    with col_d3:
+        daily_coupon = st.checkbox("Termasuk kupon", value=True, key="daily_coupon")
+    with col_d4:
+        daily_tenor = st.selectbox("Tenor penempatan (bulan)", [1, 3, 6, 12], key="daily_tenor")
+        daily_rollover = st.slider("Rollover penempatan (%)", 0, 100, 0, step=10, key="daily_rollover")
+
+    # Coupon / principal schedules per instrument, kept per session so only
+    # edited instruments are expanded again
+    if 'schedules' not in st.session_state:
+        st.session_state['schedules'] = ScheduleCache()
+    df_schedule = st.session_state['schedules'].get(df_inv) if daily_coupon else None
+
+    daily_seg = 'reg' if daily_segment == "PIH Reguler" else 'khs'
+    daily_scale = 1_000_000_000_000 if daily_seg == 'reg' else 1_000_000
+    daily_unit = 'triliun' if daily_seg == 'reg' else 'USD miliar'
+    df_daily, df_daily_month = daily_cashflow(df_inv, df_final, report_date,
+                                              pnp_reg if daily_seg == 'reg' else pnp_khs,
+                                              daily_seg, rates, pay_options[daily_pay], df_schedule,
+                                              daily_tenor, daily_rollover / 100)
+
+    # The daily line is downsampled to the chart width; month markers are exact
+    daily_months = df_daily_month['bulan'].to_numpy()
+    fig_daily = line_chart(
+        (('Posisi Kumulatif Harian', df_daily['Date'].to_numpy(), df_daily['cumulative'].to_numpy() / daily_scale,
+          'lines', BLUE),
+         ('Akhir Bulan', daily_months, df_daily_month['cumulative'].to_numpy() / daily_scale, 'markers', YELLOW),
+         ('Terendah dalam Bulan', daily_months, df_daily_month['min_cumulative'].to_numpy() / daily_scale,
+          'markers', RED)),
+        f"Posisi Kas Kumulatif Harian Dana {daily_segment} ({daily_unit})", "Tanggal", f"Nominal ({daily_unit})"
+    )
+    st.plotly_chart(fig_daily, use_container_width=True)
+
+    # === Tabel Proyeksi ===
+    # Filter, sort and paging run on the server over the cached frames; only
+    # the visible page is sent to the browser
+    st.markdown("<h2 style='font-size:20px;'>📋 Tabel Proyeksi</h2>", unsafe_allow_html=True)
+    tables = {
+        "Proyeksi Waiting List": lambda: df_final,
+        "Asset & Liability Bulanan": lambda: asset_liability(df_final, df_maturity_profile, rates),
+        f"Cash-flow Harian {daily_segment}": lambda: df_daily,
+    }
+    col_t1, col_t2, col_t3, col_t4 = st.columns(4)
+    with col_t1:
+        table_name = st.selectbox("Tabel", list(tables), key="tbl_name")
+    view = table_view(tables[table_name]())
+    with col_t2:
+        tbl_sort = st.selectbox("Urutkan", ["(urutan asli)"] + view.columns, key="tbl_sort")
+        tbl_desc = st.toggle("Menurun", key="tbl_desc")
+    with col_t3:
+        tbl_filter = st.selectbox("Filter kolom", ["(tanpa filter)"] + view.columns, key="tbl_filter")
+        tbl_op = st.selectbox("Operator", OPERATORS, key="tbl_op", label_visibility="collapsed")
+    with col_t4:
+        tbl_value = st.text_input("Nilai filter", key="tbl_value")
+        tbl_size = st.selectbox("Baris per halaman", PAGE_SIZES, key="tbl_size")
+
+    filters = ((tbl_filter, tbl_op, tbl_value),) if tbl_filter in view.columns and tbl_value else ()
+    sort = ((tbl_sort, not tbl_desc),) if tbl_sort in view.columns else ()
+    try:
+        positions = view.query(filters, sort)
+    except (ValueError, TypeError):
+        st.warning(f"Nilai filter '{tbl_value}' tidak sesuai dengan kolom {tbl_filter}.")
+        positions = view.query((), sort)
+
+    n_pages = view.n_pages(positions, tbl_size)
+    if st.session_state.get('tbl_page', 1) > n_pages:
+        st.session_state['tbl_page'] = 1
+    col_p1, col_p2 = st.columns([1, 3])
+    with col_p1:
+        tbl_page = st.number_input("Halaman", min_value=1, max_value=n_pages, step=1, key="tbl_page")
+    with col_p2:
+        first = (tbl_page - 1) * tbl_size
+        st.caption(f"Baris {min(first + 1, len(positions)):,}–{min(first + tbl_size, len(positions)):,} "
+                   f"dari {len(positions):,} (total {view.n_rows:,}) · halaman {tbl_page} dari {n_pages}")
+    st.dataframe(view.page(positions, tbl_page, tbl_size), use_container_width=True)
+
+    # === Liquidity Gap per Mata Uang ===
+    st.markdown("<h2 style='font-size:20px;'>💱 Liquidity Gap per Mata Uang</h2>", unsafe_allow_html=True)
+    if rates is None:
+        st.info("Sheet 'Kurs' (Date, Ccy, Rate) tidak ada di workbook dan CSV kurs belum diunggah: "
+                "gap per mata uang tidak tersedia.")
+    else:
+        col_f1, col_f2 = st.columns(2)
+        with col_f1:
+            fx_currency = st.selectbox("Mata uang laporan", currencies(rates), key="fx_currency")
+        with col_f2:
+            fx_shock = st.slider("Shock USD/IDR (±%)", 0, 30, 10, step=5, key="fx_shock") / 100
+
+        # Base, USD weaker and USD stronger in one batched conversion (SAR
+        # follows USD through its peg)
+        fx_moves = [0.0, -fx_shock, fx_shock]
+        fx_names = ["Kurs dasar", f"USD -{fx_shock:.0%}", f"USD +{fx_shock:.0%}"]
+        df_fx = fx_gap(df_inv, df_final, report_date, pnp_reg, pnp_khs, rates, (fx_currency,),
+                       shock_grid(fx_moves, ccys=('USD', 'SAR')))
+        df_fx = df_fx[df_fx['segment'] == 'total']
+        fx_scale = 1_000_000_000_000 if fx_currency == 'IDR' else 1_000_000
+        fx_unit = 'triliun' if fx_currency == 'IDR' else f'{fx_currency} juta'
+
+        fx_traces = []
+        for scenario, (name, color) in enumerate(zip(fx_names, [BLUE, RED, YELLOW])):
+            df_s = df_fx[df_fx['scenario'] == scenario]
+            fx_traces.append((name, np.array([format_bucket(w) for w in df_s['waktu']]),
+                              df_s['cumulative'].to_numpy() / fx_scale, 'lines+markers', color))
+        fig_fx = line_chart(tuple(fx_traces), f"Cumulative Gap PIH Reguler + Khusus dalam {fx_currency} ({fx_unit})",
+                            "Waktu", f"Cumulative Gap ({fx_unit})")
+        st.plotly_chart(fig_fx, use_container_width=True)
+
+    # === Sensitivity Analysis ===
+    st.markdown("<h2 style='font-size:20px;'>🎯 Analisis Sensitivitas Liquidity Gap</h2>", unsafe_allow_html=True)
+    base_params = dict(wl_reg=wl_reg, wl_khs=wl_khs, saldo_reg=saldo_reg, saldo_khs=saldo_khs,
+                       sl_reg=sl_reg, sl_khs=sl_khs, pnp_reg=pnp_reg, pnp_khs=pnp_khs)
+    sens_inputs = scenario_inputs(df_pred, df_berangkat, df_maturity_profile, rates)
+    param_labels = {
+        'wl_reg': 'Waiting List Reguler', 'wl_khs': 'Waiting List Khusus',
+        'saldo_reg': 'Saldo Jemaah Reguler', 'saldo_khs': 'Saldo Jemaah Khusus',
+        'sl_reg': 'Setoran Lunas Reguler', 'sl_khs': 'Setoran Lunas Khusus',
+        'pnp_reg': 'Penempatan Reguler', 'pnp_khs': 'Penempatan Khusus',
+    }
+
+    col_s1, col_s2, col_s3 = st.columns(3)
+    with col_s1:
+        sens_segment = st.radio("Dana", ["PIH Reguler", "PIH Khusus"], horizontal=True, key="sens_segment")
+    with col_s2:
+        sens_bucket = st.selectbox("Cumulative gap pada bucket", bucket_labels(), index=3,
+                                   format_func=format_bucket, key="sens_bucket")
+    with col_s3:
+        sens_shock = st.slider("Perubahan parameter (±%)", 1, 50, 10, key="sens_shock") / 100
+
+    seg = 'reg' if sens_segment == "PIH Reguler" else 'khs'
+    scale = 1_000_000_000_000 if seg == 'reg' else 1_000_000
+    unit = 'triliun' if seg == 'reg' else 'USD miliar'
+
+    col1, col2 = st.columns(2)
+    with col1:
+        # Tornado: one batched evaluation of base + low/high per parameter
+        df_tornado = tornado(sens_inputs, base_params, seg, sens_bucket, sens_shock)
+        df_tornado['label'] = df_tornado['param'].map(param_labels)
+
+        fig_tornado = go.Figure()
+        fig_tornado.add_trace(go.Bar(
+            y=df_tornado['label'], x=df_tornado['low'] / scale, orientation='h',
+            name=f'-{sens_shock:.0%}', marker=dict(color='rgb(192, 0, 0)')
         ))
-        
-        # ✅ 2. Liquidity Gap bars: use y2 so they’re on top
-        fig1.add_trace(go.Bar(
-            x=df_plot['waktu'],
-            y=df_plot['gap_reg'],
-            name='Gap',
-            marker=dict(color=bar_colors),
-            text=df_plot['gap_reg'].round(1),
-            textposition='outside',
-            yaxis='y2'
+        fig_tornado.add_trace(go.Bar(
+            y=df_tornado['label'], x=df_tornado['high'] / scale, orientation='h',
+            name=f'+{sens_shock:.0%}', marker=dict(color='rgb(31, 78, 121)')
         ))
-        
-        
-        # Calculate global y range
-        ymin = min(df_plot['gap_reg'].min(), df_plot['cumulative_reg'].min())
-        ymax = max(df_plot['gap_reg'].max(), df_plot['cumulative_reg'].max())
-        
-        # Update layout with synced axis
-        fig1.update_layout(
-            title='Liquidity Gap Dana PIH Reguler',
-            xaxis=dict(title='Maturity Bucket'),
-            yaxis=dict(
-                title='Nominal (T)',
-                showgrid=False,
-                zeroline=True,
-                range=[ymin - 5, ymax + 5]  # adjust padding if needed
-            ),
-            yaxis2=dict(
-                overlaying='y',
-                side='left',
-                showticklabels=False,
-                showgrid=False,
-                range=[ymin - 5, ymax + 5]  # force same scale
-            ),
+        fig_tornado.update_layout(
+            title=f'Tornado: Δ Cumulative Gap {format_bucket(sens_bucket)}',
+            xaxis_title=f'Δ Cumulative Gap ({unit})',
             barmode='overlay',
-            bargap=0.3,
-            template='plotly_white',
+            template=light_template(),
             legend_title_text='',
-            legend=dict(
-                orientation='h',
-                yanchor='bottom',
-                y=1.02,
-                xanchor='center',
-                x=0.5
-            )
+            legend=dict(orientation='h', yanchor='bottom', y=1.02, xanchor='center', x=0.5)
         )
-        st.plotly_chart(fig1, use_container_width=True)
+        st.plotly_chart(fig_tornado, use_container_width=True)
 
     with col2:
-        # Apply the formatter
-        df_plot = df_matprof.copy()
-        df_plot['waktu'] = df_plot['waktu'].apply(format_bucket)
-        
-        # ---- Step 2: Scale values to Trillions ----
-        df_plot['asset_khs'] = df_plot['asset_khs'] / 1_000_000
-        df_plot['liab_khs'] = df_plot['liab_khs'] / 1_000_000
-        
-        # ---- Step 2.5: Remove rows where both asset and liability are zero ----
-        df_plot = df_plot[~((df_plot['asset_khs'] == 0) & (df_plot['liab_khs'] == 0))].copy()
-        
-        # ---- Step 3: Melt data for Plotly ----
-        df_melted = df_plot.melt(id_vars='waktu', value_vars=['asset_khs', 'liab_khs'],
-                                 var_name='Type', value_name='Value')
-    
-        # ---- Step 3.5: Rename Type for legend ----
-        df_melted['Type'] = df_melted['Type'].replace({'asset_khs': 'Asset', 'liab_khs': 'Liability'})
-        # ---- Step 4: Create Bar Chart ----
-        fig = px.bar(df_melted,
-                     x='waktu',
-                     y='Value',
-                     color='Type',
-                     barmode='group',
-                     text='Value',
-                     labels={'Value': 'Nominal (T)', 'Bucket': 'Time Bucket'},
-                     title= 'Asset vs Liability by Maturity Profile (in Trillions)')
-        
-        # ---- Step 5: Final styling ----
-        fig.update_traces(texttemplate='%{text:.2f}', textposition='outside')
-        
-        fig.update_layout(
-            title={
-                'text': 'Maturity Profile Dana PIH Khusus',
-                'x': 0.5,
-                'xanchor': 'center'
-            },
-            xaxis_title='Maturity Profile',
-            yaxis_title='Nominal (triliun)',
-            yaxis_tickformat=',.2f',
-            bargap=0.2,
-            template='plotly_white',
-        
-            # ✅ Legend styling (no "Type" title, centered on top)
+        # Heatmap: steps x steps grid of two parameters in one batched evaluation
+        seg_params = SEGMENT_PARAMS[seg]
+        col_x, col_y = st.columns(2)
+        with col_x:
+            heat_x = st.selectbox("Sumbu X", seg_params, index=0, format_func=param_labels.get, key="heat_x")
+        with col_y:
+            heat_y = st.selectbox("Sumbu Y", [p for p in seg_params if p != heat_x], index=0,
+                                  format_func=param_labels.get, key="heat_y")
+
+        df_heat = heatmap(sens_inputs, base_params, seg, sens_bucket, heat_x, heat_y, sens_shock)
+        fig_heat = heatmap_chart(df_heat.to_numpy() / scale, df_heat.columns.to_numpy(), df_heat.index.to_numpy(),
+                                 f'Cumulative Gap {format_bucket(sens_bucket)} ({unit})',
+                                 param_labels[heat_x], param_labels[heat_y], unit)
+        st.plotly_chart(fig_heat, use_container_width=True)
+
+    # === Monte Carlo Stress Test Pembatalan ===
+    st.markdown("<h2 style='font-size:20px;'>🎲 Stress Test Pembatalan (Monte Carlo)</h2>", unsafe_allow_html=True)
+    with st.form("mc_form"):
+        col_m1, col_m2, col_m3, col_m4 = st.columns(4)
+        with col_m1:
+            mc_paths = st.number_input("Jumlah path", min_value=1_000, max_value=200_000, value=20_000, step=5_000)
+        with col_m2:
+            mc_seed = st.number_input("Seed", min_value=0, value=0, step=1)
+        with col_m3:
+            mc_brk_sd = st.slider("Deviasi keberangkatan (±%)", 0, 20, 0) / 100
+        with col_m4:
+            mc_method = st.selectbox("Distribusi residual", ["bootstrap", "normal"])
+        run_mc = st.form_submit_button("Jalankan Simulasi")
+
+    mc_key = (tuple(base_params.values()), mc_paths, mc_seed, mc_brk_sd, mc_method)
+    if run_mc:
+        st.session_state['mc_key'] = mc_key
+
+    if st.session_state.get('mc_key') == mc_key:
+        with st.spinner("Menjalankan simulasi..."):
+            df_tail = stress_test(sens_inputs, base_params, forecast, int(mc_paths), int(mc_seed), mc_brk_sd, mc_method)
+        df_tail = df_tail[(df_tail['segment'] == seg) & (df_tail['measure'] == 'cumulative')].copy()
+        df_tail['waktu'] = df_tail['waktu'].apply(format_bucket)
+
+        fig_mc = go.Figure()
+        fig_mc.add_trace(go.Bar(
+            x=df_tail['waktu'], y=df_tail['mean'] / scale, name='Rata-rata',
+            marker=dict(color='rgb(31, 78, 121)')
+        ))
+        for level, color in (('worst_95%', 'rgb(255, 193, 7)'), ('worst_99%', 'rgb(192, 0, 0)')):
+            fig_mc.add_trace(go.Scatter(
+                x=df_tail['waktu'], y=df_tail[level] / scale, mode='lines+markers',
+                name=level.replace('worst_', 'Worst '), line=dict(color=color)
+            ))
+        fig_mc.update_layout(
+            title=f'Cumulative Gap {sens_segment}: Rata-rata vs Worst Case ({unit})',
+            xaxis_title='Maturity Bucket',
+            yaxis_title=f'Nominal ({unit})',
+            template=light_template(),
             legend_title_text='',
             legend=dict(orientation='h', yanchor='bottom', y=1.02, xanchor='center', x=0.5)
         )
-        st.plotly_chart(fig, use_container_width=True)
-
-        # --- Format + Order Fixes ---
-        df_plot = df_matprof.copy()
-        df_plot['gap_khs'] = df_plot['gap_khs'] / 1_000_000
-        df_plot['cumulative_khs'] = df_plot['cumulative_khs'] / 1_000_000
-        # ---- Step 2.5: Remove rows where both asset and liability are zero ----
-        df_plot = df_plot[~((df_plot['asset_khs'] == 0) & (df_plot['liab_khs'] == 0))].copy()
-        
-        # Format bucket
-        def format_bucket(bucket):
-            if '>' in bucket:
-                num = int(bucket.replace('>','').replace(' mo',''))
-                return f'> Year {num // 12}'
-            elif 'year' in bucket.lower():
-                return bucket
-            elif 'mo' in bucket.lower():
-                num = int(bucket.replace(' mo',''))
-                return f'{num} Mo' if num < 12 else f'Year {num // 12}'
-            return bucket
-        
-        df_plot['waktu'] = df_plot['waktu'].apply(format_bucket)
-        
-        # Set correct order
-        bucket_order = ['1 Mo', '3 Mo', '6 Mo', 'Year 1', 'Year 2', 'Year 3', 'Year 4',
-                        'Year 5', 'Year 6', 'Year 7', 'Year 8', 'Year 9', 'Year 10', '> Year 10']
-        df_plot['waktu'] = pd.Categorical(df_plot['waktu'], categories=bucket_order, ordered=True)
-        df_plot = df_plot.sort_values('waktu')
-        
-        # Color logic
-        bar_colors = df_plot['gap_khs'].apply(
-            lambda x: 'rgb(31, 78, 121)' if x >= 0 else 'rgb(192, 0, 0)'
-        )
-        
-        # === Plot ===
-        fig1 = go.Figure()
-        
-        # ✅ 1. Cumulative Gap: filled area on y-axis
-        fig1.add_trace(go.Scatter(
-            x=df_plot['waktu'],
-            y=df_plot['cumulative_khs'],
-            name='Cumulative Gap',
-            fill='tozeroy',
-            mode='lines',
-            line=dict(width=0),
-            fillcolor='rgba(255, 193, 7, 0.4)',  # yellow
-            hoverinfo='y',
-            yaxis='y'
-        ))
-        
-        # ✅ 2. Liquidity Gap bars: use y2 so they’re on top
-        fig1.add_trace(go.Bar(
-            x=df_plot['waktu'],
-            y=df_plot['gap_khs'],
-            name='Gap',
-            marker=dict(color=bar_colors),
-            text=df_plot['gap_khs'].round(1),
-            textposition='outside',
-            yaxis='y2'
-        ))
-        
-        
-        # Calculate global y range
-        ymin = min(df_plot['gap_khs'].min(), df_plot['cumulative_khs'].min())
-        ymax = max(df_plot['gap_khs'].max(), df_plot['cumulative_khs'].max())
-        
-        # Update layout with synced axis
-        fig1.update_layout(
-            title='Liquidity Gap Dana PIH Khusus',
-            xaxis=dict(title='Maturity Bucket'),
-            yaxis=dict(
-                title='Nominal (T)',
-                showgrid=False,
-                zeroline=True,
-                range=[ymin - 25, ymax + 25]  # adjust padding if needed
-            ),
-            yaxis2=dict(
-                overlaying='y',
-                side='left',
-                showticklabels=False,
-                showgrid=False,
-                range=[ymin - 25, ymax + 25]  # force same scale
-            ),
-            barmode='overlay',
-            bargap=0.3,
-            template='plotly_white',
+        st.plotly_chart(fig_mc, use_container_width=True)
+        st.dataframe(df_tail.drop(columns=['segment', 'measure']), use_container_width=True, hide_index=True)
+
+    # === Backtest model pembatalan ===
+    st.markdown("<h2 style='font-size:20px;'>🔮 Backtest Model Proyeksi Pembatalan</h2>", unsafe_allow_html=True)
+    col_b1, col_b2 = st.columns([1, 3])
+    with col_b1:
+        bt_horizon = st.number_input("Horizon (bulan)", min_value=1, max_value=36, value=12, step=1, key="bt_horizon")
+        run_bt = st.button("Jalankan Backtest")
+
+    # Runs on a background thread: the page stays usable and the panel below
+    # polls the result until it is ready
+    bt_key = (int(bt_horizon), len(df_btl), int(pd.util.hash_pandas_object(df_btl, index=False).sum()))
+    if run_bt and st.session_state.get('bt_key') != bt_key:
+        st.session_state['bt_key'] = bt_key
+        st.session_state['bt_future'] = start_backtest(df_btl, int(bt_horizon))
+
+    bt_future = st.session_state.get('bt_future') if st.session_state.get('bt_key') == bt_key else None
+
+    @st.fragment(run_every=2 if bt_future is not None and not bt_future.done() else None)
+    def backtest_panel():
+        if bt_future is None:
+            st.caption("Rolling-origin backtest semua model pada riwayat Pembatalan.")
+            return
+        if not bt_future.done():
+            st.info("Backtest sedang berjalan...")
+            return
+        if st.session_state.get('bt_polling'):
+            # Finished while polling: one full rerun stops the timer
+            st.session_state['bt_polling'] = False
+            st.rerun()
+        try:
+            bt_results = bt_future.result()
+        except ValueError as e:
+            st.warning(f"Backtest tidak dapat dijalankan: {e}")
+            return
+
+        bt_segment = st.radio("Dana", ["PIH Reguler", "PIH Khusus"], horizontal=True, key="bt_segment")
+        df_bt, df_scores = bt_results['reg' if bt_segment == "PIH Reguler" else 'khs']
+        df_scores = df_scores.assign(model=df_scores['model'].map(MODEL_LABELS))
+        st.dataframe(df_scores, use_container_width=True, hide_index=True)
+
+        df_h = df_bt.assign(abs_error=df_bt['error'].abs()).groupby(['model', 'h'], sort=False)['abs_error'].mean().reset_index()
+        fig_bt = go.Figure()
+        for model, df_m in df_h.groupby('model', sort=False):
+            fig_bt.add_trace(go.Scatter(x=df_m['h'], y=df_m['abs_error'], mode='lines+markers', name=MODEL_LABELS[model]))
+        fig_bt.update_layout(
+            title=f'MAE per Horizon Dana {bt_segment}',
+            xaxis_title='Bulan ke depan',
+            yaxis_title='MAE (jemaah)',
+            template=light_template(),
             legend_title_text='',
-            legend=dict(
-                orientation='h',
-                yanchor='bottom',
-                y=1.02,
-                xanchor='center',
-                x=0.5
-            )
+            legend=dict(orientation='h', yanchor='bottom', y=1.02, xanchor='center', x=0.5)
         )
-        st.plotly_chart(fig1, use_container_width=True)
-        
-        #st.write("Update Matprof:")
-        #edited_data_pnp = st.data_editor(
-            #df_matprof,
-            #use_container_width=True,
-            #num_rows="dynamic",
-        #)
+        st.plotly_chart(fig_bt, use_container_width=True)
+
+    if bt_future is not None and not bt_future.done():
+        st.session_state['bt_polling'] = True
+    with col_b2:
+        backtest_panel()
+
+tab3.markdown(
+    "<h1 style='font-size:25px;'>📊 Proyeksi Liquidity Coverage Ratio (LCR)</h1>",
+    unsafe_allow_html=True
+)
+with tab3:
+    col_select3, col_empty3 = st.columns([1, 3])
+    with col_select3:
+        lcr_segment = st.radio("Dana", ["PIH Reguler", "PIH Khusus"], horizontal=True, key="lcr_segment")
+    with col_empty3:
+        st.empty()
+
+    lcr_seg = 'reg' if lcr_segment == "PIH Reguler" else 'khs'
+    lcr_scale = 1_000_000_000_000 if lcr_seg == 'reg' else 1_000_000
+    lcr_unit = 'triliun' if lcr_seg == 'reg' else 'USD miliar'
+
+    df_lcr = lcr_projection(df_inv, df_final, pnp_reg if lcr_seg == 'reg' else pnp_khs, lcr_seg, rates)
+
+    valid_lcr = df_lcr.dropna(subset=['lcr'])
+    col1, col2, col3 = st.columns(3)
+    if not valid_lcr.empty:
+        min_row = valid_lcr.loc[valid_lcr['lcr'].idxmin()]
+        with col1:
+            st.metric("🔥 LCR Awal Proyeksi", f"{valid_lcr['LCR (%)'].iloc[0]:.2f}%", border=True,
+                      help="HQLA / (arus kas keluar 30 hari - min(arus kas masuk, 75% arus kas keluar))")
+        with col2:
+            st.metric("📉 LCR Terendah", f"{min_row['LCR (%)']:.2f}%",
+                      min_row['Date'].strftime('%d %b %Y'), delta_color="off", border=True)
+        with col3:
+            st.metric("📅 Hari di bawah 100%", f"{int((valid_lcr['lcr'] < 1).sum()):,}", border=True)
+
+    # Daily series, downsampled to the chart width by line_chart
+    lcr_dates = df_lcr['Date'].to_numpy()
+    fig_lcr = line_chart(
+        (('LCR', lcr_dates, df_lcr['LCR (%)'].to_numpy(dtype=float), 'lines', BLUE),),
+        f"Proyeksi LCR Harian Dana {lcr_segment}", "Tanggal", "LCR (%)",
+        hline=100, hline_text="100%", layout=dict(yaxis_type="log", showlegend=False)
+    )
+    st.plotly_chart(fig_lcr, use_container_width=True)
+
+    fig_hqla = line_chart(
+        (('HQLA Surat Berharga', lcr_dates, df_lcr['hqla_securities'].to_numpy() / lcr_scale, 'lines', BLUE),
+         ('HQLA Kas & Penempatan', lcr_dates, df_lcr['hqla_cash'].to_numpy() / lcr_scale, 'lines', YELLOW),
+         ('Net Outflow 30 Hari', lcr_dates, df_lcr['net_outflow_30d'].to_numpy() / lcr_scale, 'lines', RED)),
+        f"HQLA vs Net Cash Outflow 30 Hari ({lcr_unit})", "Tanggal", f"Nominal ({lcr_unit})",
+        stack=('HQLA Surat Berharga', 'HQLA Kas & Penempatan')
+    )
+    st.plotly_chart(fig_hqla, use_container_width=True)
 
 # Download the file
 #url = 'https://drive.google.com/uc?id=1jrbBbdiYlYUM3wF2-9r1MpMoBFcBRPgZ'
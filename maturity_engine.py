@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+from pandas.tseries.offsets import MonthEnd
+
+from fx import SAR_PER_USD, to_currency
+
+# Vectorized aggregations over the Investasi book.
+
+
+def _to_ns(values):
+    return pd.DatetimeIndex(values).values.astype('datetime64[ns]').view('int64')
+
+
+def window_sum(maturities, amounts, starts, ends):
+    # Sum of `amounts` whose maturity lies in [starts[i], ends[i]] for every i.
+    # Maturities are sorted once, each window is two searchsorted lookups into
+    # the cumulative sum: O((n + m) log n) for n instruments and m windows.
+    maturities = pd.to_datetime(pd.Series(maturities), errors='coerce')
+    amounts = pd.to_numeric(pd.Series(amounts), errors='coerce').to_numpy(dtype=float)
+    valid = maturities.notna().to_numpy()
+
+    mat_ns = _to_ns(maturities[valid])
+    amt = np.nan_to_num(amounts[valid])
+    order = np.argsort(mat_ns, kind='stable')
+    mat_ns = mat_ns[order]
+    csum = np.concatenate(([0.0], np.cumsum(amt[order])))
+
+    lo = np.searchsorted(mat_ns, _to_ns(starts), side='left')
+    hi = np.searchsorted(mat_ns, _to_ns(ends), side='right')
+    return csum[np.maximum(hi, lo)] - csum[lo]
+
+
+def short_term_nominal(df, start, end, freq=MonthEnd(), horizon=pd.DateOffset(years=1),
+                       date_col='Maturity Date', value_col='Nominal'):
+    # Nominal maturing within `horizon` of every evaluation date in [start, end].
+    # freq can be anything pd.date_range accepts, e.g. 'D' for daily evaluation.
+    dates = pd.date_range(start=start, end=end, freq=freq)
+    totals = window_sum(df[date_col], df[value_col], dates, dates + horizon)
+    return pd.DataFrame({
+        'Date': dates,
+        'Short-Term Inv Nominal': totals
+    })
+
+
+def maturity_month(dates):
+    return pd.to_datetime(dates, errors='coerce').dt.to_period('M').dt.to_timestamp('M')
+
+
+def maturity_profile(df_inv, perolehan_cutoff, sar_per_usd=SAR_PER_USD):
+    # Nominal maturing per month by funding source, one group-by over
+    # (maturity month, Sumber Dana, Ccy) for instruments held at the cutoff
+    # (settled by it, not sold by it). One row per maturity month present in
+    # the book. asof.maturity_profiles_asof does the same for many cutoffs.
+    df = df_inv.dropna(subset=['Maturity Date'])
+    months = maturity_month(df['Maturity Date'])
+    valid_dates = pd.DatetimeIndex(np.sort(months.unique()))
+
+    held = (df['Settlement Date'] <= perolehan_cutoff) & ~(df['Tanggal Jual'] <= perolehan_cutoff)
+    sums = (
+        pd.to_numeric(df['Nominal'], errors='coerce')[held]
+        .groupby([months[held], df['Sumber Dana'][held], df['Ccy'][held]])
+        .sum()
+        .unstack([1, 2])
+        .reindex(valid_dates)
+        .fillna(0)
+    )
+
+    def col(sumber_dana, ccy):
+        if (sumber_dana, ccy) in sums.columns:
+            return sums[(sumber_dana, ccy)].to_numpy()
+        return np.zeros(len(valid_dates))
+
+    return pd.DataFrame({
+        'Date': valid_dates,
+        'Maturity Profile IDR': col("PIH Reguler", "IDR"),
+        'Maturity Profile USD': col("PIH Reguler", "USD"),
+        'Maturity Profile Khusus': col("PIH Khusus", "USD") + col("PIH Khusus", "SAR") / sar_per_usd,
+        'Maturity Profile DAU': col("DAU", "IDR")
+    })
+
+
+
+def reguler_in_idr(df_maturity_profile, rates, date_col='Date'):
+    # PIH Reguler maturities per month in IDR, the USD part at the rate of
+    # its month. Without a USD rate the USD part is left out (NaN from
+    # fx.to_currency); callers warn or refuse through fx.missing_rates.
+    usd = df_maturity_profile['Maturity Profile USD'].fillna(0).to_numpy(dtype=float)
+    usd_idr = to_currency(rates, df_maturity_profile[date_col], ['USD'] * len(usd), usd, 'IDR')
+    idr = df_maturity_profile['Maturity Profile IDR'].fillna(0).to_numpy(dtype=float)
+    return idr + np.nan_to_num(usd_idr)
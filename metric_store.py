@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+# Month-indexed lookup of KPI metrics.
+#
+# Rows are keyed by month ordinal (year * 12 + month), so the current month,
+# previous month (MoM) and same month last year (YoY) are plain array
+# offsets instead of a boolean scan of the frame per lookup. When a month has
+# several rows (daily history) the last date of the month is used.
+
+LAGS = {'MoM': 1, 'YoY': 12}
+
+
+def _month_ordinal(dates):
+    dates = pd.DatetimeIndex(dates)
+    return np.asarray(dates.year * 12 + dates.month - 1, dtype=np.int64)
+
+
+def format_delta(curr, prev):
+    if curr is None or prev is None or prev == 0:
+        return "-"
+    return f"{(curr - prev) / prev * 100:.2f}%"
+
+
+class MetricStore:
+    def __init__(self, df, date_col):
+        df = df[df[date_col].notna()]
+        dates = pd.to_datetime(df[date_col])
+        order = np.argsort(dates.to_numpy(), kind='stable')
+        df = df.iloc[order]
+        dates = dates.iloc[order]
+        months = _month_ordinal(dates)
+
+        # Last date of every month, first row for that date
+        is_last = (dates == dates.groupby(months).transform('max')).to_numpy()
+        first_of_date = ~dates.duplicated().to_numpy()
+        keep = is_last & first_of_date
+        df = df[keep]
+        months = months[keep]
+
+        self.offset = int(months.min()) if len(months) else 0
+        size = int(months.max()) - self.offset + 1 if len(months) else 0
+        self.present = np.zeros(size, dtype=bool)
+        self.present[months - self.offset] = True
+        self.columns = {}
+        for col in df.columns:
+            if col == date_col:
+                continue
+            values = np.full(size, np.nan, dtype=object)
+            values[months - self.offset] = df[col].to_numpy()
+            self.columns[col] = values
+
+    def _slot(self, date, lag=None):
+        i = int(_month_ordinal([date])[0]) - self.offset - (LAGS[lag] if lag else 0)
+        return i if 0 <= i < len(self.present) and self.present[i] else None
+
+    def get(self, col, date, lag=None):
+        i = self._slot(pd.Timestamp(date), lag)
+        if i is None:
+            return None
+        value = self.columns[col][i]
+        return value if pd.notnull(value) else None
+
+    def calc_delta(self, col, date, lag):
+        return format_delta(self.get(col, date), self.get(col, date, lag))
+
+    def kpis(self, date, cols, lags=('MoM', 'YoY')):
+        # Everything the KPI tiles show, for all columns in one call:
+        # {col: {'curr': v, 'MoM': v, 'YoY': v, 'delta_MoM': str, 'delta_YoY': str}}
+        out = {}
+        for col in cols:
+            curr = self.get(col, date)
+            tile = {'curr': curr}
+            for lag in lags:
+                prev = self.get(col, date, lag)
+                tile[lag] = prev
+                tile['delta_' + lag] = format_delta(curr, prev)
+            out[col] = tile
+        return out
@@ -0,0 +1,81 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Paged, server-side view over a large frame.
+#
+# A TableView keeps every column as one NumPy array. A query (filters and a
+# sort order) resolves to an array of row positions, computed with vectorized
+# masks and one argsort and kept in a small LRU per view, so paging through
+# the result only slices the arrays: a page is built from page_size rows and
+# nothing else of the frame leaves the server.
+
+PAGE_SIZES = [25, 50, 100, 250]
+OPERATORS = ['==', '!=', '<', '<=', '>', '>=', 'contains']
+QUERY_CACHE_SIZE = 16
+
+
+def parse_value(values, text):
+    # Filter value typed like the column it is compared with
+    if np.issubdtype(values.dtype, np.datetime64):
+        return np.datetime64(pd.Timestamp(text))
+    if np.issubdtype(values.dtype, np.number):
+        return float(text)
+    return str(text)
+
+
+class TableView:
+    def __init__(self, df):
+        self.columns = [str(c) for c in df.columns]
+        self.arrays = {str(c): df[c].to_numpy() for c in df.columns}
+        self.n_rows = len(df)
+        self._queries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _mask(self, column, op, value):
+        values = self.arrays[column]
+        if op == 'contains':
+            return pd.Series(values).astype(str).str.contains(str(value), case=False, regex=False).to_numpy()
+        value = parse_value(values, value)
+        if not np.issubdtype(values.dtype, np.number) and not np.issubdtype(values.dtype, np.datetime64):
+            values = values.astype(str)
+        return {
+            '==': values == value, '!=': values != value,
+            '<': values < value, '<=': values <= value,
+            '>': values > value, '>=': values >= value,
+        }[op]
+
+    def query(self, filters=(), sort=()):
+        # Row positions matching every (column, op, value) filter, ordered by
+        # the (column, ascending) sort keys (stable: ties keep frame order)
+        key = (tuple(filters), tuple(sort))
+        with self._lock:
+            if key in self._queries:
+                self._queries.move_to_end(key)
+                return self._queries[key]
+
+        keep = np.ones(self.n_rows, dtype=bool)
+        for column, op, value in filters:
+            keep &= self._mask(column, op, value)
+        positions = np.flatnonzero(keep)
+        # Last key first: a stable sort per key, from the least significant up
+        for column, ascending in reversed(tuple(sort)):
+            values = self.arrays[column][positions]
+            order = pd.Series(values).rank(method='first', ascending=ascending, na_option='bottom')
+            positions = positions[np.argsort(order.to_numpy(), kind='stable')]
+
+        with self._lock:
+            self._queries[key] = positions
+            while len(self._queries) > QUERY_CACHE_SIZE:
+                self._queries.popitem(last=False)
+        return positions
+
+    def n_pages(self, positions, page_size):
+        return max(1, -(-len(positions) // page_size))
+
+    def page(self, positions, page, page_size):
+        # DataFrame of page `page` (1-based) of the query result
+        rows = positions[(page - 1) * page_size:page * page_size]
+        return pd.DataFrame({c: self.arrays[c][rows] for c in self.columns}, index=rows)
@@ -0,0 +1,199 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import streamlit as st
+from pandas.tseries.offsets import MonthEnd
+
+import stages
+from stages import (
+    WORKBOOK_URL, WORKBOOK_OUTPUT, PROJECTION_END, LW_TARGET, liquidity_inputs, liquidity_metrics
+)
+from refresher import SnapshotRefresher
+from sheets_source import SPREADSHEET_ID, SheetsSource, SheetsWriter, open_client
+from writeback import EDITS_PATH, LocalEditStore
+from forecasting import DEFAULT_MODEL, MODELS, backtest, backtest_scores, cancellation_history
+from fx import RATE_SHEET, RATES_CSV, rate_table
+from paging import TableView
+from result_store import STORE_PATH, ResultStore, row_versions
+from shared_cache import MAX_BYTES, SharedCache
+
+# Streamlit side of the compute layer.
+#
+# The stages themselves live in stages.py as plain functions; here they are
+# memoized with st.cache_data (arguments are hashed by value), so a widget
+# change only recomputes the stages downstream of that widget. The UI in
+# liquidity_tools.py only calls these and draws. Server-wide objects (the
+# workbook refresher, result store, edit backend, shared cache) are
+# st.cache_resource singletons, and the heaviest workbook-only stages are
+# shared between sessions (shared_cache.py).
+
+
+def _cached(stage, **kwargs):
+    return st.cache_data(show_spinner=False, **kwargs)(stage)
+
+
+# === Ingestion ===
+@st.cache_resource(show_spinner=False)
+def workbook_refresher(url=WORKBOOK_URL, output=WORKBOOK_OUTPUT, spreadsheet_id=SPREADSHEET_ID):
+    # One refresher thread per server, shared by every session; from Google
+    # Sheets when a spreadsheet id is configured (LIKUIDITAS_SHEETS_ID)
+    source = SheetsSource(open_client(), spreadsheet_id) if spreadsheet_id else None
+    return SnapshotRefresher(url, output, source=source).start()
+
+
+def current_workbook(url=WORKBOOK_URL, output=WORKBOOK_OUTPUT):
+    # Version currently published by the refresher (.snapshot, .number,
+    # .sha256, .published_at); only the very first page load waits for it
+    return workbook_refresher(url, output).current()
+
+
+@st.cache_resource(show_spinner=False)
+def edit_backend(path=EDITS_PATH):
+    # Where Data-tab edits are written back: the spreadsheet itself when the
+    # workbook comes from Google Sheets, else the local edit store
+    if SPREADSHEET_ID:
+        return SheetsWriter(workbook_refresher(WORKBOOK_URL, WORKBOOK_OUTPUT).source)
+    return LocalEditStore(path)
+
+
+prepare_investments = _cached(stages.prepare_investments)
+
+
+# === Solvabilitas ===
+solvability = _cached(stages.solvability)
+
+
+# === Result store ===
+@st.cache_resource(show_spinner=False)
+def result_store(path=STORE_PATH):
+    return ResultStore(path)
+
+
+@st.cache_data(show_spinner=False)
+def liquidity_history(df_short_term_nominal, df_pnp, df_bpih, source=None, path=STORE_PATH):
+    # liquidity_ratio served month by month from the result store: a month is
+    # recomputed only when its inputs (short-term nominal, Penempatan, BPIH)
+    # or LW_TARGET changed
+    df_in = liquidity_inputs(df_short_term_nominal, df_pnp, df_bpih).dropna(subset=['Date'])
+    df_in = df_in[df_in.columns[df_in.dtypes.map(pd.api.types.is_numeric_dtype)].insert(0, 'Date')]
+    df_in = df_in.loc[:, ~df_in.columns.duplicated()].sort_values('Date').reset_index(drop=True)
+    versions = row_versions(df_in, salt=f'likuiditas:{LW_TARGET}')
+
+    def compute(rows):
+        return liquidity_metrics(df_in.iloc[rows]).rename(columns={'Date': 'month'})
+
+    df_lik = result_store(path).results('likuiditas', df_in['Date'], versions, compute, source)
+    df_lik = df_lik.rename(columns={'month': 'Date'})
+    df_lik['Month'] = df_lik['Date'].dt.strftime('%b %Y')
+    return df_lik[list(df_in.columns) + ['Month', 'liquidity', 'Ekses/Defisit']]
+
+
+@st.cache_data(show_spinner=False)
+def solvability_history(df_sol, source=None, path=STORE_PATH):
+    # solvability served month by month from the result store
+    df_in = df_sol.dropna(subset=['Bulan']).reset_index(drop=True)
+    versions = row_versions(df_in, salt='solvabilitas')
+
+    def compute(rows):
+        return solvability(df_in.iloc[rows]).rename(columns={'Bulan': 'month'})
+
+    months = pd.to_datetime(df_in['Bulan']) + MonthEnd(0)
+    df_out = result_store(path).results('solvabilitas', months, versions, compute, source)
+    return df_out.rename(columns={'month': 'Bulan'})[list(df_in.columns) + ['Solvabilitas']]
+
+
+# === Pembatalan forecast ===
+@st.cache_resource
+def _backtest_executor():
+    # One background thread per server: backtests queue up behind each other
+    # and never run on a script thread
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix='forecast-backtest')
+
+
+def start_backtest(df_btl, horizon=12, models=tuple(MODELS)):
+    # Future of (forecasts, scores) per segment, computed in the background
+    df_hist, _ = cancellation_history(df_btl)
+
+    def run():
+        out = {}
+        for seg, col in (('reg', 'Reguler'), ('khs', 'Khusus')):
+            df_bt = backtest(df_hist['Bulan'], df_hist[col].to_numpy(), models, horizon)
+            out[seg] = (df_bt, backtest_scores(df_bt))
+        return out
+
+    return _backtest_executor().submit(run)
+
+
+# === Shared across sessions ===
+# Stages that depend only on the workbook and a few widget values, keyed by
+# the workbook hash: every session viewing the same workbook gets the same
+# objects (read-only), and concurrent first views compute them once.
+@st.cache_resource(show_spinner=False)
+def shared_cache(max_bytes=MAX_BYTES):
+    return SharedCache(max_bytes)
+
+
+def shared_forecast(workbook, model=DEFAULT_MODEL, end_date=PROJECTION_END):
+    # cancellation_forecast of the workbook's Pembatalan sheet
+    key = ('cancellation_forecast', workbook.sha256, model, pd.Timestamp(end_date))
+    return shared_cache().get_or_compute(
+        key, lambda: stages.cancellation_forecast(workbook.sheet("Pembatalan"), end_date, model)
+    )
+
+
+def shared_projection(workbook, model, wl_reg, wl_khs, saldo_reg, saldo_khs, sl_reg, sl_khs):
+    # projection of the workbook's forecast and Keberangkatan sheet
+    params = (wl_reg, wl_khs, saldo_reg, saldo_khs, sl_reg, sl_khs)
+    key = ('projection', workbook.sha256, model, params)
+
+    def compute():
+        df_pred = shared_forecast(workbook, model)['df_pred']
+        return stages.projection(df_pred, workbook.sheet("Keberangkatan"), *params)
+
+    return shared_cache().get_or_compute(key, compute)
+
+
+# === Liquidity gap per bucket ===
+asset_liability = _cached(stages.asset_liability)
+liquidity_gap = _cached(stages.liquidity_gap)
+
+
+# === Paged tables ===
+@st.cache_resource(show_spinner=False, max_entries=8)
+def table_view(df):
+    # One view per frame content, shared by sessions; queries are cached in it
+    return TableView(df)
+
+
+# === Daily cash-flow ladder ===
+daily_cashflow = _cached(stages.daily_cashflow)
+
+
+# === FX ===
+def fx_rates(workbook, csv=None):
+    # Dated rate table: an uploaded CSV, else the LIKUIDITAS_RATES_CSV file,
+    # else the workbook's Kurs sheet; None without any of them
+    if csv is None and RATES_CSV:
+        csv = RATES_CSV
+    if csv is not None:
+        return _rate_table(pd.read_csv(csv))
+    if RATE_SHEET not in workbook.sheet_names:
+        return None
+    return _rate_table(workbook.sheet(RATE_SHEET))
+
+
+_rate_table = _cached(rate_table)
+
+
+fx_gap = _cached(stages.fx_gap)
+
+
+# === Sensitivity / stress ===
+scenario_inputs = _cached(stages.scenario_inputs)
+tornado = _cached(stages.tornado)
+heatmap = _cached(stages.heatmap)
+stress_test = _cached(stages.stress_test, max_entries=16)
+
+
+# === LCR ===
+lcr_projection = _cached(stages.lcr_projection)
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+# Waiting-list projection on plain NumPy arrays.
+#
+# The monthly recurrence
+#   wait[i] = max(0, wait[i-1] - batal[i] - brk[i])
+# (with departures capped at what is left, and everything zeroed once the
+# list is empty) has a closed form: until the list runs out, wait is the
+# initial list minus the cumulative sum of batal + brk. So the whole horizon
+# is one cumsum plus locating the first month where that reaches zero. The
+# time axis is the last axis, leading axes broadcast (e.g. over scenarios).
+
+
+def deplete_waiting_list(wl, batal, brk):
+    # Returns (waiting_list, batal, brk) after depletion, all shaped like the
+    # broadcast of wl[..., None], batal and brk.
+    wl = np.asarray(wl, dtype=float)[..., None]
+    batal = np.asarray(batal, dtype=float)
+    brk = np.asarray(brk, dtype=float)
+    shape = np.broadcast_shapes(wl.shape, batal.shape, brk.shape)
+    n = shape[-1]
+    batal = np.broadcast_to(batal, shape)
+    brk = np.broadcast_to(brk, shape)
+    wl = np.broadcast_to(wl, shape[:-1] + (1,))
+
+    remaining = wl - np.cumsum(batal + brk, axis=-1)
+    hit = remaining <= 0
+    # First month the list is empty (n if it never empties)
+    k = np.where(hit.any(axis=-1), hit.argmax(axis=-1), n)[..., None]
+    idx = np.arange(n)
+
+    # In the month the list empties, departures are capped at what is left
+    # after cancellations (not in the first month, as in the original loop)
+    prev = np.concatenate([wl, remaining[..., :-1]], axis=-1)
+    rem = prev - batal
+    cap = (idx == k) & (idx > 0) & (brk > rem)
+    brk = np.where(cap, np.maximum(0, rem), brk)
+
+    after = idx > k
+    wait = np.where(idx >= k, 0, remaining)
+    batal = np.where(after, 0, batal)
+    brk = np.where(after, 0, brk)
+    return wait, batal, brk
+
+
+def bipih_outflow(brk, saldo, sl, in_first_13m):
+    # Departures times saldo, plus setoran lunas in months with departures
+    # within 13 months of the projection start
+    brk = np.asarray(brk, dtype=float)
+    saldo = np.asarray(saldo, dtype=float)[..., None]
+    sl = np.asarray(sl, dtype=float)[..., None]
+    return brk * saldo + np.where(in_first_13m & (brk > 0), sl, 0)
+
+
+def _int_if_integral(values):
+    if np.all(np.mod(values, 1) == 0):
+        return values.astype('int64')
+    return values
+
+
+def merge_departures(df_pred, df_berangkat):
+    # Predicted cancellations joined with scheduled departures per month
+    df_merged = pd.merge(
+        df_pred.copy(),
+        df_berangkat[['Bulan', 'brk_reg', 'brk_khs']].copy(),
+        left_on='bulan',
+        right_on='Bulan',
+        how='left'
+    ).drop(columns=['Bulan'])
+
+    df_merged[['brk_reg', 'brk_khs']] = df_merged[['brk_reg', 'brk_khs']].fillna(0).astype(int)
+    return df_merged
+
+
+def first_13m_mask(bulan):
+    bulan = pd.Series(bulan)
+    return (bulan <= bulan.min() + pd.DateOffset(months=13)).to_numpy()
+
+
+def compute_projection(df_pred, df_berangkat, wl_reg, wl_khs, saldo_reg, saldo_khs, sl_reg, sl_khs):
+    df_merged = merge_departures(df_pred, df_berangkat)
+
+    # ==== REGULER / KHUSUS ====
+    wait_reg, batal_reg, brk_reg = deplete_waiting_list(
+        wl_reg, df_merged['batal_reg'].to_numpy(), df_merged['brk_reg'].to_numpy())
+    wait_khs, batal_khs, brk_khs = deplete_waiting_list(
+        wl_khs, df_merged['batal_khs'].to_numpy(), df_merged['brk_khs'].to_numpy())
+
+    df_merged['batal_reg'] = batal_reg
+    df_merged['batal_khs'] = batal_khs
+    df_merged['brk_reg'] = _int_if_integral(brk_reg)
+    df_merged['brk_khs'] = _int_if_integral(brk_khs)
+    df_merged['waiting_list_reg'] = _int_if_integral(wait_reg)
+    df_merged['waiting_list_khs'] = _int_if_integral(wait_khs)
+
+    # === Batal Value in Rupiah/Thousand USD ===
+    df_merged['batal_reg (IDR juta)'] = df_merged['batal_reg'] * saldo_reg
+    df_merged['batal_khs (USD ribu)'] = df_merged['batal_khs'] * saldo_khs
+
+    # ==== Calculate BIPIH ====
+    in_first_13m = first_13m_mask(df_merged['bulan'])
+
+    df_merged['bipih_reg'] = bipih_outflow(brk_reg, saldo_reg, sl_reg, in_first_13m)
+    df_merged['bipih_khs'] = bipih_outflow(brk_khs, saldo_khs, sl_khs, in_first_13m)
+
+    return df_merged
@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+
+import drive_cache
+from drive_cache import CACHE_DIR
+from workbook_snapshot import DATE_COLUMNS, NUMERIC_COLUMNS, SNAPSHOT_DIR, load_snapshot
+
+# Background refresh of the workbook snapshot.
+#
+# A worker thread downloads the workbook (conditional request through
+# drive_cache), parses it into an Arrow snapshot and validates it; only then
+# is the new version published by replacing one reference. Readers take that
+# reference once per page load and keep it, so a page is drawn from a single
+# version even when a refresh lands halfway, and a page load never pays for
+# a download or a parse. The workbook comes from Drive (XLSX) or, with a
+# source, from Google Sheets (sheets_source.py). A version that fails to
+# download or validate is not published: the last good one stays current.
+# A failure before anything was published is retried with backoff while
+# readers keep waiting, so one transient error on a cold start does not
+# break every page.
+
+REFRESH_INTERVAL = float(os.environ.get('LIKUIDITAS_REFRESH_SECONDS', 5 * 60))
+# Until a first version is published a failed load is retried after
+# RETRY_FIRST, doubling up to REFRESH_INTERVAL; readers wait up to
+# FIRST_LOAD_TIMEOUT for it
+RETRY_FIRST = 2.0
+FIRST_LOAD_TIMEOUT = 120.0
+
+# Sheets the dashboard cannot do without, with the columns it reads
+REQUIRED_SHEETS = ["Investasi", "Penempatan", "BPIH", "Solvabilitas", "Pembatalan", "Keberangkatan"]
+
+
+def validate(snapshot):
+    # Raises ValueError listing every missing sheet, missing column or empty sheet
+    problems = []
+    for name in REQUIRED_SHEETS:
+        if name not in snapshot.sheet_names:
+            problems.append(f'sheet {name} missing')
+            continue
+        table = snapshot.table(name)
+        missing = [c for c in DATE_COLUMNS.get(name, []) + NUMERIC_COLUMNS.get(name, []) if c not in table.column_names]
+        if missing:
+            problems.append(f'{name}: columns {", ".join(missing)} missing')
+        if table.num_rows == 0:
+            problems.append(f'{name}: no rows')
+    if problems:
+        raise ValueError(f'Workbook {snapshot.sha256[:12]} rejected: ' + '; '.join(problems))
+
+
+class Version:
+    # One published snapshot; never modified after publication
+    def __init__(self, number, snapshot, published_at):
+        self.number = number
+        self.snapshot = snapshot
+        self.sha256 = snapshot.sha256
+        self.published_at = published_at
+
+
+class SnapshotRefresher:
+    def __init__(self, url, output, interval=REFRESH_INTERVAL, cache_dir=CACHE_DIR, snapshot_dir=SNAPSHOT_DIR,
+                 source=None):
+        # source: object with snapshot() (e.g. sheets_source.SheetsSource)
+        # used instead of downloading `url`
+        self.url = url
+        self.output = output
+        self.interval = interval
+        self.cache_dir = cache_dir
+        self.snapshot_dir = snapshot_dir
+        self.source = source
+        self.checked_at = None
+        self.last_error = None
+        self._current = None
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def refresh(self, ttl=0):
+        # Fetch, parse and validate; publish when the content changed.
+        # Returns True when a new version was published.
+        if self.source is not None:
+            snapshot = self.source.snapshot()
+        else:
+            path = drive_cache.fetch_workbook(self.url, self.output, ttl=ttl, stale_while_revalidate=False,
+                                              cache_dir=self.cache_dir)
+            snapshot = load_snapshot(path, self.snapshot_dir)
+        self.checked_at = time.time()
+        current = self._current
+        if current is not None and current.sha256 == snapshot.sha256:
+            return False
+        validate(snapshot)
+        self._current = Version((current.number + 1) if current else 1, snapshot, self.checked_at)
+        self._ready.set()
+        return True
+
+    def _run(self):
+        # First pass serves the local copy when there is one (no network), the
+        # next one revalidates it right away, then every `interval` seconds
+        ttl = float('inf')
+        retry = RETRY_FIRST
+        while not self._stop.is_set():
+            try:
+                self.refresh(ttl)
+                self.last_error = None
+            except Exception as e:
+                self.last_error = e
+                if self._current is None:
+                    # Nothing to serve yet: readers keep waiting for the retry
+                    self._stop.wait(retry)
+                    retry = min(retry * 2, self.interval)
+                    continue
+            if ttl:
+                ttl = 0
+                continue
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='workbook-refresh', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def current(self, timeout=FIRST_LOAD_TIMEOUT):
+        # Latest published Version; waits (up to `timeout`, while the first
+        # load is retried) only while nothing was ever published
+        self._ready.wait(timeout)
+        current = self._current
+        if current is None:
+            if self.last_error is not None:
+                raise RuntimeError('No workbook version available yet') from self.last_error
+            raise TimeoutError('No workbook version published yet')
+        return current
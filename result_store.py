@@ -0,0 +1,111 @@
+import contextlib
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Append-only store of monthly results (Likuiditas Wajib, Solvabilitas).
+#
+# Every stored value is keyed by (metric set, month, version), the version
+# being a hash of exactly the inputs of that month (row_versions), so an edit
+# only changes the versions of the months it touches. results() looks the
+# current versions up, computes the months that are missing and appends
+# them; rows are never updated or deleted, so older data versions stay
+# available. One SQLite file, one short-lived connection per call (WAL, so
+# readers in other sessions do not block a writer).
+#
+#   results(metric_set, month, version, source, column, value, stored_at)
+
+STORE_PATH = os.environ.get('LIKUIDITAS_RESULTS_PATH', os.path.join('.cache', 'results.sqlite'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    metric_set TEXT NOT NULL,
+    month TEXT NOT NULL,
+    version TEXT NOT NULL,
+    source TEXT,
+    column TEXT NOT NULL,
+    value REAL,
+    stored_at TEXT NOT NULL DEFAULT (datetime('now')),
+    PRIMARY KEY (metric_set, month, version, column)
+)
+"""
+
+
+def row_versions(df, salt=''):
+    # Hex version per row: hash of the row content and `salt` (e.g. the
+    # formula constants, so changing them invalidates old results)
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    salt = pd.util.hash_array(np.array([salt], dtype=object))[0]
+    return pd.Series([f'{h:016x}' for h in hashes ^ salt], index=df.index)
+
+
+class ResultStore:
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.last_computed = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as con:
+            con.execute('PRAGMA journal_mode=WAL')
+            con.execute(SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # Short-lived connection: committed (rolled back on error) and closed
+        con = sqlite3.connect(self.path, timeout=30)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def fetch(self, metric_set, months, versions):
+        # Wide frame (month + stored columns) for the (month, version) pairs found
+        keys = pd.DataFrame({'month': pd.DatetimeIndex(months).strftime('%Y-%m-%d'), 'version': list(versions)})
+        with self._connect() as con:
+            con.execute('CREATE TEMP TABLE wanted (month TEXT, version TEXT)')
+            con.executemany('INSERT INTO wanted VALUES (?, ?)', keys.itertuples(index=False))
+            rows = pd.read_sql_query(
+                'SELECT r.month, r.version, r.column, r.value FROM results r '
+                'JOIN wanted w ON r.month = w.month AND r.version = w.version WHERE r.metric_set = ?',
+                con, params=(metric_set,)
+            )
+        if rows.empty:
+            return pd.DataFrame(columns=['month', 'version'])
+        wide = rows.pivot(index=['month', 'version'], columns='column', values='value').reset_index()
+        wide.columns.name = None
+        wide['month'] = pd.to_datetime(wide['month'])
+        return wide
+
+    def append(self, metric_set, df, source=None):
+        # df: month, version and numeric result columns; existing keys are kept
+        values = df.drop(columns=['month', 'version'])
+        long = values.assign(month=pd.DatetimeIndex(df['month']).strftime('%Y-%m-%d'), version=df['version'].to_numpy())
+        long = long.melt(id_vars=['month', 'version'], var_name='column', value_name='value')
+        long['value'] = pd.to_numeric(long['value'], errors='coerce').astype(object).where(long['value'].notna(), None)
+        with self._lock, self._connect() as con:
+            con.executemany(
+                'INSERT OR IGNORE INTO results (metric_set, month, version, source, column, value) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [(metric_set, m, v, source, c, x) for m, v, c, x in long.itertuples(index=False)]
+            )
+
+    def results(self, metric_set, months, versions, compute, source=None):
+        # Stored results for the current (month, version) pairs; missing months
+        # go through compute(positions) -> frame with 'month' + numeric columns
+        # for those months, and are appended before being returned
+        months = pd.DatetimeIndex(months)
+        versions = pd.Series(list(versions))
+        found = self.fetch(metric_set, months, versions)
+        have = pd.MultiIndex.from_frame(found[['month', 'version']]) if len(found) else pd.MultiIndex.from_arrays([[], []])
+        missing = np.flatnonzero(~pd.MultiIndex.from_arrays([months, versions]).isin(have))
+        self.last_computed = len(missing)
+        if len(missing):
+            computed = compute(missing).assign(version=versions.iloc[missing].to_numpy())
+            self.append(metric_set, computed, source)
+            found = pd.concat([found, computed], ignore_index=True) if len(found) else computed
+        return found.sort_values('month', kind='stable').drop(columns='version').reset_index(drop=True)
@@ -0,0 +1,190 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.offsets import MonthEnd
+
+from asof import holdings_asof
+from fx import convert_batch
+from ladders import BUCKETS, LADDERS, bucket_onehot, ladder_labels, month_ladder, projection_ref
+from maturity_engine import reguler_in_idr
+from projection import bipih_outflow, deplete_waiting_list, first_13m_mask, merge_departures
+
+# Batched scenario / sensitivity engine for the liquidity gap.
+#
+# A scenario is one set of the eight inputs of the gap tab. All scenarios are
+# evaluated together: every array carries a leading scenario axis S and the
+# projection months on the last axis T, buckets are summed with one (T, B)
+# matrix product built from the month dates (ladders.bucket_onehot).
+# FX shock scenarios work the same way on the native-currency flows of the
+# gap (gap_flows), converted with fx for every reporting currency at once.
+
+PARAMS = ['wl_reg', 'wl_khs', 'saldo_reg', 'saldo_khs', 'sl_reg', 'sl_khs', 'pnp_reg', 'pnp_khs']
+SEGMENT_PARAMS = {
+    'reg': ['wl_reg', 'saldo_reg', 'sl_reg', 'pnp_reg'],
+    'khs': ['wl_khs', 'saldo_khs', 'sl_khs', 'pnp_khs'],
+}
+
+
+def bucket_labels(buckets=BUCKETS):
+    return ladder_labels(month_ladder(buckets))
+
+
+def bucket_matrix(bulan, buckets=BUCKETS):
+    # One-hot (months, len(buckets) + 1): each projection month goes to the
+    # month bucket its date falls in, counted from the month before the start
+    return bucket_onehot(bulan, projection_ref(bulan), month_ladder(buckets))
+
+
+def prepare_inputs(df_pred, df_berangkat, df_maturity_profile, rates):
+    # Scenario-independent arrays on the projection month axis; Reguler
+    # assets in IDR (maturity_engine.reguler_in_idr)
+    df = merge_departures(df_pred, df_berangkat)
+    mp = df_maturity_profile.set_index('Date').reindex(df['bulan']).fillna(0).rename_axis('Date').reset_index()
+    return {
+        'bulan': df['bulan'].to_numpy(),
+        'batal_reg': df['batal_reg'].to_numpy(dtype=float),
+        'batal_khs': df['batal_khs'].to_numpy(dtype=float),
+        'brk_reg': df['brk_reg'].to_numpy(dtype=float),
+        'brk_khs': df['brk_khs'].to_numpy(dtype=float),
+        'asset_reg': reguler_in_idr(mp, rates),
+        'asset_khs': mp['Maturity Profile Khusus'].to_numpy(dtype=float),
+        'in_first_13m': first_13m_mask(df['bulan']),
+    }
+
+
+def _segment_liability(inputs, seg, wl, saldo, sl):
+    # liab_bb of the base projection (batal value + BIPIH), (S, T)
+    _, batal, brk = deplete_waiting_list(wl, inputs['batal_' + seg], inputs['brk_' + seg])
+    return batal * saldo[:, None] + bipih_outflow(brk, saldo, sl, inputs['in_first_13m'])
+
+
+def evaluate_scenarios(inputs, scenarios, buckets=BUCKETS):
+    # scenarios: DataFrame (or dict of arrays) with the PARAMS columns.
+    # Returns a dict of (S, B + 1) arrays per segment: asset, liab, gap, cumulative.
+    p = {k: np.atleast_1d(np.asarray(scenarios[k], dtype=float)) for k in PARAMS}
+    n_scen = len(p['wl_reg'])
+    onehot = bucket_matrix(inputs['bulan'], buckets)
+
+    out = {'waktu': bucket_labels(buckets)}
+    for seg in ('reg', 'khs'):
+        liab = _segment_liability(inputs, seg, p['wl_' + seg], p['saldo_' + seg], p['sl_' + seg]) @ onehot
+        asset = np.broadcast_to(inputs['asset_' + seg] @ onehot, (n_scen, onehot.shape[1])).copy()
+        # Fund placement is available in the first bucket
+        asset[:, 0] += p['pnp_' + seg]
+        gap = asset - liab
+        out['asset_' + seg] = asset
+        out['liab_' + seg] = liab
+        out['gap_' + seg] = gap
+        out['cumulative_' + seg] = np.cumsum(gap, axis=1)
+    return out
+
+
+def scenario_grid(base, **ranges):
+    # Cartesian product of the given parameter values, others fixed at base
+    names = list(ranges)
+    rows = itertools.product(*(np.atleast_1d(ranges[n]) for n in names))
+    grid = pd.DataFrame(list(rows), columns=names)
+    for k in PARAMS:
+        if k not in grid:
+            grid[k] = base[k]
+    return grid[names + [k for k in PARAMS if k not in names]]
+
+
+def one_at_a_time(base, rel=0.1, params=PARAMS):
+    # Base scenario followed by a low/high scenario per parameter (+/- rel)
+    rows = [dict(base, param='base', side='base')]
+    for k in params:
+        for side, factor in (('low', 1 - rel), ('high', 1 + rel)):
+            rows.append(dict(base, **{k: base[k] * factor}, param=k, side=side))
+    return pd.DataFrame(rows)
+
+
+def tornado_frame(inputs, base, seg, bucket, rel=0.1, buckets=BUCKETS):
+    # Change in the cumulative gap at `bucket` when each segment parameter
+    # moves by +/- rel, sorted by swing (largest last, as plotted)
+    scen = one_at_a_time(base, rel, SEGMENT_PARAMS[seg])
+    res = evaluate_scenarios(inputs, scen, buckets)
+    j = res['waktu'].index(bucket)
+    cum = res['cumulative_' + seg][:, j]
+    scen['delta'] = cum - cum[0]
+    df = scen[scen['side'] != 'base'].pivot(index='param', columns='side', values='delta')
+    df['swing'] = (df['high'] - df['low']).abs()
+    return df.sort_values('swing').reset_index()
+
+
+def heatmap_frame(inputs, base, seg, bucket, x_param, y_param, rel=0.1, steps=21, buckets=BUCKETS):
+    # Cumulative gap at `bucket` over a steps x steps grid of two parameters
+    if x_param == y_param:
+        raise ValueError('Heatmap needs two different parameters')
+    xs = base[x_param] * np.linspace(1 - rel, 1 + rel, steps)
+    ys = base[y_param] * np.linspace(1 - rel, 1 + rel, steps)
+    # y varies slowest, so the flat result reshapes to (y, x)
+    scen = scenario_grid(base, **{y_param: ys, x_param: xs})
+    res = evaluate_scenarios(inputs, scen, buckets)
+    j = res['waktu'].index(bucket)
+    cum = res['cumulative_' + seg][:, j]
+    return pd.DataFrame(cum.reshape(steps, steps), index=ys, columns=xs)
+
+
+# === FX scenarios ===
+SEGMENT_FUNDS = {'reg': "PIH Reguler", 'khs': "PIH Khusus"}
+# Currency of the projection's liabilities and of the placement, per segment
+SEGMENT_CCY = {'reg': 'IDR', 'khs': 'USD'}
+
+
+def gap_flows(df_inv, df_final, cutoff, pnp_reg, pnp_khs):
+    # Flow table in native currencies: Date, Ccy, amount, segment, side
+    # (asset / liab), over the projection window of liquidity_gap
+    ref = projection_ref(df_final['bulan'])
+    end = df_final['bulan'].max() + MonthEnd(0)
+    book = holdings_asof(df_inv.dropna(subset=['Maturity Date']), cutoff)
+    book = book[(book['Maturity Date'] > ref) & (book['Maturity Date'] <= end)]
+
+    parts = []
+    for seg, fund in SEGMENT_FUNDS.items():
+        held = book[book['Sumber Dana'] == fund]
+        parts.append(pd.DataFrame({
+            'Date': held['Maturity Date'].to_numpy(), 'Ccy': held['Ccy'].to_numpy(),
+            'amount': pd.to_numeric(held['Nominal'], errors='coerce').fillna(0).to_numpy(),
+            'segment': seg, 'side': 'asset'
+        }))
+        parts.append(pd.DataFrame({
+            'Date': [ref + pd.Timedelta(days=1)], 'Ccy': SEGMENT_CCY[seg],
+            'amount': [pnp_reg if seg == 'reg' else pnp_khs], 'segment': seg, 'side': 'asset'
+        }))
+        parts.append(pd.DataFrame({
+            'Date': df_final['bulan'].to_numpy(), 'Ccy': SEGMENT_CCY[seg],
+            'amount': df_final['liab_bb_' + seg].to_numpy(dtype=float), 'segment': seg, 'side': 'liab'
+        }))
+    return pd.concat(parts, ignore_index=True), ref
+
+
+def currency_gap(flows, ref, rates, to_currencies=('IDR',), shocks=None, ladder='internal'):
+    # Long frame: currency, scenario, segment (reg, khs, total), waktu, asset,
+    # liab, gap, cumulative. All currencies and scenarios come from one
+    # (C * S, N) conversion and one matrix product per segment and side.
+    onehot = bucket_onehot(flows['Date'], ref, LADDERS[ladder])
+    labels = ladder_labels(LADDERS[ladder])
+    converted = np.concatenate([convert_batch(rates, flows['Date'], flows['Ccy'], flows['amount'], to, shocks)
+                                for to in to_currencies])
+    n_scen = converted.shape[0] // len(to_currencies)
+    amount = np.nan_to_num(converted)
+
+    frames = []
+    for seg in list(SEGMENT_FUNDS) + ['total']:
+        in_seg = np.ones(len(flows), dtype=bool) if seg == 'total' else (flows['segment'] == seg).to_numpy()
+        asset = (amount * (in_seg & (flows['side'] == 'asset').to_numpy())) @ onehot
+        liab = (amount * (in_seg & (flows['side'] == 'liab').to_numpy())) @ onehot
+        gap = asset - liab
+        frames.append(pd.DataFrame({
+            'currency': np.repeat(list(to_currencies), n_scen * len(labels)),
+            'scenario': np.tile(np.repeat(np.arange(n_scen), len(labels)), len(to_currencies)),
+            'segment': seg,
+            'waktu': np.tile(labels, len(to_currencies) * n_scen),
+            'asset': asset.ravel(),
+            'liab': liab.ravel(),
+            'gap': gap.ravel(),
+            'cumulative': np.cumsum(gap, axis=1).ravel(),
+        }))
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,103 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+# Process-wide cache of pipeline results shared by every session.
+#
+# Keys are small tuples (stage name, workbook hash, parameters), so a lookup
+# does not hash any frame. The first caller of a key computes it; callers
+# asking for the same key meanwhile wait on that computation instead of
+# starting their own (single flight). Values are kept once, as the same
+# object for everybody, in an LRU bounded by an estimate of their size in
+# bytes. Callers must treat the values as read-only.
+
+MAX_BYTES = int(float(os.environ.get('LIKUIDITAS_SHARED_CACHE_MB', 512)) * 2 ** 20)
+
+
+def sizeof(value):
+    # Estimated memory of a result: frames and arrays by their buffers,
+    # containers by their items
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(k) + sizeof(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class SharedCache:
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._pending = {}             # key -> Future of the computation in flight
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def get_or_compute(self, key, compute):
+        # Value of `key`, from the cache, from a computation already running
+        # in another thread, or from compute() in this one
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = Future()
+                owner = True
+                self.misses += 1
+            else:
+                owner = False
+                self.hits += 1
+        if not owner:
+            return pending.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            # Waiters see the same error; the next caller tries again
+            with self._lock:
+                del self._pending[key]
+            pending.set_exception(e)
+            raise
+        size = sizeof(value)
+        with self._lock:
+            del self._pending[key]
+            # Larger than the whole cache: returned, not kept
+            if size <= self.max_bytes:
+                self._entries[key] = (value, size)
+                self.nbytes += size
+                while self.nbytes > self.max_bytes:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self.nbytes -= evicted
+        pending.set_result(value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self.nbytes, 'max_bytes': self.max_bytes,
+                    'hits': self.hits, 'misses': self.misses, 'in_flight': len(self._pending)}
@@ -0,0 +1,472 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import gspread
+import numpy as np
+import pandas as pd
+import requests
+
+from workbook_snapshot import DATE_COLUMNS, SNAPSHOT_DIR, snapshot_from_frames
+from writeback import DELETED, row_hash, sheet_version
+
+# Google Sheets as the workbook source, synced sheet by sheet.
+#
+# Each sync reads the per-sheet revision stamps first (one small request),
+# then fetches every sheet whose stamp moved in ONE values:batchGet call and
+# keeps the other sheets from the previous sync. The stamps live in the
+# _revisi sheet (column A sheet name, column B last edit), kept up to date by
+# an Apps Script trigger bound to the spreadsheet:
+#
+#   function onEdit(e) {
+#     var name = e.range.getSheet().getName(), log = e.source.getSheetByName('_revisi');
+#     if (name == '_revisi') return;
+#     var rows = log.getRange('A2:A').getValues().map(function (r) { return r[0]; });
+#     var i = rows.indexOf(name);
+#     log.getRange(i < 0 ? log.getLastRow() + 1 : i + 2, 1, 1, 2).setValues([[name, new Date()]]);
+#   }
+#
+# Without that sheet the Drive modifiedTime of the whole file is the stamp of
+# every sheet: nothing is read while the file is unchanged, every sheet once
+# it changes. A stamp read before an edit lands only makes the next sync read
+# that sheet again, never skip it.
+
+SPREADSHEET_ID = os.environ.get('LIKUIDITAS_SHEETS_ID')
+SERVICE_ACCOUNT_FILE = os.environ.get('LIKUIDITAS_SERVICE_ACCOUNT', 'service_account.json')
+SHEETS = ["Investasi", "Penempatan", "BPIH", "Solvabilitas", "Pembatalan", "Keberangkatan", "Kurs"]
+REVISION_SHEET = '_revisi'
+VALUE_PARAMS = {'valueRenderOption': 'UNFORMATTED_VALUE', 'dateTimeRenderOption': 'SERIAL_NUMBER'}
+# Versions whose sheet row numbers are kept for the write-back
+PUBLISHED_VERSIONS = 8
+# Day zero of spreadsheet serial dates
+SERIAL_ORIGIN = pd.Timestamp('1899-12-30')
+
+
+def open_client(service_account_file=SERVICE_ACCOUNT_FILE):
+    return gspread.service_account(filename=service_account_file)
+
+
+def a1_sheet(name):
+    # Whole-sheet A1 range, quoted
+    return "'" + name.replace("'", "''") + "'"
+
+
+def values_frame(name, values):
+    # Rows of a values response (header first, trailing blanks omitted) as a
+    # DataFrame shaped like read_excel's: blanks are missing, serial numbers
+    # in the date columns of the sheet are dates. Blank rows (cleared by the
+    # write-back) are left out; the index is the sheet row number.
+    if not values:
+        return pd.DataFrame()
+    header = [str(h) if h not in ('', None) else f'Unnamed: {i}' for i, h in enumerate(values[0])]
+    width = max(len(header), max((len(r) for r in values[1:]), default=0))
+    header += [f'Unnamed: {i}' for i in range(len(header), width)]
+    rows = [[None if v == '' else v for v in r] + [None] * (width - len(r)) for r in values[1:]]
+    df = pd.DataFrame(rows, columns=header, index=pd.RangeIndex(2, len(rows) + 2), dtype=object)
+    df = df[df.notna().any(axis=1)]
+    for col in DATE_COLUMNS.get(name, []):
+        if col in df.columns:
+            serial = pd.to_numeric(df[col], errors='coerce')
+            dates = SERIAL_ORIGIN + pd.to_timedelta(serial, unit='D')
+            df[col] = dates.where(serial.notna(), pd.to_datetime(df[col].where(serial.isna()), errors='coerce'))
+    return df.infer_objects()
+
+
+class SheetsSource:
+    def __init__(self, client, spreadsheet_id, sheets=SHEETS, snapshot_dir=SNAPSHOT_DIR):
+        self.client = client
+        self.spreadsheet_id = spreadsheet_id
+        self.sheets = list(sheets)
+        self.snapshot_dir = snapshot_dir
+        self.spreadsheet = None
+        self.revisions = {}   # sheet -> stamp of the copy held
+        self.hashes = {}      # sheet -> content hash
+        self.frames = {}
+        self.row_numbers = {}  # sheet -> sheet row number of every frame row
+        self.published = OrderedDict()  # snapshot version -> row_numbers
+        self.last_read = []
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    def _open(self):
+        # Sheet titles come with the spreadsheet metadata, read once
+        if self.spreadsheet is None:
+            self.spreadsheet = self.client.open_by_key(self.spreadsheet_id)
+            titles = [ws.title for ws in self.spreadsheet.worksheets()]
+            self.has_revisions = REVISION_SHEET in titles
+            self.available = [s for s in self.sheets if s in titles]
+        return self.spreadsheet
+
+    def stamps(self):
+        # {sheet: revision stamp} for the sheets to sync
+        spreadsheet = self._open()
+        if not self.has_revisions:
+            modified = spreadsheet.get_lastUpdateTime()
+            return {s: modified for s in self.available}
+        rows = spreadsheet.values_get(a1_sheet(REVISION_SHEET) + '!A2:B', params=VALUE_PARAMS).get('values', [])
+        logged = {str(r[0]): r[1] for r in rows if len(r) >= 2}
+        return {s: logged.get(s) for s in self.available}
+
+    def sync(self):
+        # Re-read the sheets whose stamp changed (or never read); returns their names
+        with self._sync_lock:
+            stamps = self.stamps()
+            changed = [s for s in self.available if s not in self.frames or stamps[s] != self.revisions.get(s)]
+            if changed:
+                response = self.spreadsheet.values_batch_get([a1_sheet(s) for s in changed], params=dict(VALUE_PARAMS))
+                for name, value_range in zip(changed, response['valueRanges']):
+                    values = value_range.get('values', [])
+                    df = values_frame(name, values)
+                    self.row_numbers[name] = list(df.index)
+                    self.frames[name] = df.reset_index(drop=True)
+                    self.hashes[name] = hashlib.sha256(json.dumps(values, default=str).encode()).hexdigest()
+                    self.revisions[name] = stamps[name]
+            self.last_read = changed
+            return changed
+
+    def version(self):
+        # Content hash over the sheets held, the snapshot key
+        digest = hashlib.sha256(self.spreadsheet_id.encode())
+        for name in sorted(self.hashes):
+            digest.update(f'{name}:{self.hashes[name]};'.encode())
+        return digest.hexdigest()
+
+    def snapshot(self):
+        # Sync, then the snapshot of the current content (unchanged content
+        # maps to the snapshot already built)
+        with self._lock:
+            self.sync()
+            version = self.version()
+            self.published[version] = dict(self.row_numbers)
+            self.published.move_to_end(version)
+            while len(self.published) > PUBLISHED_VERSIONS:
+                self.published.popitem(last=False)
+            return snapshot_from_frames(self.frames, version, self.snapshot_dir)
+
+
+# === Write-back ===
+def _cell(value):
+    # Canonical value (writeback.canonical) as written with USER_ENTERED
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else value
+    if isinstance(value, str) and re.fullmatch(r'\d{4}-\d{2}-\d{2}T00:00:00', value):
+        return value[:10]
+    return value
+
+
+class SheetsWriter:
+    # Row operations of writeback.WriteBuffer applied to the spreadsheet.
+    # Rows are addressed by sheet row number (the keys of overlay), and a
+    # deleted row is cleared rather than removed, so the rows of other
+    # editors never move. One flush of a sheet costs one values:batchGet
+    # (header, every target row and the _revisi stamps, for the version
+    # check), at most one append (new rows) and one values:batchUpdate
+    # (changed and cleared rows plus the sheet's new stamp, so the source
+    # re-reads it). The check and the write are two requests: an edit landing
+    # between them is not detected.
+    def __init__(self, source):
+        self.source = source
+        self.inserted = {}   # (sheet, key) -> sheet row of a row added here
+        self.batch_gets = 0
+        self._lock = threading.Lock()
+
+    def overlay(self, name, df, version=None):
+        # (frame, row keys, base): the edits are already in the spreadsheet
+        rows = self.source.published.get(version, {}).get(name)
+        keys = [str(r) for r in rows] if rows is not None else [str(i + 2) for i in range(len(df))]
+        return df.reset_index(drop=True), keys, sheet_version(df)
+
+    def apply(self, name, base, ops):
+        # (applied keys, conflicting keys)
+        with self._lock:
+            spreadsheet = self.source._open()
+            targets = {}
+            for op in ops:
+                row = int(op['key']) if op['key'].isdigit() else self.inserted.get((name, op['key']))
+                if row is not None:
+                    targets[op['key']] = row
+            ranges = [a1_sheet(name) + '!1:1'] + [a1_sheet(name) + f'!{r}:{r}' for r in targets.values()]
+            if self.source.has_revisions:
+                ranges.append(a1_sheet(REVISION_SHEET) + '!A2:B')
+            current = spreadsheet.values_batch_get(ranges, params=dict(VALUE_PARAMS))['valueRanges']
+            self.batch_gets += 1
+            header = current[0].get('values', [[]])[0]
+
+            applied, conflicts, data, new_rows = [], [], [], []
+            for op, value_range in zip([op for op in ops if op['key'] in targets], current[1:]):
+                values = value_range.get('values', [])
+                df = values_frame(name, [header] + (values or [[]]))
+                now = row_hash(df.iloc[0][header]) if len(df) else DELETED
+                if now != op['expected']:
+                    conflicts.append(op['key'])
+                    continue
+                cells = [_cell(op['values'].get(c)) for c in header] if op['values'] else [''] * len(header)
+                data.append({'range': a1_sheet(name) + f'!A{targets[op["key"]]}', 'values': [cells]})
+                applied.append(op['key'])
+            for op in ops:
+                if op['key'] not in targets and op['values'] is not None:
+                    new_rows.append(op)
+
+            if new_rows:
+                response = spreadsheet.values_append(
+                    a1_sheet(name),
+                    params={'valueInputOption': 'USER_ENTERED', 'insertDataOption': 'INSERT_ROWS'},
+                    body={'values': [[_cell(op['values'].get(c)) for c in header] for op in new_rows]},
+                )
+                first = int(re.search(r'[A-Z]+(\d+)', response['updates']['updatedRange'].split('!')[-1]).group(1))
+                for i, op in enumerate(new_rows):
+                    self.inserted[(name, op['key'])] = first + i
+                    applied.append(op['key'])
+            if applied and self.source.has_revisions:
+                logged = [r[0] if r else '' for r in current[-1].get('values', [])]
+                row = logged.index(name) + 2 if name in logged else len(logged) + 2
+                stamp = pd.Timestamp.now(tz='UTC').isoformat()
+                data.append({'range': a1_sheet(REVISION_SHEET) + f'!A{row}:B{row}', 'values': [[name, stamp]]})
+            if data:
+                spreadsheet.values_batch_update({'valueInputOption': 'USER_ENTERED', 'data': data})
+            return applied, conflicts
+
+
+# === Local stand-in for the Sheets API ===
+# Serves spreadsheet metadata, values:get / values:batchGet, the Drive
+# modifiedTime and the write calls of SheetsWriter (values:batchUpdate,
+# values:append) from sheets held in memory, and counts the requests.
+# FakeSheets.client() is a gspread client pointed at it:
+#
+#   with FakeSheets.from_excel('Data Likuiditas (1).xlsx') as fake:
+#       source = SheetsSource(fake.client(), fake.spreadsheet_id)
+#       source.snapshot(); fake.update('Penempatan', df); source.sync()  # -> ['Penempatan']
+
+GOOGLE_HOSTS = ('https://sheets.googleapis.com', 'https://www.googleapis.com')
+
+
+def _serial(value):
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return (pd.Timestamp(value) - SERIAL_ORIGIN) / pd.Timedelta(days=1)
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def frame_values(df):
+    # DataFrame -> values rows as the API returns them (unformatted, serial dates)
+    rows = [list(map(str, df.columns))]
+    for record in df.itertuples(index=False):
+        row = ['' if pd.isna(v) else _serial(v) for v in record]
+        while row and row[-1] == '':
+            row.pop()
+        rows.append(row)
+    while len(rows) > 1 and not rows[-1]:
+        rows.pop()
+    return rows
+
+
+def _entered(value):
+    # USER_ENTERED parsing of what the write-back sends: ISO dates become serials
+    if isinstance(value, str) and re.fullmatch(r'\d{4}-\d{2}-\d{2}', value):
+        return _serial(pd.Timestamp(value))
+    return value
+
+
+def _column_number(letters):
+    n = 0
+    for ch in letters:
+        n = n * 26 + ord(ch) - 64
+    return n
+
+
+def _column_letters(n):
+    letters = ''
+    while n:
+        n, rem = divmod(n - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters or 'A'
+
+
+def _cut(values, cells):
+    # Values inside an A1 cell range like A2:B (columns and rows optional)
+    match = re.fullmatch(r'([A-Z]*)(\d*)(?::([A-Z]*)(\d*))?', cells or '')
+    c0, r0, c1, r1 = match.groups() if match else ('', '', '', '')
+    rows = values[int(r0) - 1 if r0 else 0:int(r1) if r1 else None]
+    start, stop = (_column_number(c0) - 1 if c0 else 0), (_column_number(c1) if c1 else None)
+    return [r[start:stop] for r in rows]
+
+
+class _LocalSession(requests.Session):
+    def __init__(self, base):
+        super().__init__()
+        self.base = base
+
+    def request(self, method, url, *args, **kwargs):
+        for host in GOOGLE_HOSTS:
+            if url.startswith(host):
+                url = self.base + url[len(host):]
+        return super().request(method, url, *args, **kwargs)
+
+
+class FakeSheets:
+    def __init__(self, sheets, spreadsheet_id='local', host='127.0.0.1', port=0, revisions=True):
+        # sheets: {title: values rows}; revisions: keep a _revisi sheet like
+        # the onEdit trigger does
+        self.spreadsheet_id = spreadsheet_id
+        self.sheets = dict(sheets)
+        self.revisions = revisions
+        self.modified = time.time()
+        self.requests = 0
+        self.batch_gets = 0
+        self.batch_updates = 0
+        self.appends = 0
+        self.ranges_read = []
+        if revisions:
+            self.sheets[REVISION_SHEET] = [['Sheet', 'Modified']]
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                fake.requests += 1
+                url = urllib.parse.urlsplit(self.path)
+                query = urllib.parse.parse_qs(url.query)
+                path = urllib.parse.unquote(url.path)
+                prefix = f'/v4/spreadsheets/{fake.spreadsheet_id}'
+                if path == prefix:
+                    body = fake.metadata()
+                elif path == prefix + '/values:batchGet':
+                    fake.batch_gets += 1
+                    fake.ranges_read.extend(query.get('ranges', []))
+                    body = {'spreadsheetId': fake.spreadsheet_id,
+                            'valueRanges': [fake.value_range(r) for r in query.get('ranges', [])]}
+                elif path.startswith(prefix + '/values/'):
+                    body = fake.value_range(path[len(prefix + '/values/'):])
+                elif path == f'/drive/v3/files/{fake.spreadsheet_id}':
+                    modified = pd.Timestamp(fake.modified, unit='s', tz='UTC')
+                    body = {'id': fake.spreadsheet_id, 'modifiedTime': modified.strftime('%Y-%m-%dT%H:%M:%S.%fZ')}
+                else:
+                    self.send_error(404)
+                    return
+                self._send(body)
+
+            def do_POST(self):
+                fake.requests += 1
+                url = urllib.parse.urlsplit(self.path)
+                path = urllib.parse.unquote(url.path)
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                prefix = f'/v4/spreadsheets/{fake.spreadsheet_id}'
+                if path == prefix + '/values:batchUpdate':
+                    fake.batch_updates += 1
+                    for item in body.get('data', []):
+                        fake.write(item['range'], item['values'])
+                    out = {'spreadsheetId': fake.spreadsheet_id, 'totalUpdatedRows': len(body.get('data', []))}
+                elif path.startswith(prefix + '/values/') and path.endswith(':append'):
+                    fake.appends += 1
+                    out = {'spreadsheetId': fake.spreadsheet_id,
+                           'updates': fake.append(path[len(prefix + '/values/'):-len(':append')], body['values'])}
+                else:
+                    self.send_error(404)
+                    return
+                self._send(out)
+
+            def _send(self, out):
+                data = json.dumps(out).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.base = f'http://{host}:{self.server.server_address[1]}'
+        self._thread = None
+
+    @classmethod
+    def from_excel(cls, path, **kwargs):
+        return cls({name: frame_values(df) for name, df in pd.read_excel(path, sheet_name=None).items()}, **kwargs)
+
+    def metadata(self):
+        return {
+            'spreadsheetId': self.spreadsheet_id,
+            'properties': {'title': 'Data Likuiditas', 'locale': 'en_US', 'timeZone': 'Asia/Jakarta'},
+            'sheets': [
+                {'properties': {'sheetId': i, 'title': title, 'index': i, 'sheetType': 'GRID',
+                                'gridProperties': {'rowCount': max(len(values), 1000), 'columnCount': 26}}}
+                for i, (title, values) in enumerate(self.sheets.items())
+            ],
+        }
+
+    def value_range(self, a1):
+        title, cells = self._title(a1)
+        return {'range': a1, 'majorDimension': 'ROWS', 'values': _cut(self.sheets[title], cells)}
+
+    def _title(self, a1):
+        sheet, _, cells = a1.partition('!')
+        return (sheet[1:-1].replace("''", "'") if sheet.startswith("'") else sheet), cells
+
+    def write(self, a1, rows):
+        # USER_ENTERED write at the top-left cell of `a1` (API writes do not
+        # fire onEdit: no _revisi stamp)
+        title, cells = self._title(a1)
+        match = re.match(r'([A-Z]*)(\d*)', cells)
+        col = _column_number(match.group(1)) - 1 if match.group(1) else 0
+        row = int(match.group(2)) - 1 if match.group(2) else 0
+        values = self.sheets[title]
+        for i, new in enumerate(rows):
+            while len(values) <= row + i:
+                values.append([])
+            target = values[row + i]
+            target.extend([''] * (col + len(new) - len(target)))
+            target[col:col + len(new)] = [_entered(v) for v in new]
+            while target and target[-1] == '':
+                target.pop()
+        self.modified = time.time()
+
+    def append(self, a1, rows):
+        # Rows after the last non-blank row of the sheet
+        title, _ = self._title(a1)
+        values = self.sheets[title]
+        last = max((i for i, r in enumerate(values) if any(v != '' for v in r)), default=-1)
+        start = last + 2
+        self.write(a1_sheet(title) + f'!A{start}', rows)
+        end = f'{_column_letters(max(len(r) for r in rows))}{start + len(rows) - 1}'
+        return {'updatedRange': a1_sheet(title) + f'!A{start}:{end}', 'updatedRows': len(rows)}
+
+    def update(self, name, df):
+        # Replace a sheet, stamping it the way the onEdit trigger would
+        self.sheets[name] = frame_values(df) if isinstance(df, pd.DataFrame) else df
+        self.modified = time.time()
+        if self.revisions:
+            log = self.sheets[REVISION_SHEET]
+            stamp = f'{self.modified:.6f}'
+            for row in log[1:]:
+                if row[0] == name:
+                    row[1] = stamp
+                    break
+            else:
+                log.append([name, stamp])
+
+    def client(self):
+        return gspread.Client(None, session=_LocalSession(self.base))
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
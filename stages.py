@@ -0,0 +1,246 @@
+import numpy as np
+import pandas as pd
+from pandas.tseries.offsets import MonthEnd
+
+from drive_cache import fetch_workbook
+from workbook_snapshot import load_snapshot
+from maturity_engine import short_term_nominal, reguler_in_idr
+from asof import maturity_profiles_asof
+from projection import compute_projection
+from ladders import LADDERS, ladder_sums, projection_ref
+from scenarios import prepare_inputs, tornado_frame, heatmap_frame, gap_flows, currency_gap
+from stress import simulate_gaps, tail_summary
+from forecasting import DEFAULT_MODEL, cancellation_history, fit_model
+from lcr import lcr_timeseries
+from daily_ladder import PLACEMENT_TENOR, build_daily_ladder
+from fx import RATES_CSV, load_rates
+
+# Compute stages of the dashboard, without any Streamlit dependency.
+#
+# Every stage is a pure function of its inputs. pipeline.py memoizes them
+# with st.cache_data for the dashboard; batch_report.py calls them directly.
+
+WORKBOOK_URL = 'https://drive.google.com/uc?id=16O_hbQ167m9Pnhj84T1IMXvW0hJaeoGf'
+WORKBOOK_OUTPUT = 'Data Likuiditas (1).xlsx'
+PROJECTION_END = pd.Timestamp("2050-12-01")
+LW_TARGET = 2.1
+DEFAULT_REPORT_DATE = pd.Timestamp('2025-06-30')
+
+# Default values of the gap-tab inputs
+DEFAULT_INPUTS = {
+    'wl_reg': 5_299_092,
+    'wl_khs': 126_577,
+    'saldo_reg': 26_837_630.65,
+    'saldo_khs': 4_447.77,
+    'sl_reg': 348_246_879_200.0,
+    'sl_khs': 19_980_365.77,
+    'pnp_reg': 28_942_792_290_449.1,
+    'pnp_khs': 378_282_969.67,
+}
+
+
+# === Ingestion ===
+def get_workbook(url=WORKBOOK_URL, output=WORKBOOK_OUTPUT):
+    # Cached download + snapshot; both are no-ops while the workbook is unchanged
+    return load_snapshot(fetch_workbook(url, output))
+
+
+def prepare_investments(df_inv):
+    df_inv = df_inv.copy()
+    for col in ['Maturity Date', 'Settlement Date', 'Tanggal Jual']:
+        df_inv[col] = pd.to_datetime(df_inv[col], errors='coerce')
+    df_inv['Nominal'] = pd.to_numeric(df_inv['Nominal'], errors='coerce')
+    return df_inv
+
+
+# === Likuiditas Wajib ===
+def liquidity_months(df_pnp, df_bpih):
+    # Month ends covered by the Penempatan / BPIH sheets
+    lik_dates = pd.to_datetime(pd.concat([df_pnp['Date'], df_bpih['Date']]), errors='coerce').dropna()
+    return pd.date_range(start=lik_dates.min() + MonthEnd(0), end=lik_dates.max() + MonthEnd(0), freq=MonthEnd())
+
+
+def short_term_investments(df_inv, start, end):
+    # Short-term investment (maturing within 1 year) for every month in [start, end]
+    df_filtered = df_inv[df_inv['Sumber Dana'] == 'PIH Reguler']
+    return short_term_nominal(df_filtered, start=start, end=end)
+
+
+def liquidity_inputs(df_short_term_nominal, df_pnp, df_bpih):
+    df_lik = pd.merge(pd.merge(df_short_term_nominal, df_pnp, on='Date', how='outer'), df_bpih, on='Date', how='outer')
+    df_lik['Date'] = pd.to_datetime(df_lik['Date'])
+    return df_lik
+
+
+def liquidity_metrics(df_lik):
+    df_lik = df_lik.copy()
+    df_lik['liquidity'] = (df_lik['Short-Term Inv Nominal'] + df_lik['Penempatan']) / df_lik['BPIH']
+    df_lik['Ekses/Defisit'] = (df_lik['liquidity'] - LW_TARGET) * df_lik['BPIH']
+    return df_lik
+
+
+def liquidity_ratio(df_short_term_nominal, df_pnp, df_bpih):
+    df_lik = liquidity_inputs(df_short_term_nominal, df_pnp, df_bpih)
+    df_lik['Month'] = df_lik['Date'].dt.strftime('%b %Y')
+    return liquidity_metrics(df_lik.sort_values('Date'))
+
+
+# === Solvabilitas ===
+def solvability(df_sol):
+    df_sol = df_sol.copy()
+    df_sol['Solvabilitas'] = (df_sol['Aset'] - df_sol['Dana Kelolaan DAU']) / (df_sol['Liabilitas'] + df_sol['Dana BPIH']) * 100
+    df_sol['Bulan'] = pd.to_datetime(df_sol['Bulan']) + MonthEnd(0)
+    return df_sol
+
+
+# === Maturity Profile ===
+def maturity_profiles(df_inv, report_dates):
+    # Maturity profile of the book held at the end of the month before each
+    # report date, all from one as-of sweep; long frame keyed by 'report_date'
+    report_dates = pd.DatetimeIndex(list(report_dates))
+    cutoffs = report_dates - MonthEnd(1)
+    df = maturity_profiles_asof(df_inv, cutoffs.unique())
+    keys = pd.DataFrame({'report_date': report_dates, 'cutoff': cutoffs})
+    return keys.merge(df, on='cutoff', how='left').drop(columns='cutoff')
+
+
+# === Pembatalan forecast ===
+def cancellation_forecast(df_btl, end_date=PROJECTION_END, model=DEFAULT_MODEL):
+    # Monthly cancellations from the first month without data to end_date,
+    # one fit per segment with the chosen forecasting model
+    df_hist, start_date = cancellation_history(df_btl)
+    future_dates = pd.date_range(start=start_date, end=end_date, freq="MS") + MonthEnd(0)
+
+    fit_reg = fit_model(model, df_hist['Bulan'], df_hist['Reguler'].to_numpy())
+    fit_khs = fit_model(model, df_hist['Bulan'], df_hist['Khusus'].to_numpy())
+    mean_reg = fit_reg.predict(future_dates)
+    mean_khs = fit_khs.predict(future_dates)
+
+    df_pred = pd.DataFrame({
+        'bulan': future_dates,
+        'batal_reg': np.ceil(mean_reg),
+        'batal_khs': np.ceil(mean_khs)
+    })
+    return {
+        'df_pred': df_pred,
+        'mean_reg': mean_reg,
+        'mean_khs': mean_khs,
+        'resid_reg': fit_reg.residuals,
+        'resid_khs': fit_khs.residuals,
+    }
+
+
+# === Waiting-list projection ===
+def projection(df_pred, df_berangkat, wl_reg, wl_khs, saldo_reg, saldo_khs, sl_reg, sl_khs):
+    df_final = compute_projection(df_pred, df_berangkat, wl_reg=wl_reg, wl_khs=wl_khs,
+                                  saldo_reg=saldo_reg, saldo_khs=saldo_khs, sl_reg=sl_reg, sl_khs=sl_khs)
+    df_final['liab_bb_reg'] = df_final['batal_reg (IDR juta)'] + df_final['bipih_reg']
+    df_final['liab_bb_khs'] = df_final['batal_khs (USD ribu)'] + df_final['bipih_khs']
+    return df_final
+
+
+# === Liquidity gap per bucket ===
+def asset_liability(df_final, df_maturity_profile, rates):
+    # Projection months with the maturing assets of each segment; Reguler
+    # in IDR with its USD maturities converted at the rate of their month
+    df_al_bb = pd.merge(df_final, df_maturity_profile, left_on='bulan', right_on='Date', how='left').drop(columns=['Date', 'Maturity Profile DAU'])
+    df_al_bb['Maturity Profile IDR'] = df_al_bb['Maturity Profile IDR'].fillna(0).astype('Int64')
+    df_al_bb['Maturity Profile USD'] = df_al_bb['Maturity Profile USD'].fillna(0).astype('Int64')
+    df_al_bb['Maturity Profile Khusus'] = df_al_bb['Maturity Profile Khusus'].fillna(0)
+    df_al_bb['jatuh_tempo_reg'] = reguler_in_idr(df_al_bb, rates, 'bulan')
+    return df_al_bb
+
+
+def liquidity_gap(df_final, df_maturity_profile, pnp_reg, pnp_khs, rates, ladders=('internal',)):
+    # Asset / liability / gap per bucket for every ladder in `ladders` (names
+    # in ladders.LADDERS), counted from the month before the projection start
+    df_al_bb = asset_liability(df_final, df_maturity_profile, rates)
+
+    df_matprof = ladder_sums(
+        df_al_bb['bulan'],
+        {
+            'asset_reg': df_al_bb['jatuh_tempo_reg'].to_numpy(dtype=float, na_value=0),
+            'liab_reg': df_al_bb['liab_bb_reg'],
+            'asset_khs': df_al_bb['Maturity Profile Khusus'],
+            'liab_khs': df_al_bb['liab_bb_khs'],
+        },
+        projection_ref(df_al_bb['bulan']),
+        {name: LADDERS[name] for name in ladders}
+    )
+
+    # ➕ Add fund_placement only to the first bucket of every ladder
+    first = ~df_matprof['ladder'].duplicated()
+    df_matprof.loc[first, 'asset_reg'] += pnp_reg
+    df_matprof.loc[first, 'asset_khs'] += pnp_khs
+
+    df_matprof['gap_reg'] = df_matprof['asset_reg'] - df_matprof['liab_reg']
+    df_matprof['cumulative_reg'] = df_matprof['gap_reg'].groupby(df_matprof['ladder'], sort=False).cumsum()
+    df_matprof['gap_khs'] = df_matprof['asset_khs'] - df_matprof['liab_khs']
+    df_matprof['cumulative_khs'] = df_matprof['gap_khs'].groupby(df_matprof['ladder'], sort=False).cumsum()
+    return df_matprof
+
+
+# === Daily cash-flow ladder ===
+def daily_cashflow(df_inv, df_final, report_date, placement, seg, rates, pay_day=None, schedule=None,
+                   placement_tenor=PLACEMENT_TENOR, rollover=0.0):
+    # Daily flows and their month roll-up, book as held before the report
+    # date; with a coupon schedule the asset side includes coupons
+    ladder = build_daily_ladder(df_inv, df_final, pd.Timestamp(report_date) - MonthEnd(1), placement, seg,
+                                pay_day, schedule, placement_tenor, rollover, rates)
+    return ladder.frame(), ladder.monthly()
+
+
+# === FX ===
+def fx_rates(workbook, path=RATES_CSV):
+    # Dated rate table from a CSV (LIKUIDITAS_RATES_CSV by default) or the
+    # workbook's Kurs sheet, None without either
+    return load_rates(workbook, path)
+
+
+def fx_gap(df_inv, df_final, report_date, pnp_reg, pnp_khs, rates, to_currencies, shocks=None):
+    # Gap ladder in every reporting currency and FX shock scenario, flows
+    # converted at the rate of their own date
+    flows, ref = gap_flows(df_inv, df_final, pd.Timestamp(report_date) - MonthEnd(1), pnp_reg, pnp_khs)
+    return currency_gap(flows, ref, rates, to_currencies, shocks)
+
+
+# === Sensitivity / stress ===
+def scenario_inputs(df_pred, df_berangkat, df_maturity_profile, rates):
+    return prepare_inputs(df_pred, df_berangkat, df_maturity_profile, rates)
+
+
+def tornado(inputs, base_params, seg, bucket, rel):
+    return tornado_frame(inputs, base_params, seg, bucket, rel=rel)
+
+
+def heatmap(inputs, base_params, seg, bucket, x_param, y_param, rel):
+    return heatmap_frame(inputs, base_params, seg, bucket, x_param, y_param, rel=rel)
+
+
+def stress_test(inputs, base_params, forecast, n_paths, seed, brk_sd, method):
+    sim = simulate_gaps(
+        inputs, base_params,
+        mean_reg=forecast['mean_reg'], mean_khs=forecast['mean_khs'],
+        resid_reg=forecast['resid_reg'], resid_khs=forecast['resid_khs'],
+        n_paths=n_paths, seed=seed, brk_sd=brk_sd, method=method
+    )
+    return tail_summary(sim)
+
+
+# === LCR ===
+def lcr_projection(df_inv, df_final, placement, seg, rates):
+    # 30-day outflows = batal + BIPIH from the waiting-list projection
+    df_outflow = pd.DataFrame({
+        'bulan': df_final['bulan'],
+        'outflow': df_final['liab_bb_' + seg]
+    })
+    df_lcr = lcr_timeseries(
+        df_inv, df_outflow,
+        placement=placement,
+        start=df_final['bulan'].min() - MonthEnd(1) + pd.Timedelta(days=1),
+        end=df_final['bulan'].max(),
+        seg=seg,
+        rates=rates
+    )
+    df_lcr['LCR (%)'] = df_lcr['lcr'] * 100
+    return df_lcr
@@ -0,0 +1,92 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from scenarios import BUCKETS, PARAMS, bucket_labels, evaluate_scenarios
+
+# Monte Carlo stress test for cancellations (Pembatalan).
+#
+# Each path draws monthly cancellations as the fitted forecast plus a
+# residual (bootstrapped from the fit, or normal with the residual std) and,
+# optionally, a yearly realisation factor on the departure quota. Paths go
+# through the same waiting-list and bucket pipeline as the scenario engine.
+#
+# Paths are simulated in fixed-size chunks, each with its own child of one
+# SeedSequence, so results only depend on (seed, n_paths, chunk_size) and not
+# on how many worker processes ran the chunks.
+
+DEFAULT_CHUNK = 2_000
+
+
+def _draw(rng, resid, n_paths, n_months, method):
+    if method == 'bootstrap':
+        return rng.choice(resid, size=(n_paths, n_months), replace=True)
+    if method == 'normal':
+        sd = resid.std(ddof=1) if len(resid) > 1 else 0.0
+        return rng.normal(0.0, sd, size=(n_paths, n_months))
+    raise ValueError(f'Unknown residual method: {method}')
+
+
+def _simulate_chunk(task):
+    inputs, base, means, resids, n_paths, seed, brk_sd, buckets, method = task
+    rng = np.random.default_rng(seed)
+    n_months = len(inputs['bulan'])
+    years = pd.DatetimeIndex(inputs['bulan']).year
+    year_idx = np.asarray(years - years.min())
+
+    path_inputs = dict(inputs)
+    for seg in ('reg', 'khs'):
+        eps = _draw(rng, resids[seg], n_paths, n_months, method)
+        path_inputs['batal_' + seg] = np.maximum(0, np.ceil(means[seg] + eps))
+        if brk_sd > 0:
+            factor = np.maximum(0, rng.normal(1.0, brk_sd, size=(n_paths, year_idx.max() + 1)))
+            path_inputs['brk_' + seg] = np.round(inputs['brk_' + seg] * factor[:, year_idx])
+
+    res = evaluate_scenarios(path_inputs, {k: [base[k]] for k in PARAMS}, buckets)
+    return {k: np.broadcast_to(res[k], (n_paths, len(res['waktu'])))
+            for k in ('gap_reg', 'gap_khs', 'cumulative_reg', 'cumulative_khs')}
+
+
+def simulate_gaps(inputs, base, mean_reg, mean_khs, resid_reg, resid_khs, n_paths=20_000,
+                  seed=0, brk_sd=0.0, method='bootstrap', chunk_size=DEFAULT_CHUNK,
+                  workers=None, buckets=BUCKETS):
+    # Returns dict of (n_paths, B + 1) arrays: gap/cumulative per segment, plus 'waktu'
+    sizes = [chunk_size] * (n_paths // chunk_size)
+    if n_paths % chunk_size:
+        sizes.append(n_paths % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    means = {'reg': np.asarray(mean_reg, dtype=float), 'khs': np.asarray(mean_khs, dtype=float)}
+    resids = {'reg': np.asarray(resid_reg, dtype=float), 'khs': np.asarray(resid_khs, dtype=float)}
+    tasks = [(inputs, base, means, resids, n, s, brk_sd, buckets, method) for n, s in zip(sizes, seeds)]
+
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        parts = [_simulate_chunk(t) for t in tasks]
+    else:
+        # spawn: forking the multi-threaded Streamlit server is not safe
+        ctx = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            parts = list(pool.map(_simulate_chunk, tasks))
+
+    out = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+    out['waktu'] = bucket_labels(buckets)
+    return out
+
+
+def tail_summary(sim, levels=(0.95, 0.99)):
+    # Per bucket and segment: mean, worst case at each confidence level
+    # (lower tail of the gap) and the probability of a negative cumulative gap
+    rows = []
+    for seg in ('reg', 'khs'):
+        for key in ('gap', 'cumulative'):
+            values = sim[f'{key}_{seg}']
+            row = {'segment': seg, 'measure': key, 'waktu': sim['waktu'], 'mean': values.mean(axis=0)}
+            for level in levels:
+                row[f'worst_{level:.0%}'] = np.percentile(values, (1 - level) * 100, axis=0)
+            if key == 'cumulative':
+                row['p_negative'] = (values < 0).mean(axis=0)
+            rows.append(pd.DataFrame(row))
+    return pd.concat(rows, ignore_index=True)
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from charts import BLUE, cached_figure, line_chart
+
+
+def _chart():
+    x = pd.date_range('2025-07-01', periods=5000).to_numpy()
+    y = np.sin(np.arange(5000) / 50.0)
+    return line_chart((('Posisi', x, y, 'lines', BLUE),), 'Judul', 'Tanggal', 'Nominal')
+
+
+def test_cached_figure_is_a_fresh_copy_every_call():
+    first = _chart()
+    expected = first.to_json()
+    first.update_layout(title='diubah', yaxis_title='lain')
+    first.data[0].y = [0.0]
+    second = _chart()
+    assert second is not first
+    assert second.to_json() == expected
+
+
+def test_cache_hit_does_not_build_the_figure_again():
+    builds = []
+
+    @cached_figure
+    def counted(x, y):
+        builds.append(1)
+        return go.Figure(go.Bar(x=x, y=y))
+
+    x, y = np.arange(10), np.linspace(0.0, 1.0, 10)
+    first = counted(x, y)
+    second = counted(x, y.copy())
+    assert len(builds) == 1
+    assert second.to_dict() == first.to_dict()
+    counted(x, y + 1)
+    assert len(builds) == 2
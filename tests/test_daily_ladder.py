@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from daily_ladder import DailyLadder
+
+
+def test_placement_without_rollover_comes_back_on_first_due_date():
+    ladder = DailyLadder('2025-06-30', '2025-12-31').add_placement('placement', 1000.0, tenor=1)
+    df = ladder.frame()
+    assert df.loc[df['placement'] != 0, 'Date'].tolist() == [pd.Timestamp('2025-07-31')]
+    assert df['placement'].sum() == 1000.0
+
+
+@pytest.mark.parametrize('tenor, rollover', [(1, 0.5), (3, 0.9), (6, 1.0)])
+def test_rolled_over_placement_is_counted_once(tenor, rollover):
+    ladder = DailyLadder('2025-06-30', '2030-12-31').add_placement('placement', 2.9e13, tenor, rollover)
+    df = ladder.frame()
+    due = df.loc[df['placement'] != 0, 'Date']
+    assert (due == due + pd.offsets.MonthEnd(0)).all()
+    assert df['placement'].astype(float).sum() == pytest.approx(2.9e13, rel=1e-6)
+    # Full rollover: nothing comes back before the last due date of the horizon
+    if rollover == 1.0:
+        assert due.tolist() == [pd.Timestamp('2030-12-31')]
+
+
+def test_flows_are_compact_and_roll_up_in_float64():
+    ladder = DailyLadder('2025-06-30', '2050-12-31')
+    months = pd.date_range('2025-07-31', '2050-12-31', freq='ME')
+    amounts = np.full(len(months), 1.234567e12)
+    ladder.add_monthly('bipih', months, amounts)
+    assert ladder.flows['bipih'].dtype == np.float32
+    monthly = ladder.monthly()
+    assert monthly['bipih'].dtype == np.float64
+    np.testing.assert_allclose(monthly['bipih'].to_numpy(), amounts, rtol=1e-6)
+    np.testing.assert_allclose(monthly['cumulative'].iloc[-1], -amounts.sum(), rtol=1e-6)
@@ -0,0 +1,97 @@
+import os
+import time
+
+import pytest
+
+import drive_cache
+from drive_cache import FakeDrive, cached_version, fetch_workbook, file_sha256
+
+
+@pytest.fixture
+def drive(tmp_path):
+    source = tmp_path / 'served.xlsx'
+    source.write_bytes(b'version 1')
+    with FakeDrive(str(source)) as fake:
+        yield fake
+
+
+def _fetch(drive, tmp_path, **kw):
+    return fetch_workbook(drive.url, str(tmp_path / 'out.xlsx'), cache_dir=str(tmp_path / 'cache'), **kw)
+
+
+def _expire(drive, tmp_path):
+    # Age the cached entry past any TTL
+    meta = drive_cache._load_meta(drive.url, str(tmp_path / 'cache'))
+    drive_cache._save_meta(drive.url, dict(meta, fetched_at=0), str(tmp_path / 'cache'))
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+def test_first_fetch_downloads(drive, tmp_path):
+    path = _fetch(drive, tmp_path)
+    assert open(path, 'rb').read() == b'version 1'
+    assert open(tmp_path / 'out.xlsx', 'rb').read() == b'version 1'
+    assert (drive.requests, drive.downloads) == (1, 1)
+
+
+def test_fresh_hit_makes_no_request(drive, tmp_path):
+    first = _fetch(drive, tmp_path)
+    assert _fetch(drive, tmp_path, ttl=60) == first
+    assert drive.requests == 1
+
+
+def test_expired_entry_revalidates_without_download(drive, tmp_path):
+    first = _fetch(drive, tmp_path)
+    _expire(drive, tmp_path)
+    assert _fetch(drive, tmp_path, stale_while_revalidate=False) == first
+    # Conditional GET answered 304: one more request, no new body
+    assert (drive.requests, drive.downloads) == (2, 1)
+
+
+def test_expired_entry_downloads_changed_file(drive, tmp_path):
+    _fetch(drive, tmp_path)
+    _expire(drive, tmp_path)
+    with open(drive.path, 'wb') as f:
+        f.write(b'version 2')
+    path = _fetch(drive, tmp_path, stale_while_revalidate=False)
+    assert open(path, 'rb').read() == b'version 2'
+    assert drive.downloads == 2
+
+
+def test_stale_while_revalidate_serves_old_copy_then_swaps(drive, tmp_path):
+    first = _fetch(drive, tmp_path)
+    _expire(drive, tmp_path)
+    with open(drive.path, 'wb') as f:
+        f.write(b'version 2')
+    # The old copy comes back at once, the refresh runs in the background
+    assert _fetch(drive, tmp_path) == first
+    new_sha = file_sha256(drive.path)
+    _wait_for(lambda: cached_version(drive.url, str(tmp_path / 'cache')) == new_sha)
+    path = _fetch(drive, tmp_path)
+    assert open(path, 'rb').read() == b'version 2'
+    assert open(tmp_path / 'out.xlsx', 'rb').read() == b'version 2'
+    # The first version stays in the blob store
+    assert os.path.exists(first)
+
+
+@pytest.mark.parametrize('stale_while_revalidate', [False, True])
+def test_failed_refresh_keeps_last_good_copy(drive, tmp_path, stale_while_revalidate):
+    first = _fetch(drive, tmp_path)
+    _expire(drive, tmp_path)
+    drive.fail = True
+    assert _fetch(drive, tmp_path, stale_while_revalidate=stale_while_revalidate) == first
+    _wait_for(lambda: drive.requests == 2)
+    _wait_for(lambda: not drive_cache._refreshing)
+    assert _fetch(drive, tmp_path, stale_while_revalidate=False) == first
+    assert open(first, 'rb').read() == b'version 1'
+
+
+def test_failed_first_fetch_raises(drive, tmp_path):
+    drive.fail = True
+    with pytest.raises(OSError):
+        _fetch(drive, tmp_path)
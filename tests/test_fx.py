@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fx import MissingRateError, convert_batch, missing_rates, rate_table, require_rates, shock_grid, to_currency
+from lcr import segment_book
+from maturity_engine import reguler_in_idr
+
+
+@pytest.fixture
+def rates():
+    return rate_table(pd.DataFrame({'Date': ['2025-01-31', '2025-06-30'], 'USD': [15000.0, 16000.0]}))
+
+
+def test_usd_converted_at_the_rate_of_its_date(rates):
+    out = to_currency(rates, ['2025-03-31', '2030-12-31', '2024-01-31'], ['USD'] * 3, [1.0, 1.0, 1.0], 'IDR')
+    # Future dates take the latest rate, dates before the first quote the first one
+    np.testing.assert_array_equal(out, [15000.0, 16000.0, 15000.0])
+
+
+def test_pegged_pair_needs_no_table():
+    out = to_currency(None, ['2025-01-31'] * 2, ['SAR', 'USD'], [3.75, 1.0], 'USD')
+    np.testing.assert_array_equal(out, [1.0, 1.0])
+    assert missing_rates(None, ['USD', 'SAR'], 'USD') == []
+
+
+def test_no_rate_is_never_assumed_to_be_one():
+    out = to_currency(None, ['2025-01-31'] * 2, ['IDR', 'USD'], [5.0, 7.0], 'IDR')
+    assert out[0] == 5.0 and np.isnan(out[1])
+    assert missing_rates(None, ['IDR', 'USD'], 'IDR') == ['USD']
+    with pytest.raises(MissingRateError):
+        require_rates(None, ['IDR', 'USD'], 'IDR')
+
+
+def test_shocks_convert_in_one_batch(rates):
+    out = convert_batch(rates, ['2025-06-30'] * 3, ['USD', 'SAR', 'IDR'], [1.0, 3.75, 16000.0], 'IDR',
+                        shock_grid([-0.1, 0.0, 0.1], ('USD', 'SAR')))
+    np.testing.assert_allclose(out, [[14400.0, 14400.0, 16000.0],
+                                     [16000.0, 16000.0, 16000.0],
+                                     [17600.0, 17600.0, 16000.0]])
+    assert convert_batch(rates, ['2025-06-30'], ['USD'], [1.0], 'USD').shape == (1, 1)
+
+
+def test_reguler_maturities_in_idr(rates):
+    profile = pd.DataFrame({
+        'Date': pd.to_datetime(['2025-07-31', '2025-08-31']),
+        'Maturity Profile IDR': [1e12, 0.0],
+        'Maturity Profile USD': [1e6, 2e6],
+    })
+    np.testing.assert_array_equal(reguler_in_idr(profile, rates), [1e12 + 1.6e10, 3.2e10])
+    # Without a USD rate only the IDR part is counted
+    np.testing.assert_array_equal(reguler_in_idr(profile, None), [1e12, 0.0])
+
+
+def test_lcr_book_in_segment_currency(rates):
+    book = pd.DataFrame({
+        'Sumber Dana': ['PIH Reguler', 'PIH Reguler', 'PIH Khusus'],
+        'Ccy': ['IDR', 'USD', 'SAR'],
+        'Nominal': [1e9, 1e6, 3.75e6],
+        'Settlement Date': pd.to_datetime(['2024-01-01'] * 3),
+        'Maturity Date': pd.to_datetime(['2026-01-31'] * 3),
+        'Tanggal Jual': pd.NaT,
+    })
+    np.testing.assert_array_equal(segment_book(book, 'reg', rates)['amount'], [1e9, 1.6e10])
+    np.testing.assert_array_equal(segment_book(book, 'khs')['amount'], [1e6])
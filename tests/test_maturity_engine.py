@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.tseries.offsets import MonthEnd
+
+from maturity_engine import maturity_profile
+from stages import maturity_profiles
+
+CUTOFF = pd.Timestamp('2025-05-31')
+
+
+def baseline_maturity_profile(df_inv, perolehan_cutoff):
+    # Frozen copy of the per-month mask loop of the original dashboard
+    # (liquidity_tools.py before the vectorized engine); do not edit
+    df_inv = df_inv.dropna(subset=['Maturity Date']).copy()
+    df_inv.loc[:, 'Maturity Month'] = df_inv['Maturity Date'].dt.to_period('M').dt.to_timestamp('M')
+    valid_dates = sorted(df_inv['Maturity Month'].unique())
+    result = []
+    for dt in valid_dates:
+        start_of_month = dt - MonthEnd(1)
+        end_of_month = dt
+        date_filter = (
+            (df_inv['Maturity Date'] > start_of_month) &
+            (df_inv['Maturity Date'] <= end_of_month) &
+            (df_inv['Settlement Date'] <= perolehan_cutoff) &
+            (df_inv['Tanggal Jual'].isna())
+        )
+        reguler = df_inv[(df_inv['Sumber Dana'] == "PIH Reguler") & date_filter]
+        idr_total = reguler[reguler['Ccy'] == "IDR"]['Nominal'].sum()
+        usd_total = reguler[reguler['Ccy'] == "USD"]['Nominal'].sum()
+        khusus = df_inv[(df_inv['Sumber Dana'] == "PIH Khusus") & date_filter]
+        usd_khusus_total = khusus[khusus['Ccy'] == "USD"]['Nominal'].sum()
+        sar_khusus_total = khusus[khusus['Ccy'] == "SAR"]['Nominal'].sum() / 3.75
+        total_khusus = usd_khusus_total + sar_khusus_total
+        khusus = df_inv[(df_inv['Sumber Dana'] == "DAU") & date_filter]
+        dau_total = khusus[khusus['Ccy'] == "IDR"]['Nominal'].sum()
+        result.append({
+            'Date': dt,
+            'Maturity Profile IDR': idr_total,
+            'Maturity Profile USD': usd_total,
+            'Maturity Profile Khusus': total_khusus,
+            'Maturity Profile DAU': dau_total
+        })
+    return pd.DataFrame(result)
+
+
+def random_book(seed, n=400, sold_after_cutoff=False):
+    rng = np.random.default_rng(seed)
+    day = lambda lo, hi, size: pd.Timestamp(lo) + pd.to_timedelta(rng.integers(0, (pd.Timestamp(hi) - pd.Timestamp(lo)).days, size), unit='D')
+    maturity = pd.Series(day('2024-01-01', '2034-12-31', n))
+    maturity[rng.random(n) < 0.05] = pd.NaT
+    settlement = pd.Series(day('2020-01-01', '2025-12-31', n))
+    # Sale dates: mostly NaT, some on or before the cutoff, optionally some after it
+    sold = pd.Series(day('2021-01-01', CUTOFF + pd.Timedelta(days=1), n))
+    if sold_after_cutoff:
+        sold = pd.Series(day('2021-01-01', '2026-12-31', n))
+    sold[rng.random(n) < 0.7] = pd.NaT
+    return pd.DataFrame({
+        'Kode': [f'INV{i:05d}' for i in range(n)],
+        'Sumber Dana': rng.choice(['PIH Reguler', 'PIH Khusus', 'DAU'], n),
+        'Ccy': rng.choice(['IDR', 'USD', 'SAR'], n),
+        'Nominal': rng.integers(1, 10 ** 6, n) * 10 ** 6,
+        'Settlement Date': settlement,
+        'Maturity Date': maturity,
+        'Tanggal Jual': sold,
+    })
+
+
+def assert_same(result, expected):
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_freq=False)
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_matches_baseline_loop(seed):
+    # No sale after the cutoff: held-at-cutoff and never-sold are the same book
+    df = random_book(seed)
+    assert_same(maturity_profile(df, CUTOFF), baseline_maturity_profile(df, CUTOFF))
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_sales_after_cutoff_are_still_held(seed):
+    # Point-in-time filter: a position sold after the cutoff was still on the
+    # book at the cutoff, i.e. the baseline loop without that sale date
+    df = random_book(seed, sold_after_cutoff=True)
+    assert (df['Tanggal Jual'] > CUTOFF).any()
+    held = df.assign(**{'Tanggal Jual': df['Tanggal Jual'].where(~(df['Tanggal Jual'] > CUTOFF))})
+    assert_same(maturity_profile(df, CUTOFF), baseline_maturity_profile(held, CUTOFF))
+
+
+def test_single_currency_book():
+    df = random_book(0)
+    df['Ccy'] = 'IDR'
+    result = maturity_profile(df, CUTOFF)
+    assert_same(result, baseline_maturity_profile(df, CUTOFF))
+    assert (result['Maturity Profile USD'] == 0).all() and (result['Maturity Profile Khusus'] == 0).all()
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_asof_sweep_matches_each_cutoff(seed):
+    # One sweep for many report dates (two of them in the same month) equals
+    # maturity_profile at the month end before each of them
+    df = random_book(seed, sold_after_cutoff=True)
+    report_dates = pd.to_datetime(['2025-06-30', '2022-03-31', '2025-06-15', '2026-12-31'])
+    result = maturity_profiles(df, report_dates)
+    assert list(result['report_date'].unique()) == list(report_dates)
+    for date, profile in result.groupby('report_date', sort=False):
+        # The sweep adds and subtracts SAR / 3.75 amounts: float residue only
+        pd.testing.assert_frame_equal(profile.drop(columns='report_date').reset_index(drop=True),
+                                      maturity_profile(df, date - MonthEnd(1)), check_dtype=False, atol=1e-3)
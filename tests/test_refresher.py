@@ -0,0 +1,52 @@
+import threading
+
+import pandas as pd
+import pytest
+
+import refresher
+from drive_cache import FakeDrive
+from refresher import REQUIRED_SHEETS, SnapshotRefresher
+from workbook_snapshot import DATE_COLUMNS, NUMERIC_COLUMNS
+
+
+@pytest.fixture
+def drive(tmp_path, monkeypatch):
+    # Smallest workbook that passes validation: one row per required sheet
+    monkeypatch.setattr(refresher, 'RETRY_FIRST', 0.05)
+    source = tmp_path / 'served.xlsx'
+    with pd.ExcelWriter(source) as writer:
+        for name in REQUIRED_SHEETS:
+            row = {c: pd.Timestamp('2025-06-30') for c in DATE_COLUMNS.get(name, [])}
+            row.update({c: 1.0 for c in NUMERIC_COLUMNS.get(name, [])})
+            pd.DataFrame([row]).to_excel(writer, sheet_name=name, index=False)
+    with FakeDrive(str(source)) as fake:
+        yield fake
+
+
+def _refresher(drive, tmp_path):
+    return SnapshotRefresher(drive.url, str(tmp_path / 'out.xlsx'), interval=60, cache_dir=str(tmp_path / 'drive'),
+                             snapshot_dir=str(tmp_path / 'snapshots'))
+
+
+def test_cold_start_failure_is_retried_while_readers_wait(drive, tmp_path):
+    drive.fail = True
+    r = _refresher(drive, tmp_path).start()
+    threading.Timer(0.3, lambda: setattr(drive, 'fail', False)).start()
+    try:
+        version = r.current(timeout=30)
+    finally:
+        r.stop()
+    assert version.number == 1
+    assert drive.requests >= 2
+    assert r.last_error is None
+
+
+def test_reader_gets_the_error_after_its_timeout(drive, tmp_path):
+    drive.fail = True
+    r = _refresher(drive, tmp_path).start()
+    try:
+        with pytest.raises(RuntimeError) as info:
+            r.current(timeout=0.3)
+    finally:
+        r.stop()
+    assert info.value.__cause__ is not None
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.tseries.offsets import MonthEnd
+
+from scenarios import PARAMS, evaluate_scenarios, prepare_inputs
+from stages import DEFAULT_INPUTS, liquidity_gap, projection
+
+
+def _inputs(seed):
+    rng = np.random.default_rng(seed)
+    bulan = pd.date_range('2025-07-01', '2040-12-01', freq='MS') + MonthEnd(0)
+    df_pred = pd.DataFrame({
+        'bulan': bulan,
+        'batal_reg': rng.integers(2_000, 6_000, len(bulan)).astype(float),
+        'batal_khs': rng.integers(50, 300, len(bulan)).astype(float),
+    })
+    departures = bulan[rng.random(len(bulan)) < 0.15]
+    df_berangkat = pd.DataFrame({
+        'Bulan': departures,
+        'brk_reg': rng.integers(100_000, 250_000, len(departures)),
+        'brk_khs': rng.integers(5_000, 20_000, len(departures)),
+    })
+    profile = pd.DataFrame({'Date': bulan, 'Maturity Profile IDR': rng.integers(0, 10 ** 6, len(bulan)) * 10 ** 6,
+                            'Maturity Profile USD': 0.0, 'Maturity Profile Khusus': rng.integers(0, 10 ** 4, len(bulan)) * 1000.0,
+                            'Maturity Profile DAU': 0.0})
+    return df_pred, df_berangkat, profile
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_base_scenario_matches_the_projection_gap(seed):
+    # The scenario engine and the base projection share the projection
+    # kernels: the unshocked scenario reproduces liquidity_gap
+    df_pred, df_berangkat, profile = _inputs(seed)
+    p = DEFAULT_INPUTS
+    df_final = projection(df_pred, df_berangkat, p['wl_reg'], p['wl_khs'], p['saldo_reg'], p['saldo_khs'],
+                          p['sl_reg'], p['sl_khs'])
+    expected = liquidity_gap(df_final, profile, p['pnp_reg'], p['pnp_khs'], None)
+
+    result = evaluate_scenarios(prepare_inputs(df_pred, df_berangkat, profile, None), pd.DataFrame([p])[PARAMS])
+    assert result['waktu'] == expected['waktu'].tolist()
+    for key in ('asset_reg', 'liab_reg', 'cumulative_reg', 'asset_khs', 'liab_khs', 'cumulative_khs'):
+        np.testing.assert_allclose(result[key][0], expected[key].to_numpy(dtype=float), rtol=1e-12)
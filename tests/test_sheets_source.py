@@ -0,0 +1,72 @@
+import time
+
+import pandas as pd
+import pytest
+
+from sheets_source import SHEETS, FakeSheets, SheetsSource, a1_sheet, frame_values
+from workbook_snapshot import DATE_COLUMNS, NUMERIC_COLUMNS
+
+
+def _frames():
+    # Two rows per sheet, dates and numbers where the snapshot expects them
+    frames = {}
+    for name in SHEETS:
+        rows = []
+        for i in range(2):
+            row = {c: pd.Timestamp('2025-06-30') + pd.DateOffset(months=i) for c in DATE_COLUMNS.get(name, [])}
+            row.update({c: float(i + 1) for c in NUMERIC_COLUMNS.get(name, [])})
+            row.setdefault('Keterangan', f'{name} {i}')
+            rows.append(row)
+        frames[name] = pd.DataFrame(rows)
+    return frames
+
+
+@pytest.fixture(params=[True, False], ids=['revisi', 'drive'])
+def fake(request):
+    with FakeSheets({name: frame_values(df) for name, df in _frames().items()}, revisions=request.param) as fake:
+        yield fake
+
+
+@pytest.fixture
+def source(fake, tmp_path):
+    return SheetsSource(fake.client(), fake.spreadsheet_id, snapshot_dir=str(tmp_path))
+
+
+def test_first_snapshot_reads_every_sheet_in_one_batch(fake, source):
+    source.snapshot()
+    assert source.last_read == SHEETS
+    assert fake.batch_gets == 1
+    assert sorted(fake.ranges_read) == sorted(a1_sheet(s) for s in SHEETS)
+
+
+def test_unchanged_sync_reads_no_values(fake, source):
+    first = source.snapshot()
+    batch_gets = fake.batch_gets
+    again = source.snapshot()
+    assert source.last_read == []
+    assert fake.batch_gets == batch_gets
+    assert again.sha256 == first.sha256
+
+
+def _edit_penempatan(fake, snapshot):
+    df = snapshot.sheet('Penempatan')
+    df.loc[0, 'Penempatan'] = df.loc[0, 'Penempatan'] * 2
+    time.sleep(0.01)
+    fake.update('Penempatan', df)
+    return df
+
+
+def test_editing_penempatan_reads_only_penempatan(fake, source):
+    first = source.snapshot()
+    df = _edit_penempatan(fake, first)
+    batch_gets, read = fake.batch_gets, len(fake.ranges_read)
+
+    new = source.snapshot()
+    # Without _revisi every sheet shares the Drive stamp: still one batch
+    expected = ['Penempatan'] if fake.revisions else SHEETS
+    assert source.last_read == expected
+    assert fake.batch_gets == batch_gets + 1
+    assert fake.ranges_read[read:] == [a1_sheet(s) for s in expected]
+    assert new.sha256 != first.sha256
+    pd.testing.assert_frame_equal(new.sheet('Penempatan'), df, check_dtype=False)
+    pd.testing.assert_frame_equal(new.sheet('Investasi'), first.sheet('Investasi'))
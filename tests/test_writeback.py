@@ -0,0 +1,208 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from sheets_source import REVISION_SHEET, FakeSheets, SheetsSource, SheetsWriter, frame_values
+from writeback import LocalEditStore, WriteBuffer, row_hash
+
+SHEET = 'Penempatan'
+
+
+def _penempatan():
+    return pd.DataFrame({
+        'Date': pd.to_datetime(['2025-07-31', '2025-08-31', '2025-09-30']),
+        'Penempatan': [100.0, 200.0, 300.0],
+        'Bank': ['A', 'B', 'C'],
+    })
+
+
+class Recorder:
+    # Backend that records every batch and applies all of it
+    def __init__(self):
+        self.batches = []
+        self.times = []
+
+    def apply(self, name, base, ops):
+        self.batches.append((name, base, ops))
+        self.times.append(time.monotonic())
+        return [op['key'] for op in ops], []
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalEditStore(str(tmp_path / 'edits.sqlite'))
+
+
+def _session(backend, store, sid, debounce=60.0, max_delay=60.0):
+    # Timers far out: the tests flush by hand unless they test the timer
+    buffer = WriteBuffer(backend, debounce=debounce, max_delay=max_delay)
+    return buffer, buffer.editor(SHEET, *store.overlay(SHEET, _penempatan()), sid)
+
+
+def _edit(edits, **cells):
+    # The session's frame with {position: Penempatan} set
+    edited = edits.frame.copy()
+    for pos, value in cells.items():
+        edited.loc[int(pos[1:]), 'Penempatan'] = value
+    return edited
+
+
+def _stored(store):
+    frame, keys, _ = store.overlay(SHEET, _penempatan())
+    return dict(zip(keys, frame['Penempatan']))
+
+
+def test_stale_expected_hash_is_a_conflict(store):
+    a, edits_a = _session(store, store, 'a')
+    b, edits_b = _session(store, store, 'b')
+    a.stage(SHEET, edits_a.deltas(_edit(edits_a, p1=111.0)))
+    a.flush()
+    # b still sees the upstream row 1
+    b.stage(SHEET, edits_b.deltas(_edit(edits_b, p1=999.0, p2=333.0)))
+    b.flush()
+    assert a.conflicts == []
+    assert b.conflicts == [(SHEET, '1')]
+    assert _stored(store) == {'0': 100.0, '1': 111.0, '2': 333.0}
+
+
+def test_rapid_edits_coalesce_to_first_expected_and_last_content(store):
+    backend = Recorder()
+    buffer, edits = _session(backend, store, 'a')
+    upstream = row_hash(edits.frame.iloc[1])
+    for value in (1.0, 2.0, 3.0):
+        buffer.stage(SHEET, edits.deltas(_edit(edits, p1=value)))
+    assert buffer.n_pending() == 1
+    buffer.flush()
+    [(name, base, [op])] = backend.batches
+    assert (name, op['key'], op['expected']) == (SHEET, '1', upstream)
+    assert op['values']['Penempatan'] == 3.0
+    assert op['hash'] == row_hash(_edit(edits, p1=3.0).iloc[1])
+
+
+def test_edit_back_to_the_stored_version_is_dropped(store):
+    buffer, edits = _session(Recorder(), store, 'a')
+    buffer.stage(SHEET, edits.deltas(_edit(edits, p1=1.0)))
+    buffer.stage(SHEET, edits.deltas(edits.frame.copy()))
+    assert buffer.n_pending() == 0
+
+
+def test_steady_edits_flush_after_max_delay(store):
+    backend = Recorder()
+    buffer, edits = _session(backend, store, 'a', debounce=0.3, max_delay=0.5)
+    start = time.monotonic()
+    # An edit every 0.1 s keeps pushing the debounce back
+    for i in range(15):
+        buffer.stage(SHEET, edits.deltas(_edit(edits, p1=float(i))))
+        time.sleep(0.1)
+    assert backend.times, 'nothing flushed while the edits kept coming'
+    assert backend.times[0] - start < 0.5 + 0.25
+
+
+def test_failed_batch_is_requeued_under_newer_edits(store):
+    class Flaky:
+        # Fails its first batch; a newer edit of the row lands meanwhile
+        def __init__(self):
+            self.calls = 0
+
+        def apply(self, name, base, ops):
+            self.calls += 1
+            if self.calls == 1:
+                buffer.stage(SHEET, edits.deltas(_edit(edits, p1=2.0)))
+                raise ConnectionError('Sheets API unavailable')
+            return store.apply(name, base, ops)
+
+    buffer, edits = _session(Flaky(), store, 'a')
+    upstream = row_hash(edits.frame.iloc[1])
+    buffer.stage(SHEET, edits.deltas(_edit(edits, p1=1.0)))
+    buffer.flush()
+    assert len(buffer.errors) == 1
+    op = buffer.pending[(SHEET, edits.base, '1')]
+    # The failed edit never reached the store: the row still expects upstream
+    assert op['expected'] == upstream
+    assert op['values']['Penempatan'] == 2.0
+    buffer.flush()
+    assert buffer.conflicts == []
+    assert buffer.n_pending() == 0
+    assert _stored(store)['1'] == 2.0
+
+
+def test_deleted_and_added_rows_are_stored(store):
+    buffer, edits = _session(store, store, 'a')
+    edited = edits.frame.drop(index=0)
+    edited.loc[len(edits.frame)] = [pd.Timestamp('2025-10-31'), 400.0, 'D']
+    buffer.stage(SHEET, edits.deltas(edited))
+    buffer.flush()
+    frame, keys, _ = store.overlay(SHEET, _penempatan())
+    assert keys == ['1', '2', 'a-0']
+    assert frame['Penempatan'].tolist() == [200.0, 300.0, 400.0]
+    assert frame.dtypes.equals(_penempatan().dtypes)
+
+
+def test_concurrent_sessions_store_every_row_once(store):
+    # One session per row, flushing at the same time
+    sessions = [_session(store, store, f's{i}') for i in range(3)]
+    for i, (buffer, edits) in enumerate(sessions):
+        buffer.stage(SHEET, edits.deltas(_edit(edits, **{f'p{i}': 10.0 * (i + 1)})))
+    threads = [threading.Thread(target=buffer.flush) for buffer, _ in sessions]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert all(buffer.conflicts == [] for buffer, _ in sessions)
+    assert _stored(store) == {'0': 10.0, '1': 20.0, '2': 30.0}
+
+
+# === SheetsWriter ===
+@pytest.fixture
+def sheets(tmp_path):
+    with FakeSheets({SHEET: frame_values(_penempatan())}) as fake:
+        source = SheetsSource(fake.client(), fake.spreadsheet_id, sheets=[SHEET], snapshot_dir=str(tmp_path))
+        yield fake, source
+
+
+def test_sheets_writer_round_trip(sheets):
+    fake, source = sheets
+    snapshot = source.snapshot()
+    writer = SheetsWriter(source)
+    buffer = WriteBuffer(writer, debounce=60.0, max_delay=60.0)
+    edits = buffer.editor(SHEET, *writer.overlay(SHEET, snapshot.sheet(SHEET), snapshot.sha256), 'a')
+    assert edits.keys == ['2', '3', '4']
+
+    edited = _edit(edits, p0=150.0).drop(index=1)
+    edited.loc[len(edits.frame)] = [pd.Timestamp('2025-10-31'), 400.0, 'D']
+    buffer.stage(SHEET, edits.deltas(edited))
+    requests = fake.requests
+    buffer.flush()
+
+    assert buffer.conflicts == [] and buffer.errors == []
+    assert (writer.batch_gets, fake.batch_updates, fake.appends) == (1, 1, 1)
+    assert fake.requests - requests == 3
+    values = fake.sheets[SHEET]
+    assert values[1][1] == 150.0          # row 2 updated
+    assert values[2] == []                # row 3 cleared, not removed
+    assert values[4][1:] == [400.0, 'D']  # appended as row 5
+    assert writer.inserted == {(SHEET, 'a-0'): 5}
+    assert [row[0] for row in fake.sheets[REVISION_SHEET][1:]] == [SHEET]
+
+    # The new stamp makes the source read the sheet again
+    assert source.sync() == [SHEET]
+    assert source.frames[SHEET]['Penempatan'].tolist() == [150.0, 300.0, 400.0]
+
+
+def test_sheets_writer_reports_a_row_changed_since_it_was_read(sheets):
+    fake, source = sheets
+    snapshot = source.snapshot()
+    writer = SheetsWriter(source)
+    buffer = WriteBuffer(writer, debounce=60.0, max_delay=60.0)
+    edits = buffer.editor(SHEET, *writer.overlay(SHEET, snapshot.sheet(SHEET), snapshot.sha256), 'a')
+    changed = _penempatan()
+    changed.loc[0, 'Penempatan'] = 101.0
+    fake.update(SHEET, changed)
+
+    buffer.stage(SHEET, edits.deltas(_edit(edits, p0=150.0, p1=250.0)))
+    buffer.flush()
+    assert buffer.conflicts == [(SHEET, '2')]
+    assert fake.sheets[SHEET][1][1] == 101.0
+    assert fake.sheets[SHEET][2][1] == 250.0
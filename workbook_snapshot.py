@@ -0,0 +1,171 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc
+
+from drive_cache import file_sha256
+
+# One-pass ingestion of the workbook into a typed columnar snapshot.
+#
+#   .cache/snapshots/<sha256 of workbook>/manifest.json
+#   .cache/snapshots/<sha256 of workbook>/<sheet>.arrow   (Arrow IPC, uncompressed)
+#
+# The snapshot is keyed by the workbook hash, so Excel is only parsed again
+# when the source file changes. Sheets are read lazily by memory-mapping the
+# Arrow file of the sheet that is asked for.
+
+SNAPSHOT_DIR = os.environ.get('LIKUIDITAS_SNAPSHOT_DIR', os.path.join('.cache', 'snapshots'))
+SNAPSHOT_FORMAT = 1
+
+# Column types per sheet; columns not listed keep what read_excel inferred
+DATE_COLUMNS = {
+    "Investasi": ['Maturity Date', 'Settlement Date', 'Tanggal Jual'],
+    "Penempatan": ['Date'],
+    "BPIH": ['Date'],
+    "Solvabilitas": ['Bulan'],
+    "Pembatalan": ['Bulan'],
+    "Keberangkatan": ['Bulan'],
+    "Kurs": ['Date'],
+}
+NUMERIC_COLUMNS = {
+    "Investasi": ['Nominal'],
+    "Penempatan": ['Penempatan'],
+    "BPIH": ['BPIH'],
+    "Solvabilitas": ['Aset', 'Dana Kelolaan DAU', 'Liabilitas', 'Dana BPIH'],
+    "Pembatalan": ['Reguler', 'Khusus'],
+    "Keberangkatan": ['brk_reg', 'brk_khs'],
+    "Kurs": ['Rate'],
+}
+
+_hash_memo = {}
+_snapshots = {}
+_lock = threading.Lock()
+
+
+def _normalize(name, df):
+    df = df.copy()
+    for col in DATE_COLUMNS.get(name, []):
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    for col in NUMERIC_COLUMNS.get(name, []):
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    # Arrow needs one type per column: mixed object columns become strings
+    for col in df.columns[df.dtypes == object]:
+        values = df[col].dropna()
+        if not values.map(type).eq(str).all():
+            df[col] = df[col].map(lambda v: v if pd.isna(v) else str(v)).astype(object)
+    df.columns = [str(c) for c in df.columns]
+    return df
+
+
+def _sheet_file(name):
+    return name.replace(os.sep, '_') + '.arrow'
+
+
+def workbook_hash(path):
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    sha = _hash_memo.get(key)
+    if sha is None:
+        sha = file_sha256(path)
+        _hash_memo[key] = sha
+    return sha
+
+
+def build_snapshot(path, sha, snapshot_dir=SNAPSHOT_DIR):
+    # Single read of the workbook: every sheet comes out of one openpyxl load
+    return write_snapshot(pd.read_excel(path, sheet_name=None), sha, snapshot_dir)
+
+
+def write_snapshot(frames, sha, snapshot_dir=SNAPSHOT_DIR):
+    # {sheet: DataFrame} -> snapshot directory <snapshot_dir>/<sha>
+    os.makedirs(snapshot_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=snapshot_dir, prefix='.tmp-')
+    manifest = {'format': SNAPSHOT_FORMAT, 'source_sha256': sha, 'sheets': {}}
+    for name, df in frames.items():
+        df = _normalize(name, df)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        fname = _sheet_file(name)
+        with pa.OSFile(os.path.join(tmp_dir, fname), 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        manifest['sheets'][name] = {'file': fname, 'rows': table.num_rows}
+    with open(os.path.join(tmp_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f)
+
+    target = os.path.join(snapshot_dir, sha)
+    try:
+        os.rename(tmp_dir, target)
+    except OSError:
+        # Another process finished the same snapshot first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return target
+
+
+class WorkbookSnapshot:
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, 'manifest.json')) as f:
+            self.manifest = json.load(f)
+        self.sha256 = self.manifest['source_sha256']
+        self._tables = {}
+
+    @property
+    def sheet_names(self):
+        return list(self.manifest['sheets'])
+
+    def table(self, name):
+        table = self._tables.get(name)
+        if table is None:
+            if name not in self.manifest['sheets']:
+                raise KeyError(f'Sheet not in workbook snapshot: {name}')
+            path = os.path.join(self.directory, self.manifest['sheets'][name]['file'])
+            table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+            self._tables[name] = table
+        return table
+
+    def sheet(self, name):
+        # Fresh DataFrame on every call, callers are free to mutate it
+        return self.table(name).to_pandas()
+
+    def __getitem__(self, name):
+        return self.sheet(name)
+
+
+def load_snapshot(path, snapshot_dir=SNAPSHOT_DIR):
+    sha = workbook_hash(path)
+    with _lock:
+        snap = _snapshots.get((sha, snapshot_dir))
+        if snap is not None:
+            return snap
+        directory = os.path.join(snapshot_dir, sha)
+        manifest = os.path.join(directory, 'manifest.json')
+        if not os.path.exists(manifest):
+            directory = build_snapshot(path, sha, snapshot_dir)
+        snap = WorkbookSnapshot(directory)
+        if snap.manifest.get('format') != SNAPSHOT_FORMAT:
+            shutil.rmtree(directory, ignore_errors=True)
+            snap = WorkbookSnapshot(build_snapshot(path, sha, snapshot_dir))
+        _snapshots[(sha, snapshot_dir)] = snap
+        return snap
+
+
+def snapshot_from_frames(frames, sha, snapshot_dir=SNAPSHOT_DIR):
+    # Snapshot of sheets that did not come from an Excel file (e.g. Google
+    # Sheets); `sha` identifies their content
+    with _lock:
+        snap = _snapshots.get((sha, snapshot_dir))
+        if snap is not None:
+            return snap
+        directory = os.path.join(snapshot_dir, sha)
+        if not os.path.exists(os.path.join(directory, 'manifest.json')):
+            directory = write_snapshot(frames, sha, snapshot_dir)
+        snap = WorkbookSnapshot(directory)
+        _snapshots[(sha, snapshot_dir)] = snap
+        return snap
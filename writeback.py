@@ -0,0 +1,307 @@
+import contextlib
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+# Write-back of Data-tab edits, row by row.
+#
+# Every row of an editable sheet has a key: its position in the upstream
+# sheet ('0', '1', ...) or, for a row added in the dashboard, a key of its
+# own. SheetEdits diffs the editor output against what the session last saw
+# or wrote and yields row operations; a WriteBuffer per session coalesces
+# them by row (the last content wins, the first expected version is kept)
+# and flushes them from a timer once the edits pause (DEBOUNCE_SECONDS) or
+# have waited MAX_DELAY seconds, one batch per sheet.
+#
+# Each operation carries the hash of the row as the session saw it. The
+# backend applies it only when the row still has that hash, so an edit made
+# on top of someone else's newer version is reported as a conflict instead
+# of overwriting it. Two backends: LocalEditStore (SQLite overlay over the
+# workbook, the default) and sheets_source.SheetsWriter (the spreadsheet).
+
+EDITABLE_SHEETS = ["Investasi", "Penempatan", "BPIH"]
+EDITS_PATH = os.environ.get('LIKUIDITAS_EDITS_PATH', os.path.join('.cache', 'edits.sqlite'))
+DEBOUNCE_SECONDS = 2.0
+MAX_DELAY = 10.0
+DELETED = 'deleted'
+
+
+def canonical(value):
+    # JSON-able form of a cell that compares equal across pandas, Arrow and
+    # Sheets API representations (int vs float, Timestamp vs datetime)
+    if value is None or (np.ndim(value) == 0 and not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, (pd.Timestamp, datetime.date, np.datetime64)):
+        return pd.Timestamp(value).isoformat()
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, float, np.number)):
+        return float(value)
+    return str(value)
+
+
+def _comparable(value):
+    # Numbers stored as text (codes the snapshot turned into strings) hash
+    # like the numbers the Sheets API returns for them
+    value = canonical(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    return value
+
+
+def row_hash(values):
+    return hashlib.sha1(json.dumps([_comparable(v) for v in values]).encode()).hexdigest()[:16]
+
+
+def sheet_version(df):
+    # Content hash of an upstream sheet: the base edits are keyed on
+    digest = hashlib.sha1(','.join(map(str, df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class SheetEdits:
+    # One sheet as loaded into a session's editor
+    def __init__(self, name, frame, keys, base, session):
+        self.name = name
+        self.frame = frame.reset_index(drop=True)
+        self.keys = list(keys)
+        self.base = base          # sheet_version of the upstream sheet
+        self.session = session
+        self.seen = {}            # key -> row hash last seen or staged
+
+    def _seen(self, key):
+        if key not in self.seen and key in self._positions:
+            self.seen[key] = row_hash(self.frame.iloc[self._positions[key]])
+        return self.seen.get(key)
+
+    @property
+    def _positions(self):
+        if len(getattr(self, '_position_map', ())) != len(self.keys):
+            self._position_map = {k: i for i, k in enumerate(self.keys)}
+        return self._position_map
+
+    def deltas(self, edited):
+        # Row operations turning what the session last saw into `edited`
+        # (the data_editor output: base labels kept, new rows labelled after them)
+        n = len(self.frame)
+        edited = edited[list(self.frame.columns)]
+        base_rows = edited.index[edited.index < n]
+        if edited.dtypes.equals(self.frame.dtypes):
+            old = pd.util.hash_pandas_object(self.frame.loc[base_rows], index=False).to_numpy()
+            new = pd.util.hash_pandas_object(edited.loc[base_rows], index=False).to_numpy()
+            changed = base_rows[old != new]
+        else:
+            changed = base_rows
+        rows = {self.keys[pos]: pos for pos in base_rows}
+        rows.update({f'{self.session}-{label - n}': label for label in edited.index[edited.index >= n]})
+        removed = np.setdiff1d(np.arange(n), base_rows)
+        # Rows staged before are compared with what was staged
+        touched = {self.keys[pos] for pos in changed} | {self.keys[pos] for pos in removed}
+        touched |= set(self.seen) | (set(rows) - set(self.keys))
+
+        ops = []
+        for key in sorted(touched):
+            expected = self._seen(key)
+            if key not in rows:
+                if expected not in (None, DELETED):
+                    ops.append({'key': key, 'values': None, 'expected': expected, 'hash': DELETED})
+                continue
+            values = edited.loc[rows[key]]
+            h = row_hash(values)
+            if h != expected:
+                ops.append({'key': key, 'values': {c: canonical(v) for c, v in values.items()},
+                            'expected': expected, 'hash': h})
+        return ops
+
+
+class WriteBuffer:
+    # Pending row operations of one session, flushed in the background
+    def __init__(self, backend, debounce=DEBOUNCE_SECONDS, max_delay=MAX_DELAY):
+        self.backend = backend
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.editors = {}
+        self.pending = {}         # (sheet, base, key) -> op
+        self.conflicts = []
+        self.errors = []
+        self.flushes = 0
+        self._first = None
+        self._timer = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def editor(self, name, frame, keys, base, session):
+        # Session view of a sheet (frame, keys, base as returned by the
+        # backend's overlay); kept until the upstream sheet changes, so edits
+        # stored meanwhile by others do not reset this session's editor
+        edits = self.editors.get(name)
+        if edits is None or edits.base != base:
+            edits = self.editors[name] = SheetEdits(name, frame, keys, base, session)
+        return edits
+
+    def stage(self, name, ops):
+        # Coalesce with what is pending and (re)arm the debounce timer. The
+        # next edit of a row expects the version staged now, so edits chain
+        # even while an earlier flush is still running.
+        if not ops:
+            return
+        edits = self.editors[name]
+        with self._lock:
+            for op in ops:
+                edits.seen[op['key']] = op['hash']
+                slot = (name, edits.base, op['key'])
+                if slot in self.pending:
+                    op = dict(op, expected=self.pending[slot]['expected'])
+                if op['hash'] == op['expected']:
+                    # Back to the version already stored: nothing to write
+                    self.pending.pop(slot, None)
+                    continue
+                self.pending[slot] = op
+            now = time.monotonic()
+            self._first = self._first or now
+            self._arm(max(0.0, min(self.debounce, self._first + self.max_delay - now)))
+
+    def _arm(self, delay):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self):
+        # One backend batch per (sheet, upstream version); flushes run one at
+        # a time so a row's operations reach the backend in order
+        with self._flush_lock:
+            with self._lock:
+                pending, self.pending = self.pending, {}
+                self._first = None
+            batches = {}
+            for (name, base, _), op in pending.items():
+                batches.setdefault((name, base), []).append(op)
+            for (name, base), ops in batches.items():
+                try:
+                    _, conflicts = self.backend.apply(name, base, ops)
+                except Exception as e:
+                    # Back into the queue under newer edits of the same rows,
+                    # retried after the debounce
+                    self.errors.append(e)
+                    with self._lock:
+                        for op in ops:
+                            slot = (name, base, op['key'])
+                            newer = self.pending.get(slot)
+                            self.pending[slot] = dict(newer, expected=op['expected']) if newer else op
+                        self._first = self._first or time.monotonic()
+                        self._arm(self.debounce)
+                    continue
+                self.conflicts.extend((name, key) for key in conflicts)
+            self.flushes += 1
+
+    def n_pending(self):
+        with self._lock:
+            return len(self.pending)
+
+
+def typed_frame(rows, like, index=None):
+    # Stored row values (canonical) -> frame with the columns and dtypes of `like`
+    out = pd.DataFrame(rows, columns=like.columns, index=index)
+    for col in like.columns:
+        if pd.api.types.is_datetime64_any_dtype(like[col]):
+            out[col] = pd.to_datetime(out[col], errors='coerce')
+        elif pd.api.types.is_numeric_dtype(like[col]):
+            out[col] = pd.to_numeric(out[col], errors='coerce')
+    return out
+
+
+# === Local store ===
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS row_edits (
+    sheet TEXT NOT NULL,
+    base TEXT NOT NULL,
+    key TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    row_values TEXT,
+    updated_at TEXT NOT NULL DEFAULT (datetime('now')),
+    PRIMARY KEY (sheet, base, key)
+)
+"""
+
+
+class LocalEditStore:
+    # Edited rows per (sheet, upstream version) in SQLite, overlaid on the
+    # workbook when it is loaded; edits to an older upstream version are kept
+    # but no longer shown
+    def __init__(self, path=EDITS_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as con:
+            con.execute('PRAGMA journal_mode=WAL')
+            con.execute(SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # Short-lived connection: committed (rolled back on error) and closed
+        con = sqlite3.connect(self.path, timeout=30)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def rows(self, name, base):
+        with self._connect() as con:
+            return con.execute(
+                'SELECT key, hash, row_values FROM row_edits WHERE sheet = ? AND base = ? ORDER BY rowid',
+                (name, base)
+            ).fetchall()
+
+    def overlay(self, name, df, version=None):
+        # (frame, row keys, base) of an upstream sheet with the stored edits applied
+        base = sheet_version(df)
+        df = df.reset_index(drop=True)
+        rows = self.rows(name, base)
+        if not rows:
+            return df, [str(i) for i in range(len(df))], base
+        edits = {key: json.loads(v) if h != DELETED else None for key, h, v in rows}
+        upstream = {int(k): v for k, v in edits.items() if k.isdigit()}
+        added = {k: v for k, v in edits.items() if not k.isdigit() and v is not None}
+        changed = [i for i, v in upstream.items() if v is not None]
+        out = df.drop(index=list(upstream))
+        if changed:
+            out = pd.concat([out, typed_frame([upstream[i] for i in changed], df, index=changed)]).sort_index()
+        keys = [str(i) for i in out.index] + list(added)
+        if added:
+            out = pd.concat([out, typed_frame(list(added.values()), df)], ignore_index=True)
+        return out.reset_index(drop=True), keys, base
+
+    def apply(self, name, base, ops):
+        # (applied keys, conflicting keys), in one transaction
+        applied, conflicts = [], []
+        with self._connect() as con:
+            con.execute('BEGIN IMMEDIATE')
+            for op in ops:
+                row = con.execute('SELECT hash FROM row_edits WHERE sheet = ? AND base = ? AND key = ?',
+                                  (name, base, op['key'])).fetchone()
+                # A row nobody stored yet is still the upstream row (or new)
+                if row is not None and row[0] != op['expected']:
+                    conflicts.append(op['key'])
+                    continue
+                con.execute(
+                    'INSERT INTO row_edits (sheet, base, key, hash, row_values) VALUES (?, ?, ?, ?, ?) '
+                    'ON CONFLICT (sheet, base, key) DO UPDATE SET hash = excluded.hash, '
+                    "row_values = excluded.row_values, updated_at = datetime('now')",
+                    (name, base, op['key'], op['hash'], json.dumps(op['values']) if op['values'] else None)
+                )
+                applied.append(op['key'])
+        return applied, conflicts